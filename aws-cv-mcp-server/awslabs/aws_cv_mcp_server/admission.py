@@ -0,0 +1,169 @@
+#
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You may not use this file except in compliance
+# with the License. A copy of the License is located at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# or in the 'license' file accompanying this file. This file is distributed on an 'AS IS' BASIS, WITHOUT WARRANTIES
+# OR CONDITIONS OF ANY KIND, express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+#
+
+"""Admission control for tool calls that download images and call Bedrock."""
+
+import asyncio
+import logging
+import math
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+class Overloaded(Exception):
+    """Raised when a request is shed because the server is at capacity."""
+
+    def __init__(self, message: str, retry_after: float):
+        """Create the error with a suggested client back-off in seconds."""
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Cap concurrent requests and queue a bounded number of the rest.
+
+    Up to ``max_concurrency`` requests run at once. Further requests wait in
+    arrival order; a request still waiting after ``queue_timeout`` seconds is
+    shed, as is any request arriving while ``max_queue`` are already waiting.
+    Shed requests carry a retry-after estimate based on recent service times.
+    A ``max_concurrency`` of None admits everything.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: Optional[int] = 16,
+        max_queue: int = 64,
+        queue_timeout: Optional[float] = 30.0,
+        window: int = 1000,
+    ):
+        """Create a controller keeping the last ``window`` wait and service times."""
+        self.configure(max_concurrency, max_queue, queue_timeout)
+        self.in_flight = 0
+        self.waiting = 0
+        self.peak_waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self._waits: deque = deque(maxlen=window)
+        self._service_times: deque = deque(maxlen=window)
+
+    def configure(
+        self,
+        max_concurrency: Optional[int],
+        max_queue: int,
+        queue_timeout: Optional[float],
+    ) -> None:
+        """Change the limits; call before requests are in flight."""
+        self.max_concurrency = max_concurrency or None
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout or None
+        self._semaphore = asyncio.Semaphore(self.max_concurrency or 1)
+
+    def retry_after(self) -> float:
+        """Estimate how long until a request arriving now would be admitted."""
+        service = _mean(self._service_times) or 1.0
+        ahead = self.waiting + 1
+        return round(max(1.0, service * ahead / (self.max_concurrency or 1)), 1)
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Hold one concurrency slot for the duration of the ``async with`` block.
+
+        Raises:
+            Overloaded: If the wait queue is full or the wait exceeds ``queue_timeout``
+        """
+        if self.max_concurrency is None:
+            self.admitted += 1
+            yield
+            return
+
+        if (self._semaphore.locked() or self.waiting) and self.waiting >= self.max_queue:
+            self.rejected += 1
+            logger.info(f'Shedding request: {self.waiting} requests already queued')
+            raise Overloaded(
+                f'Server is busy: {self.in_flight} requests running and {self.waiting} queued',
+                self.retry_after(),
+            )
+
+        self.waiting += 1
+        self.peak_waiting = max(self.peak_waiting, self.waiting)
+        queued_at = time.monotonic()
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            logger.info(f'Shedding request after waiting {self.queue_timeout:g}s in the queue')
+            raise Overloaded(
+                f'Server is busy: request waited {self.queue_timeout:g}s without being admitted',
+                self.retry_after(),
+            )
+        finally:
+            self.waiting -= 1
+
+        started = time.monotonic()
+        self._waits.append(started - queued_at)
+        self.admitted += 1
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._service_times.append(time.monotonic() - started)
+            self._semaphore.release()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return limits, current queue depth and recent wait and service times."""
+        return {
+            'max_concurrency': self.max_concurrency,
+            'max_queue': self.max_queue,
+            'queue_timeout': self.queue_timeout,
+            'in_flight': self.in_flight,
+            'waiting': self.waiting,
+            'peak_waiting': self.peak_waiting,
+            'admitted': self.admitted,
+            'rejected': self.rejected,
+            'timed_out': self.timed_out,
+            'wait_p50_ms': _percentile_ms(self._waits, 50),
+            'wait_p95_ms': _percentile_ms(self._waits, 95),
+            'wait_max_ms': _percentile_ms(self._waits, 100),
+            'service_mean_ms': _ms(_mean(self._service_times)),
+        }
+
+
+def _mean(values) -> Optional[float]:
+    return sum(values) / len(values) if values else None
+
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return round(seconds * 1000, 1) if seconds is not None else None
+
+
+def _percentile_ms(values, percentile: float) -> Optional[float]:
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    index = min(len(ordered) - 1, math.ceil(percentile / 100 * len(ordered)) - 1)
+    return _ms(ordered[max(0, index)])
+
+
+request_admission = AdmissionController(
+    max_concurrency=int(os.environ.get('CV_MAX_CONCURRENT_REQUESTS', '16')),
+    max_queue=int(os.environ.get('CV_MAX_QUEUED_REQUESTS', '64')),
+    queue_timeout=float(os.environ.get('CV_QUEUE_TIMEOUT', '30')),
+)
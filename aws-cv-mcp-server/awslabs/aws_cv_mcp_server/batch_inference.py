@@ -0,0 +1,591 @@
+#
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You may not use this file except in compliance
+# with the License. A copy of the License is located at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# or in the 'license' file accompanying this file. This file is distributed on an 'AS IS' BASIS, WITHOUT WARRANTIES
+# OR CONDITIONS OF ANY KIND, express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+#
+
+"""Offline analysis of large image backlogs with Bedrock batch inference.
+
+A job is laid out under ``s3://<agent bucket>/<CV_BATCH_PREFIX>/<job name>/``:
+``input/records.jsonl`` holds one model input per image, ``records.json`` maps
+record ids back to image keys, and Bedrock writes ``output/<job id>/records.jsonl.out``.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import uuid
+from awslabs.aws_cv_mcp_server.bedrock_utils import (
+    DEFAULT_MODEL_ID,
+    create_multimodal_prompt,
+    encode_request_body,
+)
+from awslabs.aws_cv_mcp_server.connections import Connections, run_in_executor
+from awslabs.aws_cv_mcp_server.image_processing import preprocess_image, resolve_preprocessing
+from awslabs.aws_cv_mcp_server.models import (
+    BatchJobResponse,
+    BatchJobResultsResponse,
+    ImageAnalysisResponse,
+    ImagePreprocessingOptions,
+)
+from awslabs.aws_cv_mcp_server.prompt_templates import DESCRIBE_IMAGE_SYSTEM_PROMPT
+from awslabs.aws_cv_mcp_server.s3_utils import get_image, list_image_keys
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+BATCH_BACKEND = os.environ.get('CV_BATCH_BACKEND', 'bedrock').lower()
+BATCH_ROLE_ARN = os.environ.get('CV_BATCH_ROLE_ARN')
+BATCH_PREFIX = os.environ.get('CV_BATCH_PREFIX', 'batch-inference').strip('/')
+BATCH_BUILD_CONCURRENCY = int(os.environ.get('CV_BATCH_BUILD_CONCURRENCY', '16'))
+BATCH_MAX_RECORDS = int(os.environ.get('CV_BATCH_MAX_RECORDS', '50000'))
+BATCH_POLL_INTERVAL = float(os.environ.get('CV_BATCH_POLL_INTERVAL', '60'))
+
+# Bedrock rejects jobs with fewer records than this
+BATCH_MIN_RECORDS = 100
+TERMINAL_STATUSES = {'Completed', 'PartiallyCompleted', 'Failed', 'Stopped', 'Expired'}
+INPUT_FILE_NAME = 'records.jsonl'
+MANIFEST_FILE_NAME = 'records.json'
+
+
+def split_s3_uri(uri: str) -> Tuple[str, str]:
+    """Split ``s3://bucket/key`` into bucket and key."""
+    if not uri.startswith('s3://'):
+        raise ValueError(f'Not an S3 URI: {uri}')
+    bucket, _, key = uri[5:].partition('/')
+    return bucket, key
+
+
+def job_id(job_arn: str) -> str:
+    """Return the job id Bedrock uses as the output folder name."""
+    return job_arn.rsplit('/', 1)[-1]
+
+
+class LocalBatchInferenceClient:
+    """In-process stand-in for the Bedrock control-plane batch inference API.
+
+    Jobs read their input from S3, run every record through the
+    bedrock-runtime client on a background thread and write output in the
+    layout Bedrock uses. Selected with ``CV_BATCH_BACKEND=local``; useful for
+    testing and for accounts without batch inference access.
+    """
+
+    def __init__(self):
+        """Create a client with no jobs."""
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def create_model_invocation_job(
+        self, jobName, roleArn, modelId, inputDataConfig, outputDataConfig, **kwargs
+    ) -> Dict[str, Any]:
+        """Start a job and return its ARN."""
+        job_arn = (
+            f'arn:aws:bedrock:local:000000000000:model-invocation-job/{uuid.uuid4().hex[:12]}'
+        )
+        job = {
+            'jobArn': job_arn,
+            'jobName': jobName,
+            'roleArn': roleArn,
+            'modelId': modelId,
+            'status': 'InProgress',
+            'message': '',
+            'submitTime': datetime.now(timezone.utc),
+            'inputDataConfig': inputDataConfig,
+            'outputDataConfig': outputDataConfig,
+            'stop': threading.Event(),
+        }
+        with self._lock:
+            self.jobs[job_arn] = job
+        threading.Thread(target=self._run, args=(job,), daemon=True).start()
+        return {'jobArn': job_arn}
+
+    def get_model_invocation_job(self, jobIdentifier) -> Dict[str, Any]:
+        """Return the job description, without the internal stop flag."""
+        job = self.jobs[jobIdentifier]
+        return {key: value for key, value in job.items() if key != 'stop'}
+
+    def stop_model_invocation_job(self, jobIdentifier) -> Dict[str, Any]:
+        """Ask a running job to stop after its current record."""
+        job = self.jobs[jobIdentifier]
+        job['stop'].set()
+        if job['status'] not in TERMINAL_STATUSES:
+            job['status'] = 'Stopping'
+        return {}
+
+    def _run(self, job: Dict[str, Any]) -> None:
+        try:
+            input_uri = job['inputDataConfig']['s3InputDataConfig']['s3Uri']
+            output_uri = job['outputDataConfig']['s3OutputDataConfig']['s3Uri']
+            bucket, key = split_s3_uri(input_uri)
+            body = Connections.s3_client.get_object(Bucket=bucket, Key=key)['Body']
+            lines = []
+            processed = failed = 0
+            stopped = False
+            for line in body.iter_lines():
+                if job['stop'].is_set():
+                    stopped = True
+                    break
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                output = {'recordId': record['recordId'], 'modelInput': record['modelInput']}
+                try:
+                    response = Connections.bedrock_client.invoke_model(
+                        modelId=job['modelId'],
+                        body=json.dumps(record['modelInput']),
+                        contentType='application/json',
+                        accept='application/json',
+                    )
+                    output['modelOutput'] = json.loads(response['body'].read())
+                except Exception as e:
+                    failed += 1
+                    output['error'] = {'errorCode': 400, 'errorMessage': str(e)}
+                processed += 1
+                lines.append(json.dumps(output))
+
+            out_bucket, out_prefix = split_s3_uri(
+                output_uri.rstrip('/') + '/' + job_id(job['jobArn'])
+            )
+            Connections.s3_client.put_object(
+                Bucket=out_bucket,
+                Key=f'{out_prefix}/{key.rsplit("/", 1)[-1]}.out',
+                Body='\n'.join(lines).encode(),
+            )
+            Connections.s3_client.put_object(
+                Bucket=out_bucket,
+                Key=f'{out_prefix}/manifest.json.out',
+                Body=json.dumps(
+                    {'processedRecordCount': processed, 'errorRecordCount': failed}
+                ).encode(),
+            )
+            if stopped:
+                job['status'] = 'Stopped'
+            else:
+                job['status'] = 'PartiallyCompleted' if failed else 'Completed'
+        except Exception as e:
+            logger.error(f'Local batch job {job["jobArn"]} failed: {e}')
+            job['status'] = 'Failed'
+            job['message'] = str(e)
+        finally:
+            job['endTime'] = datetime.now(timezone.utc)
+
+
+local_batch_client = LocalBatchInferenceClient()
+
+
+def batch_client():
+    """Return the client that batch jobs are submitted to."""
+    if BATCH_BACKEND == 'local':
+        return local_batch_client
+    return Connections.client('bedrock')
+
+
+def build_model_input(
+    key: str,
+    instructions: str,
+    max_tokens: int,
+    temperature: float,
+    preprocessing: ImagePreprocessingOptions,
+) -> Dict[str, Any]:
+    """Download, preprocess and wrap one image in the same prompt ``describe_image`` sends."""
+    image = get_image(key, use_cache=False)
+    image_data, content_type = preprocess_image(image.data, image.content_type, preprocessing)
+    return create_multimodal_prompt(
+        image_data=image_data,
+        text=instructions,
+        content_type=content_type,
+        system_prompt=DESCRIBE_IMAGE_SYSTEM_PROMPT,
+        max_tokens=max_tokens,
+        temperature=temperature,
+    )
+
+
+def write_batch_input(
+    keys: List[str],
+    instructions: str,
+    bucket: str,
+    job_prefix: str,
+    max_tokens: int = 1000,
+    temperature: float = 0.5,
+    preprocessing: Optional[ImagePreprocessingOptions] = None,
+) -> Tuple[str, int, List[Dict[str, str]]]:
+    """Build the JSONL model inputs for ``keys`` and upload them with their manifest.
+
+    Images are fetched and preprocessed ``BATCH_BUILD_CONCURRENCY`` at a time
+    and each record is written to a temporary file as soon as it is ready, so
+    memory use does not grow with the size of the backlog. A key that cannot
+    be downloaded or decoded is skipped and listed in the manifest instead of
+    failing the whole job.
+
+    Returns:
+        Tuple of the S3 URI of the uploaded input file, the number of records
+        written and the skipped keys with their errors
+
+    Raises:
+        ValueError: If none of the keys could be turned into a record
+    """
+    preprocessing = resolve_preprocessing(preprocessing)
+
+    def build(key: str) -> Tuple[Optional[Dict[str, Any]], Optional[Exception]]:
+        try:
+            model_input = build_model_input(
+                key, instructions, max_tokens, temperature, preprocessing
+            )
+        except Exception as e:
+            return None, e
+        return model_input, None
+
+    records = {}
+    skipped = []
+    window = BATCH_BUILD_CONCURRENCY * 4
+    with tempfile.TemporaryFile() as handle:
+        with ThreadPoolExecutor(max_workers=BATCH_BUILD_CONCURRENCY) as pool:
+            for start in range(0, len(keys), window):
+                chunk = keys[start : start + window]
+                for key, (model_input, error) in zip(chunk, pool.map(build, chunk)):
+                    if error is not None:
+                        logger.warning(f'Skipping {key} in batch job {job_prefix}: {error}')
+                        skipped.append({'key': key, 'error': str(error)})
+                        continue
+                    record_id = f'{len(records):011d}'
+                    records[record_id] = key
+                    handle.write(
+                        encode_request_body({'recordId': record_id, 'modelInput': model_input})
+                    )
+                    handle.write(b'\n')
+        if not records:
+            first = skipped[0]
+            raise ValueError(
+                f'None of the {len(keys)} images could be prepared; '
+                f'{first["key"]}: {first["error"]}'
+            )
+        handle.seek(0)
+        input_key = f'{job_prefix}/input/{INPUT_FILE_NAME}'
+        Connections.s3_client.upload_fileobj(handle, bucket, input_key)
+
+    manifest = {
+        'instructions': instructions,
+        'max_tokens': max_tokens,
+        'temperature': temperature,
+        'preprocessing': preprocessing.model_dump(),
+        'records': records,
+        'skipped': skipped,
+    }
+    Connections.s3_client.put_object(
+        Bucket=bucket,
+        Key=f'{job_prefix}/{MANIFEST_FILE_NAME}',
+        Body=json.dumps(manifest).encode(),
+        ContentType='application/json',
+    )
+    return f's3://{bucket}/{input_key}', len(records), skipped
+
+
+def submit_batch_job(
+    monitoring_instructions: str,
+    prefix: Optional[str] = None,
+    image_file_names: Optional[List[str]] = None,
+    job_name: Optional[str] = None,
+    model_id: str = DEFAULT_MODEL_ID,
+    max_tokens: int = 1000,
+    temperature: float = 0.5,
+    max_images: Optional[int] = None,
+    role_arn: Optional[str] = None,
+    preprocessing: Optional[ImagePreprocessingOptions] = None,
+) -> BatchJobResponse:
+    """Write the model inputs for a backlog of images and submit a batch inference job.
+
+    This is a blocking call; use ``submit_batch_job_async`` from async code.
+
+    Args:
+        monitoring_instructions: Instructions applied to every image
+        prefix: Analyze every image under this S3 prefix
+        image_file_names: Explicit image keys to analyze instead of a prefix
+        job_name: Name of the job; generated from the current time if omitted
+        model_id: Bedrock model ID to use; must support batch inference
+        max_tokens: Maximum tokens for each analysis
+        temperature: Temperature for response generation
+        max_images: Analyze at most this many images
+        role_arn: IAM role Bedrock assumes to read and write the job files
+        preprocessing: Downscaling and re-encoding options
+
+    Returns:
+        BatchJobResponse: The submitted job's ARN, name and S3 locations
+    """
+    try:
+        role_arn = role_arn or BATCH_ROLE_ARN
+        if not role_arn and BATCH_BACKEND != 'local':
+            raise ValueError('A service role is required; set CV_BATCH_ROLE_ARN or pass role_arn')
+        limit = min(max_images or BATCH_MAX_RECORDS, BATCH_MAX_RECORDS)
+        if image_file_names:
+            keys = list(image_file_names)[:limit]
+        elif prefix:
+            keys = list_image_keys(prefix, max_keys=limit)
+        else:
+            raise ValueError('Provide either image_file_names or prefix')
+        if not keys:
+            raise ValueError(f'No images found under prefix {prefix!r}')
+        if len(keys) < BATCH_MIN_RECORDS and BATCH_BACKEND != 'local':
+            logger.warning(
+                f'Batch inference requires at least {BATCH_MIN_RECORDS} records; '
+                f'the job with {len(keys)} may be rejected'
+            )
+
+        job_name = job_name or f'cv-{datetime.now(timezone.utc):%Y%m%d-%H%M%S}'
+        bucket = Connections.agent_bucket_name
+        job_prefix = f'{BATCH_PREFIX}/{job_name}'
+        input_uri, written, skipped = write_batch_input(
+            keys,
+            monitoring_instructions,
+            bucket,
+            job_prefix,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            preprocessing=preprocessing,
+        )
+        output_uri = f's3://{bucket}/{job_prefix}/output/'
+        response = batch_client().create_model_invocation_job(
+            jobName=job_name,
+            roleArn=role_arn,
+            modelId=model_id,
+            inputDataConfig={'s3InputDataConfig': {'s3Uri': input_uri, 's3InputFormat': 'JSONL'}},
+            outputDataConfig={'s3OutputDataConfig': {'s3Uri': output_uri}},
+        )
+        return BatchJobResponse(
+            status='success',
+            job_arn=response['jobArn'],
+            job_name=job_name,
+            job_status='Submitted',
+            records=written,
+            skipped=skipped,
+            input_uri=input_uri,
+            output_uri=output_uri,
+            message=f'Submitted batch job for {written} images'
+            + (f'; skipped {len(skipped)} that could not be read' if skipped else ''),
+        )
+    except Exception as e:
+        logger.error(f'Error submitting batch job: {e}')
+        return BatchJobResponse(status='error', message=f'Error submitting batch job: {e}')
+
+
+def get_batch_job(job_arn: str) -> BatchJobResponse:
+    """Return the current status of a batch inference job."""
+    try:
+        job = batch_client().get_model_invocation_job(jobIdentifier=job_arn)
+        return BatchJobResponse(
+            status='success',
+            job_arn=job_arn,
+            job_name=job.get('jobName'),
+            job_status=job.get('status'),
+            input_uri=job['inputDataConfig']['s3InputDataConfig']['s3Uri'],
+            output_uri=job['outputDataConfig']['s3OutputDataConfig']['s3Uri'],
+            message=job.get('message') or f'Batch job is {job.get("status")}',
+        )
+    except Exception as e:
+        logger.error(f'Error getting batch job {job_arn}: {e}')
+        return BatchJobResponse(
+            status='error', job_arn=job_arn, message=f'Error getting batch job: {e}'
+        )
+
+
+def stop_batch_job(job_arn: str) -> BatchJobResponse:
+    """Stop a batch inference job; output is still written for records already processed."""
+    try:
+        batch_client().stop_model_invocation_job(jobIdentifier=job_arn)
+        return get_batch_job(job_arn)
+    except Exception as e:
+        logger.error(f'Error stopping batch job {job_arn}: {e}')
+        return BatchJobResponse(
+            status='error', job_arn=job_arn, message=f'Error stopping batch job: {e}'
+        )
+
+
+def encode_results_token(key: str, position: int) -> str:
+    """Build the continuation token for the output line starting at ``position`` in ``key``."""
+    return f'{position}:{key}'
+
+
+def decode_results_token(token: str) -> Tuple[str, int]:
+    """Split a continuation token into the output object key and byte offset."""
+    position, separator, key = token.partition(':')
+    if not separator or not position.isdigit() or not key:
+        raise ValueError(f'Invalid results token: {token!r}')
+    return key, int(position)
+
+
+def _without_model_input(pairs: List[Tuple[str, Any]]) -> Dict[str, Any]:
+    # Output lines echo the base64 image in modelInput; never keep it around
+    return {key: value for key, value in pairs if key != 'modelInput'}
+
+
+def iter_batch_output(
+    job_arn: str, token: Optional[str] = None
+) -> Iterator[Tuple[ImageAnalysisResponse, str]]:
+    """Stream a finished batch job's analyses with the continuation token of each.
+
+    Output files are read line by line from S3, so a job of any size is
+    processed in constant memory. With ``token``, reading starts at the output
+    object and byte offset it names through a ranged GET, so paging through a
+    job downloads each output line once instead of re-reading from the start.
+
+    Yields:
+        Tuples of an analysis and the token that resumes at that analysis
+    """
+    job = batch_client().get_model_invocation_job(jobIdentifier=job_arn)
+    input_bucket, input_key = split_s3_uri(job['inputDataConfig']['s3InputDataConfig']['s3Uri'])
+    manifest_key = f'{input_key.rsplit("/input/", 1)[0]}/{MANIFEST_FILE_NAME}'
+    manifest = json.loads(
+        Connections.s3_client.get_object(Bucket=input_bucket, Key=manifest_key)['Body'].read()
+    )
+    records = manifest['records']
+    start_key, start_position = decode_results_token(token) if token else (None, 0)
+
+    output_uri = job['outputDataConfig']['s3OutputDataConfig']['s3Uri']
+    bucket, prefix = split_s3_uri(output_uri.rstrip('/') + '/' + job_id(job_arn) + '/')
+    paginator = Connections.s3_client.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+        for obj in page.get('Contents', []):
+            key = obj['Key']
+            if not key.endswith('.jsonl.out') or (start_key and key < start_key):
+                continue
+            position = start_position if key == start_key else 0
+            request = {'Bucket': bucket, 'Key': key}
+            if position:
+                request['Range'] = f'bytes={position}-'
+            body = Connections.s3_client.get_object(**request)['Body']
+            for line in body.iter_lines(keepends=True):
+                line_start = position
+                position += len(line)
+                if line.strip():
+                    record = json.loads(line, object_pairs_hook=_without_model_input)
+                    result = parse_batch_record(record, records)
+                    yield result, encode_results_token(key, line_start)
+
+
+def iter_batch_results(job_arn: str) -> Iterator[ImageAnalysisResponse]:
+    """Stream the parsed analyses of a finished batch job, one output line at a time."""
+    for result, _ in iter_batch_output(job_arn):
+        yield result
+
+
+def parse_batch_record(record: Dict[str, Any], records: Dict[str, str]) -> ImageAnalysisResponse:
+    """Turn one line of batch output into the response ``describe_image`` would have given."""
+    source = records.get(record.get('recordId'), record.get('recordId') or 'unknown')
+    error = record.get('error')
+    if error:
+        message = error.get('errorMessage') if isinstance(error, dict) else str(error)
+        return ImageAnalysisResponse(
+            status='error', source=source, message=f'Error analyzing image: {message}'
+        )
+    try:
+        analysis = record['modelOutput']['content'][0]['text']
+    except (KeyError, IndexError, TypeError):
+        return ImageAnalysisResponse(
+            status='error', source=source, message='Batch output record has no analysis text'
+        )
+    return ImageAnalysisResponse(
+        status='success',
+        source=source,
+        analysis=analysis,
+        message='Image analysis completed by batch inference',
+    )
+
+
+def get_batch_results(
+    job_arn: str, next_token: Optional[str] = None, limit: int = 100
+) -> BatchJobResultsResponse:
+    """Return one page of a batch job's analyses.
+
+    Args:
+        job_arn: ARN of the batch job
+        next_token: Token returned with the previous page; starts at the first result if None
+        limit: Maximum number of results to return
+
+    Returns:
+        BatchJobResultsResponse: The results and the token of the next page, if any
+    """
+    try:
+        job = get_batch_job(job_arn)
+        if job.status == 'error':
+            raise RuntimeError(job.message)
+        if job.job_status not in ('Completed', 'PartiallyCompleted', 'Stopped'):
+            return BatchJobResultsResponse(
+                status='success',
+                job_arn=job_arn,
+                job_status=job.job_status,
+                message=f'Batch job is {job.job_status}; results are not available yet',
+            )
+        results = []
+        token = None
+        for result, result_token in iter_batch_output(job_arn, next_token):
+            if len(results) >= limit:
+                token = result_token
+                break
+            results.append(result)
+        return BatchJobResultsResponse(
+            status='success',
+            job_arn=job_arn,
+            job_status=job.job_status,
+            results=results,
+            next_token=token,
+            message=f'Returned {len(results)} results',
+        )
+    except Exception as e:
+        logger.error(f'Error reading batch results for {job_arn}: {e}')
+        return BatchJobResultsResponse(
+            status='error', job_arn=job_arn, message=f'Error reading batch results: {e}'
+        )
+
+
+def wait_for_batch_job(
+    job_arn: str, poll_interval: float = BATCH_POLL_INTERVAL, timeout: Optional[float] = None
+) -> BatchJobResponse:
+    """Poll a batch job until it reaches a terminal status or ``timeout`` seconds pass."""
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    while True:
+        job = get_batch_job(job_arn)
+        if job.status == 'error' or job.job_status in TERMINAL_STATUSES:
+            return job
+        if deadline is not None and time.monotonic() >= deadline:
+            return job
+        logger.info(f'Batch job {job_arn} is {job.job_status}')
+        time.sleep(poll_interval)
+
+
+async def submit_batch_job_async(*args: Any, **kwargs: Any) -> BatchJobResponse:
+    """Submit a batch job without blocking the event loop.
+
+    Building the input can take minutes for a large backlog, so it runs on its
+    own thread instead of holding a slot of the shared AWS executor.
+    """
+    return await asyncio.to_thread(submit_batch_job, *args, **kwargs)
+
+
+async def get_batch_job_async(job_arn: str) -> BatchJobResponse:
+    """Return the status of a batch job on the shared AWS executor."""
+    return await run_in_executor(get_batch_job, job_arn)
+
+
+async def stop_batch_job_async(job_arn: str) -> BatchJobResponse:
+    """Stop a batch job on the shared AWS executor."""
+    return await run_in_executor(stop_batch_job, job_arn)
+
+
+async def get_batch_results_async(
+    job_arn: str, next_token: Optional[str] = None, limit: int = 100
+) -> BatchJobResultsResponse:
+    """Return one page of a batch job's analyses without blocking the event loop."""
+    return await asyncio.to_thread(get_batch_results, job_arn, next_token, limit)
@@ -4,21 +4,335 @@
 # available at http://aws.amazon.com/agreement or other written agreement between
 # Customer and either Amazon Web Services, Inc. or Amazon Web Services EMEA SARL or both.
 
+import asyncio
+import binascii
+import io
 import json
 import logging
 import base64
-from typing import Dict, Any
+import os
+import uuid
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple, Union
 
-from awslabs.aws_cv_mcp_server.connections import Connections
+from awslabs.aws_cv_mcp_server.connections import Connections, run_in_executor
+from awslabs.aws_cv_mcp_server.metrics import (
+    bedrock_tokens,
+    payload_bytes,
+    record_error,
+    stage_seconds,
+)
+from awslabs.aws_cv_mcp_server.rate_limiter import bedrock_rate_limiter
+from awslabs.aws_cv_mcp_server.router import BedrockRouter, Endpoint, parse_endpoints
 
 logger = Connections.logger
 
+DEFAULT_MODEL_ID = "anthropic.claude-3-sonnet-20240229-v1:0"
+
+# Regions and inference profiles that calls for the default model are spread across
+bedrock_router = BedrockRouter(
+    parse_endpoints(
+        os.environ.get("CV_BEDROCK_ENDPOINTS", ""),
+        DEFAULT_MODEL_ID,
+        window=float(os.environ.get("CV_BEDROCK_ROUTER_WINDOW", "300")),
+    ),
+    default_model_id=DEFAULT_MODEL_ID,
+    cooldown=float(os.environ.get("CV_BEDROCK_ROUTER_COOLDOWN", "5")),
+    max_cooldown=float(os.environ.get("CV_BEDROCK_ROUTER_MAX_COOLDOWN", "60")),
+)
+
+# Longest prompt or response text written to the log; image data is never logged
+PROMPT_LOG_MAX_CHARS = int(os.environ.get("CV_PROMPT_LOG_MAX_CHARS", "2000"))
+
+# Raw bytes encoded per step when writing base64 into a request body (a multiple of 3)
+BASE64_CHUNK_BYTES = 3 * 16 * 1024
+
+# Prompt caching: "auto" adds a cache checkpoint for models that support it
+PROMPT_CACHE = os.environ.get("CV_PROMPT_CACHE", "auto").lower()
+# Bedrock ignores checkpoints on shorter prefixes (1,024 tokens for Sonnet and Opus)
+PROMPT_CACHE_MIN_TOKENS = int(os.environ.get("CV_PROMPT_CACHE_MIN_TOKENS", "1024"))
+PROMPT_CACHE_MODELS = (
+    "claude-3-7-sonnet",
+    "claude-3-5-haiku",
+    "claude-sonnet-4",
+    "claude-opus-4",
+    "claude-haiku-4",
+)
+USAGE_FIELDS = (
+    "input_tokens",
+    "output_tokens",
+    "cache_read_input_tokens",
+    "cache_creation_input_tokens",
+)
+
+
+class Base64Data:
+    """Binary data that is base64 encoded only when the request body is written.
+
+    Prompts hold images as ``Base64Data`` so that building a prompt, logging it
+    or copying it never materializes the encoded text; ``encode_request_body``
+    writes the encoding straight into the final body.
+    """
+
+    __slots__ = ("raw",)
+
+    def __init__(self, raw: bytes):
+        """Wrap the raw bytes."""
+        self.raw = raw
+
+    def __len__(self) -> int:
+        """Return the length of the base64 text."""
+        return 4 * ((len(self.raw) + 2) // 3)
+
+    def __eq__(self, other: object) -> bool:
+        """Compare by the wrapped bytes."""
+        return isinstance(other, Base64Data) and other.raw == self.raw
+
+    def __repr__(self) -> str:
+        """Summarize without encoding, so logging a prompt stays cheap."""
+        return f"<base64 data: {len(self.raw)} bytes>"
+
+    def encode(self) -> str:
+        """Return the base64 text."""
+        return base64.b64encode(self.raw).decode("ascii")
+
+
+def encode_request_body(payload: Any) -> bytearray:
+    """Serialize ``payload`` to a JSON request body with a single full-size buffer.
+
+    Everything except ``Base64Data`` values is serialized by ``json.dumps`` as
+    usual, which is small once the images are left out. The body is then
+    assembled in one preallocated buffer, with each image base64 encoded into
+    place chunk by chunk. botocore sends a ``bytearray`` body as-is.
+    """
+    images: List[bytes] = []
+    marker = f"b64-{uuid.uuid4().hex}"
+
+    def placeholder(value: Any) -> str:
+        if isinstance(value, Base64Data):
+            images.append(value.raw)
+            return marker
+        raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+    skeleton = json.dumps(payload, default=placeholder).encode("utf-8")
+    if not images:
+        return bytearray(skeleton)
+
+    parts = skeleton.split(f'"{marker}"'.encode("ascii"))
+    size = sum(len(part) for part in parts) + sum(2 + 4 * ((len(raw) + 2) // 3) for raw in images)
+    body = bytearray(size)
+    view = memoryview(body)
+    position = 0
+    for part, raw in zip(parts, images + [None]):
+        view[position : position + len(part)] = part
+        position += len(part)
+        if raw is None:
+            break
+        view[position] = ord('"')
+        position += 1
+        source = memoryview(raw)
+        for start in range(0, len(source), BASE64_CHUNK_BYTES):
+            encoded = binascii.b2a_base64(source[start : start + BASE64_CHUNK_BYTES], newline=False)
+            view[position : position + len(encoded)] = encoded
+            position += len(encoded)
+        view[position] = ord('"')
+        position += 1
+    return body
+
+
+class _Truncated:
+    """Log argument formatted (and truncated) only if the record is emitted."""
+
+    __slots__ = ("value",)
+
+    def __init__(self, value: Any):
+        self.value = value
+
+    def __str__(self) -> str:
+        text = str(self.value)
+        if len(text) <= PROMPT_LOG_MAX_CHARS:
+            return text
+        return f"{text[:PROMPT_LOG_MAX_CHARS]}... [{len(text) - PROMPT_LOG_MAX_CHARS} more characters]"
+
+
+@dataclass
+class ModelResponse:
+    """Text and token usage of one model invocation."""
+
+    text: str
+    usage: Dict[str, int] = field(default_factory=dict)
+
+
+class TokenUsageStats:
+    """Running totals of the token usage Bedrock reports, including prompt-cache reads and writes."""
+
+    def __init__(self):
+        """Create zeroed totals."""
+        self._lock = threading.Lock()
+        self.clear()
+
+    def record(self, usage: Dict[str, int]) -> None:
+        """Add the ``usage`` block of one response to the totals."""
+        with self._lock:
+            self.requests += 1
+            for name in USAGE_FIELDS:
+                tokens = int(usage.get(name) or 0)
+                self.totals[name] += tokens
+                if tokens:
+                    bedrock_tokens.inc(tokens, type=name)
+            if usage.get("cache_read_input_tokens"):
+                self.cache_hits += 1
+
+    def clear(self) -> None:
+        """Reset the totals."""
+        with self._lock:
+            self.requests = 0
+            self.cache_hits = 0
+            self.totals = dict.fromkeys(USAGE_FIELDS, 0)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return token totals and the share of input tokens served from the prompt cache."""
+        with self._lock:
+            totals = dict(self.totals)
+            requests, cache_hits = self.requests, self.cache_hits
+        prompt_tokens = (
+            totals["input_tokens"]
+            + totals["cache_read_input_tokens"]
+            + totals["cache_creation_input_tokens"]
+        )
+        return {
+            "enabled": PROMPT_CACHE,
+            "requests": requests,
+            "cache_hit_requests": cache_hits,
+            **totals,
+            "cache_read_ratio": (
+                round(totals["cache_read_input_tokens"] / prompt_tokens, 4) if prompt_tokens else 0.0
+            ),
+        }
+
+
+token_usage = TokenUsageStats()
+
+
+def supports_prompt_caching(model_id: str) -> bool:
+    """Return whether Bedrock supports prompt caching for a model or inference profile."""
+    return any(name in model_id for name in PROMPT_CACHE_MODELS)
+
+
+def prompt_caching_enabled(model_id: str) -> bool:
+    """Return whether prompts sent to ``model_id`` should get a prompt cache checkpoint."""
+    if PROMPT_CACHE == "auto":
+        return supports_prompt_caching(model_id)
+    return PROMPT_CACHE == "true"
+
+
+def system_blocks(system_prompt: str, cacheable: bool = False) -> Union[str, List[Dict[str, Any]]]:
+    """Return the ``system`` field for a prompt, with a cache checkpoint after it if requested.
+
+    Bedrock caches the prompt prefix up to the checkpoint, so later calls with
+    the same system prompt read it from cache instead of processing it again.
+    Prefixes shorter than the model's minimum (1,024 tokens for Sonnet) are
+    not cached.
+    """
+    if not cacheable:
+        return system_prompt
+    return [{"type": "text", "text": system_prompt, "cache_control": {"type": "ephemeral"}}]
+
+
+def with_prompt_cache(
+    prompt: Dict[str, Any], min_tokens: int = PROMPT_CACHE_MIN_TOKENS
+) -> Dict[str, Any]:
+    """Return a copy of ``prompt`` with a cache checkpoint after its shared prefix.
+
+    The shared prefix is the system prompt followed by every block of the first
+    user message except the last, which holds the per-call instructions. For
+    ``describe_image`` that prefix ends with the image, so repeat questions about
+    the same frame read the image from cache. The checkpoint is only added when
+    the estimated prefix reaches ``min_tokens``, since Bedrock does not cache
+    shorter prefixes; prompts that already carry a checkpoint are returned as is.
+    """
+    system = prompt.get("system")
+    if not isinstance(system, str) and system:
+        return prompt
+    messages = prompt.get("messages") or []
+    content = messages[0].get("content") if messages else None
+    prefix = content[:-1] if isinstance(content, list) else []
+    tokens = len(system or "") // 4 + sum(_block_tokens(block) for block in prefix)
+    if tokens < min_tokens:
+        return prompt
+    if not prefix:
+        return {**prompt, "system": system_blocks(system, cacheable=True)}
+    checkpoint = {**prefix[-1], "cache_control": {"type": "ephemeral"}}
+    first = {**messages[0], "content": [*prefix[:-1], checkpoint, content[-1]]}
+    return {**prompt, "messages": [first, *messages[1:]]}
+
+
+def _block_tokens(block: Dict[str, Any]) -> int:
+    if block.get("type") == "image":
+        data = block["source"]["data"]
+        if isinstance(data, Base64Data):
+            return image_tokens(data.raw)
+        return image_tokens(base64.b64decode(data))
+    return len(block.get("text", "")) // 4
+
+
+# Claude bills an image at roughly (width * height) / 750 tokens and downsamples
+# anything larger than about 1.15 megapixels, which caps an image near this many
+IMAGE_TOKEN_ESTIMATE = 1600
+
+
+def image_tokens(image_data: bytes) -> int:
+    """Estimate the input tokens of an image from its dimensions.
+
+    Falls back to ``IMAGE_TOKEN_ESTIMATE`` when the dimensions cannot be read.
+    """
+    try:
+        from PIL import Image
+
+        width, height = Image.open(io.BytesIO(image_data)).size
+    except Exception:
+        return IMAGE_TOKEN_ESTIMATE
+    return min(IMAGE_TOKEN_ESTIMATE, width * height // 750)
+
+
+def estimate_prompt_tokens(prompt: Dict[str, Any]) -> int:
+    """Estimate the tokens a request counts against the tokens-per-minute quota.
+
+    Bedrock reserves ``max_tokens`` for the output up front, so it is included
+    in full. Text is estimated at four characters per token.
+    """
+    system = prompt.get("system") or ""
+    if isinstance(system, str):
+        characters = len(system)
+    else:
+        characters = sum(len(block.get("text", "")) for block in system)
+    images = 0
+    for message in prompt.get("messages", []):
+        content = message.get("content")
+        if isinstance(content, str):
+            characters += len(content)
+            continue
+        for block in content or []:
+            if block.get("type") == "image":
+                images += 1
+            elif block.get("type") == "text":
+                characters += len(block.get("text", ""))
+    return characters // 4 + images * IMAGE_TOKEN_ESTIMATE + int(prompt.get("max_tokens", 0))
+
+
+def usage_tokens(usage: Dict[str, int]) -> int:
+    """Return the total tokens reported in a Bedrock ``usage`` block."""
+    return sum(value for value in usage.values() if isinstance(value, int))
+
 
 def invoke_bedrock_model(
     prompt: Dict[str, Any],
-    model_id: str = "anthropic.claude-3-sonnet-20240229-v1:0",
+    model_id: str = DEFAULT_MODEL_ID,
     max_tokens: int = 1000,
     temperature: float = 0.5,
+    cache_prompt: Optional[bool] = None,
 ) -> str:
     """
     Invoke Bedrock model with given prompt and return the response text.
@@ -28,40 +342,265 @@ def invoke_bedrock_model(
         model_id: Bedrock model ID to use
         max_tokens: Maximum tokens for response
         temperature: Temperature for response generation
+        cache_prompt: Add a prompt cache checkpoint; defaults to the CV_PROMPT_CACHE setting
 
     Returns:
         str: Model's response text
     """
+    return _invoke_model(prompt, model_id, cache_prompt=cache_prompt).text
+
+
+def _prepare(prompt: Dict[str, Any], model_id: str, cache_prompt: Optional[bool]) -> Dict[str, Any]:
+    if cache_prompt is None:
+        cache_prompt = prompt_caching_enabled(model_id)
+    return with_prompt_cache(prompt) if cache_prompt else prompt
+
+
+def _invoke_model(
+    prompt: Dict[str, Any],
+    model_id: str,
+    client: Any = None,
+    cache_prompt: Optional[bool] = None,
+) -> ModelResponse:
+    """Invoke the model once and return its text and token usage."""
     try:
-        logger.info(f"Prompt for Bedrock: {prompt}")
+        prompt = _prepare(prompt, model_id, cache_prompt)
+        logger.info("Prompt for Bedrock: %s", _Truncated(prompt))
+
+        with stage_seconds.time(operation="invoke_bedrock_model", stage="serialize"):
+            body = encode_request_body(prompt)
+        payload_bytes.inc(len(body), payload="bedrock_request")
+
+        with stage_seconds.time(operation="invoke_bedrock_model", stage="request"):
+            response = (client or Connections.bedrock_client).invoke_model(
+                modelId=model_id,
+                body=body,
+                contentType="application/json",
+                accept="application/json",
+            )
+            raw = response.get("body").read()
+        payload_bytes.inc(len(raw), payload="bedrock_response")
+
+        with stage_seconds.time(operation="invoke_bedrock_model", stage="parse"):
+            response_body = json.loads(raw)
+        logger.info("Bedrock response: %s", _Truncated(response_body))
+
+        analysis = response_body["content"][0]["text"]
+        logger.info("Bedrock analysis: %s", _Truncated(analysis))
+
+        usage = response_body.get("usage") or {}
+        token_usage.record(usage)
+        return ModelResponse(analysis, usage)
+
+    except Exception as e:
+        logger.error(f"Error invoking Bedrock: {e}")
+        record_error("invoke_bedrock_model", e)
+        raise
 
-        response = Connections.bedrock_client.invoke_model(
+
+async def invoke_bedrock_model_async(
+    prompt: Dict[str, Any],
+    model_id: str = DEFAULT_MODEL_ID,
+    max_tokens: int = 1000,
+    temperature: float = 0.5,
+    cache_prompt: Optional[bool] = None,
+) -> ModelResponse:
+    """Invoke Bedrock model without blocking the event loop.
+
+    The blocking ``invoke_model`` call runs on the shared AWS executor, so
+    concurrent callers overlap up to ``Connections.max_concurrency``. Calls are
+    admitted by the shared Bedrock rate limiter and routed to the fastest
+    healthy endpoint; a call that every endpoint throttles is retried with
+    jittered exponential backoff.
+
+    Args:
+        prompt: Dictionary containing the prompt structure
+        model_id: Bedrock model ID to use
+        max_tokens: Maximum tokens for response
+        temperature: Temperature for response generation
+        cache_prompt: Add a prompt cache checkpoint; defaults to the CV_PROMPT_CACHE setting
+
+    Returns:
+        ModelResponse: Model's response text and token usage, including prompt-cache reads and writes
+
+    Raises:
+        RateLimitExceeded: If the limiter's wait queue is full
+    """
+    estimated = estimate_prompt_tokens(prompt)
+
+    def attempt(endpoint: Endpoint) -> Awaitable[ModelResponse]:
+        # Resolve the client on the worker thread; creating one loads service models
+        return run_in_executor(
+            lambda: _invoke_model(prompt, endpoint.model_id, endpoint.client, cache_prompt)
+        )
+
+    response = await bedrock_rate_limiter.call(
+        lambda: bedrock_router.call(model_id, attempt),
+        estimated_tokens=estimated,
+    )
+    if response.usage:
+        bedrock_rate_limiter.record_usage(estimated, usage_tokens(response.usage))
+    return response
+
+
+def invoke_bedrock_model_stream(
+    prompt: Dict[str, Any],
+    model_id: str = DEFAULT_MODEL_ID,
+    on_text: Optional[Callable[[str], None]] = None,
+    cache_prompt: Optional[bool] = None,
+) -> str:
+    """Invoke Bedrock model with a streamed response and return the full response text.
+
+    Args:
+        prompt: Dictionary containing the prompt structure
+        model_id: Bedrock model ID to use
+        on_text: Called with each text delta as soon as it arrives
+        cache_prompt: Add a prompt cache checkpoint; defaults to the CV_PROMPT_CACHE setting
+
+    Returns:
+        str: Model's response text
+    """
+    return _invoke_model_stream(prompt, model_id, on_text, cache_prompt=cache_prompt).text
+
+
+def _invoke_model_stream(
+    prompt: Dict[str, Any],
+    model_id: str,
+    on_text: Optional[Callable[[str], None]] = None,
+    client: Any = None,
+    cache_prompt: Optional[bool] = None,
+) -> ModelResponse:
+    """Invoke the model once with a streamed response and return its text and token usage."""
+    try:
+        prompt = _prepare(prompt, model_id, cache_prompt)
+        with stage_seconds.time(operation="invoke_bedrock_model_stream", stage="serialize"):
+            body = encode_request_body(prompt)
+        payload_bytes.inc(len(body), payload="bedrock_request")
+
+        started = time.perf_counter()
+        response = (client or Connections.bedrock_client).invoke_model_with_response_stream(
             modelId=model_id,
-            body=json.dumps(prompt),
+            body=body,
             contentType="application/json",
             accept="application/json",
         )
+        stage_seconds.observe(
+            time.perf_counter() - started, operation="invoke_bedrock_model_stream", stage="request"
+        )
 
-        response_body = json.loads(response.get("body").read())
-        logger.info(f"Bedrock response: {response_body}")
-
-        analysis = response_body["content"][0]["text"]
-        logger.info(f"Bedrock analysis: {analysis}")
+        parts = []
+        usage: Dict[str, int] = {}
+        received = 0
+        for event in response.get("body"):
+            chunk = event.get("chunk")
+            if not chunk:
+                continue
+            received += len(chunk["bytes"])
+            data = json.loads(chunk["bytes"])
+            event_type = data.get("type")
+            if event_type == "content_block_delta":
+                text = data.get("delta", {}).get("text")
+                if text:
+                    parts.append(text)
+                    if on_text is not None:
+                        on_text(text)
+            elif event_type == "message_start":
+                usage.update(data.get("message", {}).get("usage") or {})
+            elif event_type == "message_delta":
+                usage.update(data.get("usage") or {})
 
-        return analysis
+        analysis = "".join(parts)
+        stage_seconds.observe(
+            time.perf_counter() - started, operation="invoke_bedrock_model_stream", stage="stream"
+        )
+        payload_bytes.inc(received, payload="bedrock_response")
+        logger.info("Bedrock streamed analysis: %s", _Truncated(analysis))
+        token_usage.record(usage)
+        return ModelResponse(analysis, usage)
 
     except Exception as e:
-        logger.error(f"Error invoking Bedrock: {e}")
+        logger.error(f"Error invoking Bedrock with response stream: {e}")
+        record_error("invoke_bedrock_model_stream", e)
         raise
 
 
+async def invoke_bedrock_model_stream_async(
+    prompt: Dict[str, Any],
+    on_text: Callable[[str], Awaitable[None]],
+    model_id: str = DEFAULT_MODEL_ID,
+    cache_prompt: Optional[bool] = None,
+) -> ModelResponse:
+    """Stream a Bedrock response, forwarding text to ``on_text`` from the event loop.
+
+    The stream is read on the shared AWS executor. Deltas that arrive while
+    ``on_text`` is still busy are coalesced into the next call, so a slow
+    consumer never holds up the stream. The call goes through the shared
+    Bedrock rate limiter and endpoint router; a failed call is only retried or
+    failed over if no text has been forwarded yet, so clients never see
+    duplicated output.
+
+    Args:
+        prompt: Dictionary containing the prompt structure
+        on_text: Coroutine called with each batch of new text
+        model_id: Bedrock model ID to use
+        cache_prompt: Add a prompt cache checkpoint; defaults to the CV_PROMPT_CACHE setting
+
+    Returns:
+        ModelResponse: Model's full response text and token usage
+
+    Raises:
+        RateLimitExceeded: If the limiter's wait queue is full
+    """
+    loop = asyncio.get_running_loop()
+    forwarded = False
+
+    async def attempt(endpoint: Endpoint) -> ModelResponse:
+        nonlocal forwarded
+        queue: asyncio.Queue = asyncio.Queue()
+
+        def push(text: str) -> None:
+            loop.call_soon_threadsafe(queue.put_nowait, text)
+
+        future = loop.run_in_executor(
+            Connections.executor,
+            lambda: _invoke_model_stream(
+                prompt, endpoint.model_id, push, endpoint.client, cache_prompt
+            ),
+        )
+        future.add_done_callback(lambda _: queue.put_nowait(None))
+
+        finished = False
+        while not finished:
+            parts = [await queue.get()]
+            while not queue.empty():
+                parts.append(queue.get_nowait())
+            if parts[-1] is None:
+                finished = True
+                parts.pop()
+            if parts:
+                forwarded = True
+                await on_text("".join(parts))
+        return await future
+
+    estimated = estimate_prompt_tokens(prompt)
+    response = await bedrock_rate_limiter.call(
+        lambda: bedrock_router.call(model_id, attempt, can_failover=lambda: not forwarded),
+        estimated_tokens=estimated,
+        can_retry=lambda: not forwarded,
+    )
+    if response.usage:
+        bedrock_rate_limiter.record_usage(estimated, usage_tokens(response.usage))
+    return response
+
+
 def create_text_prompt(
     content: str,
     system_prompt: str = None,
     max_tokens: int = 1000,
     temperature: float = 0.5,
+    cache_system_prompt: bool = False,
 ) -> Dict[str, Any]:
-    """Create a text-only prompt structure"""
+    """Create a text-only prompt structure, optionally with a cacheable system prompt"""
     prompt = {
         "anthropic_version": "bedrock-2023-05-31",
         "max_tokens": max_tokens,
@@ -69,7 +608,37 @@ def create_text_prompt(
         "messages": [{"role": "user", "content": content}],
     }
     if system_prompt:
-        prompt["system"] = system_prompt
+        prompt["system"] = system_blocks(system_prompt, cache_system_prompt)
+    return prompt
+
+
+def _image_block(image_data: bytes, content_type: str) -> Dict[str, Any]:
+    """Build one base64 image content block."""
+    return {
+        "type": "image",
+        "source": {
+            "type": "base64",
+            "media_type": content_type,
+            "data": Base64Data(image_data),
+        },
+    }
+
+
+def _prompt(
+    content: List[Dict[str, Any]],
+    system_prompt: Optional[str],
+    max_tokens: int,
+    temperature: float,
+    cache_system_prompt: bool,
+) -> Dict[str, Any]:
+    prompt = {
+        "anthropic_version": "bedrock-2023-05-31",
+        "max_tokens": max_tokens,
+        "temperature": temperature,
+        "messages": [{"role": "user", "content": content}],
+    }
+    if system_prompt:
+        prompt["system"] = system_blocks(system_prompt, cache_system_prompt)
     return prompt
 
 
@@ -80,29 +649,78 @@ def create_multimodal_prompt(
     system_prompt: str = None,
     max_tokens: int = 1000,
     temperature: float = 0.5,
+    cache_system_prompt: bool = False,
 ) -> Dict[str, Any]:
-    """Create a multimodal prompt structure with image and text"""
-    prompt = {
-        "anthropic_version": "bedrock-2023-05-31",
-        "max_tokens": max_tokens,
-        "temperature": temperature,
-        "messages": [
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "image",
-                        "source": {
-                            "type": "base64",
-                            "media_type": content_type,
-                            "data": base64.b64encode(image_data).decode("utf-8"),
-                        },
-                    },
-                    {"type": "text", "text": text},
-                ],
-            }
-        ],
-    }
-    if system_prompt:
-        prompt["system"] = system_prompt
-    return prompt 
\ No newline at end of file
+    """Create a multimodal prompt structure with image and text, optionally with a cacheable system prompt
+
+    The image is held as ``Base64Data``; serialize the prompt with ``encode_request_body``.
+    """
+    content = [_image_block(image_data, content_type), {"type": "text", "text": text}]
+    return _prompt(content, system_prompt, max_tokens, temperature, cache_system_prompt)
+
+
+def create_multi_image_prompt(
+    images: Sequence[Tuple[bytes, str]],
+    text: str,
+    labels: Optional[Sequence[str]] = None,
+    system_prompt: str = None,
+    max_tokens: int = 1000,
+    temperature: float = 0.5,
+    cache_system_prompt: bool = False,
+) -> Dict[str, Any]:
+    """Create a single user message holding several images followed by the instructions.
+
+    Each image is preceded by a text block naming its position ("Image 1 of 3") and,
+    if given, its label, so the model can refer to the images unambiguously.
+
+    Args:
+        images: ``(image_data, content_type)`` pairs in the order they should be shown
+        text: Instructions placed after the last image
+        labels: Optional description of each image, such as its S3 key and capture time
+        system_prompt: Optional system prompt
+        max_tokens: Maximum tokens for the response
+        temperature: Temperature for response generation
+        cache_system_prompt: Mark the system prompt as a prompt cache checkpoint
+
+    Returns:
+        Dict[str, Any]: The prompt; serialize it with ``encode_request_body``
+    """
+    if labels is not None and len(labels) != len(images):
+        raise ValueError(f"Got {len(labels)} labels for {len(images)} images")
+    content = []
+    for index, (image_data, content_type) in enumerate(images, start=1):
+        heading = f"Image {index} of {len(images)}"
+        if labels is not None and labels[index - 1]:
+            heading = f"{heading}: {labels[index - 1]}"
+        content.append({"type": "text", "text": heading})
+        content.append(_image_block(image_data, content_type))
+    content.append({"type": "text", "text": text})
+    return _prompt(content, system_prompt, max_tokens, temperature, cache_system_prompt)
+
+
+def parse_json_response(text: str) -> Dict[str, Any]:
+    """Parse a JSON object out of a model response.
+
+    Tolerates Markdown code fences, text around the object and raw control
+    characters inside string values.
+
+    Args:
+        text: Model response text
+
+    Returns:
+        Dict[str, Any]: The parsed JSON object
+
+    Raises:
+        ValueError: If the response does not contain a JSON object
+    """
+    start = text.find("{")
+    end = text.rfind("}")
+    if start == -1 or end < start:
+        raise ValueError("Model response does not contain a JSON object")
+    try:
+        parsed = json.loads(text[start : end + 1], strict=False)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Model response is not valid JSON: {e}") from e
+    if not isinstance(parsed, dict):
+        raise ValueError("Model response JSON is not an object")
+    return parsed
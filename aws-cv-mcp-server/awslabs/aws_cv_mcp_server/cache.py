@@ -0,0 +1,353 @@
+#
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You may not use this file except in compliance
+# with the License. A copy of the License is located at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# or in the 'license' file accompanying this file. This file is distributed on an 'AS IS' BASIS, WITHOUT WARRANTIES
+# OR CONDITIONS OF ANY KIND, express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+#
+
+"""Caches used to avoid repeated S3 downloads and Bedrock invocations."""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Generic, Optional, Tuple, TypeVar
+
+
+logger = logging.getLogger(__name__)
+
+V = TypeVar('V')
+
+
+def make_cache_key(*parts: Any) -> str:
+    """Build a stable SHA-256 cache key from JSON-serializable parts."""
+    encoded = json.dumps(parts, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+class LRUCache(Generic[V]):
+    """Thread-safe in-memory LRU cache with TTL and size-based eviction.
+
+    Entries are evicted least recently used first once either ``max_entries``
+    or ``max_bytes`` is exceeded; None disables that limit. ``sizeof``
+    reports the size of a value in bytes and defaults to one per entry.
+    """
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = 1024,
+        max_bytes: Optional[int] = None,
+        ttl: Optional[float] = None,
+        sizeof: Optional[Callable[[V], int]] = None,
+    ):
+        """Create an empty cache."""
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._sizeof = sizeof or (lambda value: 1)
+        self._entries: 'OrderedDict[str, Tuple[V, int, Optional[float]]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        """Return the number of live entries."""
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[V]:
+        """Return the cached value for ``key``, or None if absent or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, _, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: V, ttl: Optional[float] = None) -> None:
+        """Store ``value`` under ``key``, evicting older entries as needed."""
+        size = self._sizeof(value)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, size, expires_at)
+            self.total_bytes += size
+            while self._over_budget():
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def pop(self, key: str) -> Optional[V]:
+        """Remove ``key`` and return its value, if present."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._remove(key)
+            return entry[0]
+
+    def clear(self) -> None:
+        """Drop every entry."""
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+    def _over_budget(self) -> bool:
+        if self.max_entries is not None and len(self._entries) > self.max_entries:
+            return True
+        return self.max_bytes is not None and self.total_bytes > self.max_bytes
+
+    def _remove(self, key: str) -> None:
+        _, size, _ = self._entries.pop(key)
+        self.total_bytes -= size
+
+
+class DiskCache:
+    """JSON-file cache tier that survives process restarts.
+
+    Each entry is written atomically to ``<directory>/<key[:2]>/<key>.json``
+    together with its expiry time, so a restarted container picks up where the
+    previous one left off.
+    """
+
+    def __init__(self, directory: str, ttl: Optional[float] = None):
+        """Create the cache directory if needed and drop expired entries."""
+        self.directory = directory
+        self.ttl = ttl
+        os.makedirs(directory, exist_ok=True)
+        self.prune()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f'{key}.json')
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the stored value for ``key``, or None if absent or expired."""
+        path = self._path(key)
+        try:
+            with open(path, encoding='utf-8') as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f'Discarding unreadable cache entry {path}: {e}')
+            self._unlink(path)
+            return None
+        expires_at = entry.get('expires_at')
+        if expires_at is not None and expires_at <= time.time():
+            self._unlink(path)
+            return None
+        return entry.get('value')
+
+    def set(self, key: str, value: Any) -> None:
+        """Persist a JSON-serializable ``value`` under ``key``."""
+        path = self._path(key)
+        expires_at = time.time() + self.ttl if self.ttl else None
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'expires_at': expires_at, 'value': value}, f)
+            os.replace(temp_path, path)
+        except Exception:
+            self._unlink(temp_path)
+            raise
+
+    def prune(self) -> int:
+        """Delete expired entries and return how many were removed."""
+        removed = 0
+        now = time.time()
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                if name.endswith('.tmp'):
+                    self._unlink(path)
+                    continue
+                try:
+                    with open(path, encoding='utf-8') as f:
+                        expires_at = json.load(f).get('expires_at')
+                except (OSError, ValueError):
+                    expires_at = 0
+                if expires_at is not None and expires_at <= now:
+                    self._unlink(path)
+                    removed += 1
+        return removed
+
+    @staticmethod
+    def _unlink(path: str) -> None:
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+
+class ResultCache:
+    """Two-tier cache of JSON-serializable analysis results.
+
+    Lookups hit the in-memory LRU first and fall back to the optional disk tier;
+    disk hits are promoted back into memory.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        max_bytes: Optional[int] = None,
+        ttl: Optional[float] = None,
+        directory: Optional[str] = None,
+        enabled: bool = True,
+    ):
+        """Create the cache; ``directory`` enables the on-disk tier."""
+        self.enabled = enabled
+        self.memory: LRUCache[Dict[str, Any]] = LRUCache(
+            max_entries=max_entries,
+            max_bytes=max_bytes,
+            ttl=ttl,
+            sizeof=lambda value: len(json.dumps(value)),
+        )
+        self.disk = DiskCache(directory, ttl=ttl) if directory else None
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached result for ``key`` and update the hit counters."""
+        if not self.enabled:
+            return None
+        value = self.memory.get(key)
+        if value is None and self.disk is not None:
+            value = self.disk.get(key)
+            if value is not None:
+                self.disk_hits += 1
+                self.memory.set(key, value)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        """Store a result in every enabled tier."""
+        if not self.enabled:
+            return
+        self.memory.set(key, value)
+        if self.disk is not None:
+            try:
+                self.disk.set(key, value)
+            except OSError as e:
+                logger.warning(f'Could not write result cache entry to disk: {e}')
+
+    def clear(self) -> None:
+        """Drop every in-memory entry and reset the counters."""
+        self.memory.clear()
+        self.hits = self.misses = self.disk_hits = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and current occupancy."""
+        lookups = self.hits + self.misses
+        return {
+            'enabled': self.enabled,
+            'hits': self.hits,
+            'misses': self.misses,
+            'disk_hits': self.disk_hits,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            'entries': len(self.memory),
+            'bytes': self.memory.total_bytes,
+            'evictions': self.memory.evictions,
+            'disk_enabled': self.disk is not None,
+        }
+
+
+class _Flight:
+    __slots__ = ('task', 'waiters')
+
+    def __init__(self, task: 'asyncio.Future'):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight(Generic[V]):
+    """Share one in-flight coroutine among concurrent callers with the same key.
+
+    The first caller for a key (the leader) starts the work as a separate task;
+    callers arriving before it finishes (followers) await the same task. The
+    outcome, result or exception, is delivered to every caller and nothing is
+    remembered once the task is done. A caller that is cancelled stops waiting
+    without affecting the others; the task itself is cancelled only when every
+    caller waiting on it has gone.
+    """
+
+    def __init__(self, enabled: bool = True):
+        """Create a group with no calls in flight."""
+        self.enabled = enabled
+        self._flights: Dict[str, _Flight] = {}
+        self.leaders = 0
+        self.followers = 0
+        self.cancelled = 0
+
+    def __len__(self) -> int:
+        """Return the number of keys with a call in flight."""
+        return len(self._flights)
+
+    async def do(self, key: str, func: Callable[[], Awaitable[V]]) -> Tuple[V, bool]:
+        """Run ``func`` for ``key`` unless an identical call is already in flight.
+
+        Returns:
+            The call's result and whether it was shared with an earlier caller
+        """
+        if not self.enabled:
+            return await func(), False
+        flight = self._flights.get(key)
+        shared = flight is not None
+        if flight is None:
+            flight = self._flights[key] = _Flight(asyncio.ensure_future(func()))
+            flight.task.add_done_callback(lambda task: self._forget(key, flight))
+            self.leaders += 1
+        else:
+            self.followers += 1
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task), shared
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # Nobody is left to receive the result; later callers start afresh
+                self._forget(key, flight)
+                flight.task.cancel()
+                self.cancelled += 1
+
+    def _forget(self, key: str, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    def clear(self) -> None:
+        """Reset the counters; calls already in flight run to completion."""
+        self.leaders = self.followers = self.cancelled = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Return how many callers started work and how many joined a call in flight."""
+        calls = self.leaders + self.followers
+        return {
+            'enabled': self.enabled,
+            'hits': self.followers,
+            'misses': self.leaders,
+            'hit_rate': round(self.followers / calls, 4) if calls else 0.0,
+            'in_flight': len(self._flights),
+            'cancelled': self.cancelled,
+        }
@@ -4,26 +4,140 @@
 # available at http://aws.amazon.com/agreement or other written agreement between
 # Customer and either Amazon Web Services, Inc. or Amazon Web Services EMEA SARL or both.
 
+import asyncio
 import os
-import boto3
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, Optional, Tuple, TypeVar
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+
+class _Lazy:
+    """Class attribute computed on first access and then reused.
+
+    Assigning the attribute on the class (as tests do with stub clients)
+    replaces the lazy value entirely.
+    """
+
+    def __init__(self, factory: Callable[[type], Any]):
+        self.factory = factory
+        self.value = None
+
+    def __get__(self, instance, owner):
+        if self.value is None:
+            with owner._lock:
+                if self.value is None:
+                    self.value = self.factory(owner)
+        return self.value
+
+
 class Connections:
-    """AWS service connections using a shared boto3 session."""
-    
+    """AWS service connections using a shared boto3 session.
+
+    The session and clients are created on first use, so importing the server
+    does not pay for loading service models on code paths that never call AWS.
+    """
+
     logger = logger
     region_name = os.environ.get("AWS_REGION", "us-east-1")
     agent_bucket_name = os.environ.get("AGENT_BUCKET_NAME", "your-agent-bucket-name")
-    
-    # Create a single boto3 session for all AWS service clients
-    session = boto3.Session(
-        region_name=region_name,
-        aws_access_key_id=os.environ.get("AWS_ACCESS_KEY_ID"),
-        aws_secret_access_key=os.environ.get("AWS_SECRET_ACCESS_KEY")
+
+    # Upper bound on blocking AWS calls (S3 fetches, Bedrock invocations) running at once
+    max_concurrency = int(os.environ.get("AWS_MAX_CONCURRENCY", "16"))
+
+    # botocore settings shared by every client; the pool is sized so that a full
+    # executor never waits for a free HTTP connection
+    max_pool_connections = int(
+        os.environ.get("AWS_MAX_POOL_CONNECTIONS", str(max(max_concurrency, 10)))
     )
-    
-    # Initialize AWS service clients using the shared session
-    s3_client = session.client("s3")
-    bedrock_client = session.client("bedrock-runtime") 
\ No newline at end of file
+    retry_mode = os.environ.get("AWS_RETRY_MODE", "adaptive")
+    max_attempts = int(os.environ.get("AWS_MAX_ATTEMPTS", "3"))
+    # Bedrock runtime throttling is retried by the shared rate limiter, which needs to see it
+    bedrock_max_attempts = int(os.environ.get("AWS_BEDROCK_MAX_ATTEMPTS", "1"))
+    connect_timeout = float(os.environ.get("AWS_CONNECT_TIMEOUT", "5"))
+    read_timeout = float(os.environ.get("AWS_READ_TIMEOUT", "120"))
+    tcp_keepalive = os.environ.get("AWS_TCP_KEEPALIVE", "true").lower() == "true"
+
+    _lock = threading.RLock()
+    _clients: Dict[Tuple[str, str], Any] = {}
+
+    # Create a single boto3 session for all AWS service clients
+    session = _Lazy(lambda cls: cls._create_session())
+
+    # AWS service clients, created from the shared session on first use
+    s3_client = _Lazy(lambda cls: cls.client("s3"))
+    bedrock_client = _Lazy(lambda cls: cls.client("bedrock-runtime"))
+    sqs_client = _Lazy(lambda cls: cls.client("sqs"))
+
+    # Worker threads that run the blocking boto3 calls off the event loop
+    executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="aws-cv")
+
+    @classmethod
+    def _create_session(cls):
+        import boto3
+
+        return boto3.Session(
+            region_name=cls.region_name,
+            aws_access_key_id=os.environ.get("AWS_ACCESS_KEY_ID"),
+            aws_secret_access_key=os.environ.get("AWS_SECRET_ACCESS_KEY"),
+        )
+
+    @classmethod
+    def client_config(cls, service_name: Optional[str] = None):
+        """Return the botocore Config for a service's clients."""
+        from botocore.config import Config
+
+        max_attempts = (
+            cls.bedrock_max_attempts if service_name == "bedrock-runtime" else cls.max_attempts
+        )
+        return Config(
+            max_pool_connections=cls.max_pool_connections,
+            retries={"mode": cls.retry_mode, "total_max_attempts": max_attempts},
+            connect_timeout=cls.connect_timeout,
+            read_timeout=cls.read_timeout,
+            tcp_keepalive=cls.tcp_keepalive,
+        )
+
+    @classmethod
+    def client(cls, service_name: str, region_name: Optional[str] = None):
+        """Return the shared client for a service and region, creating it on first use.
+
+        boto3 sessions are not thread-safe, so creation is serialized.
+        """
+        key = (service_name, region_name or cls.region_name)
+        client = cls._clients.get(key)
+        if client is None:
+            with cls._lock:
+                client = cls._clients.get(key)
+                if client is None:
+                    client = cls.session.client(
+                        service_name, region_name=key[1], config=cls.client_config(service_name)
+                    )
+                    cls._clients[key] = client
+        return client
+
+    @classmethod
+    def configure_executor(cls, max_concurrency: int) -> None:
+        """Replace the shared executor with one allowing ``max_concurrency`` calls in flight.
+
+        Clients that already exist keep their connection pool size.
+        """
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        previous = cls.executor
+        cls.max_concurrency = max_concurrency
+        cls.executor = ThreadPoolExecutor(
+            max_workers=max_concurrency, thread_name_prefix="aws-cv"
+        )
+        previous.shutdown(wait=False)
+
+
+async def run_in_executor(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run a blocking AWS call on the shared executor without blocking the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(Connections.executor, partial(func, *args, **kwargs))
@@ -13,60 +13,680 @@
 
 """Computer vision tools for analyzing images using Amazon Bedrock."""
 
+import asyncio
+import hashlib
+import json
 import logging
 import os
-from typing import Optional
-from awslabs.aws_cv_mcp_server.connections import Connections
-from awslabs.aws_cv_mcp_server.models import ImageAnalysisResponse
-from awslabs.aws_cv_mcp_server.bedrock_utils import create_multimodal_prompt, invoke_bedrock_model
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, List, Optional
+from awslabs.aws_cv_mcp_server.admission import request_admission
+from awslabs.aws_cv_mcp_server.cache import ResultCache, SingleFlight, make_cache_key
+from awslabs.aws_cv_mcp_server.dedup import near_duplicate_index
+from awslabs.aws_cv_mcp_server.event_store import event_store
+from awslabs.aws_cv_mcp_server.metrics import record_error, stage_seconds
+from awslabs.aws_cv_mcp_server.image_processing import (
+    compose_grid,
+    preprocess_image,
+    resolve_preprocessing,
+)
+from awslabs.aws_cv_mcp_server.models import (
+    BatchImageAnalysisResponse,
+    GridAnalysisResponse,
+    ImageAnalysisResponse,
+    ImageComparisonResponse,
+    ImagePreprocessingOptions,
+    TokenUsage,
+)
+from awslabs.aws_cv_mcp_server.bedrock_utils import (
+    DEFAULT_MODEL_ID,
+    create_multi_image_prompt,
+    create_multimodal_prompt,
+    invoke_bedrock_model_async,
+    invoke_bedrock_model_stream_async,
+    parse_json_response,
+)
+from awslabs.aws_cv_mcp_server.motion_filter import motion_filter
+from awslabs.aws_cv_mcp_server.prompt_templates import (
+    ANALYZE_GRID_AGENT_PROMPT,
+    ANALYZE_GRID_SYSTEM_PROMPT,
+    COMPARE_IMAGES_SYSTEM_PROMPT,
+    DESCRIBE_IMAGE_SYSTEM_PROMPT,
+)
+from awslabs.aws_cv_mcp_server.s3_utils import (
+    fetch_image,
+    fetch_image_etag,
+    fetch_image_keys,
+    fetch_image_objects,
+    image_cache,
+)
 
 logger = logging.getLogger(__name__)
 
+BATCH_MAX_CONCURRENCY = int(os.environ.get('CV_BATCH_MAX_CONCURRENCY', '8'))
+BATCH_MAX_IMAGES = int(os.environ.get('CV_BATCH_MAX_IMAGES', '200'))
+COMPARE_MAX_IMAGES = int(os.environ.get('CV_COMPARE_MAX_IMAGES', '8'))
+GRID_MAX_FRAMES = int(os.environ.get('CV_GRID_MAX_FRAMES', '16'))
+GRID_MAX_LISTED = int(os.environ.get('CV_GRID_MAX_LISTED', '1000'))
+GRID_TILE_WIDTH = int(os.environ.get('CV_GRID_TILE_WIDTH', '512'))
+NO_MOTION = 'no motion detected'
+
+# Cache of successful analyses keyed on image identity, prompt and model parameters
+result_cache = ResultCache(
+    max_entries=int(os.environ.get('CV_RESULT_CACHE_MAX_ENTRIES', '1024')),
+    max_bytes=int(os.environ.get('CV_RESULT_CACHE_MAX_BYTES', str(16 * 1024 * 1024))),
+    ttl=float(os.environ.get('CV_RESULT_CACHE_TTL', '3600')),
+    directory=os.environ.get('CV_RESULT_CACHE_DIR') or None,
+    enabled=os.environ.get('CV_RESULT_CACHE_ENABLED', 'true').lower() == 'true',
+)
+
+# Identical describe_image calls in flight at the same time share one analysis
+in_flight_analyses: SingleFlight[ImageAnalysisResponse] = SingleFlight(
+    enabled=os.environ.get('CV_COALESCE_ENABLED', 'true').lower() == 'true',
+)
+
+
+def analysis_cache_key(
+    image_digest: str,
+    monitoring_instructions: str,
+    system_prompt: str,
+    model_id: str,
+    max_tokens: int,
+    temperature: float,
+    preprocessing: ImagePreprocessingOptions,
+) -> str:
+    """Build the result cache key for one image analysis."""
+    return make_cache_key(
+        image_digest,
+        monitoring_instructions,
+        system_prompt,
+        model_id,
+        max_tokens,
+        temperature,
+        preprocessing.model_dump(),
+    )
+
+
 async def describe_image(
     image_file_name: str,
     monitoring_instructions: str,
+    model_id: str = DEFAULT_MODEL_ID,
+    max_tokens: int = 1000,
+    temperature: float = 0.5,
+    preprocessing: Optional[ImagePreprocessingOptions] = None,
+    on_text: Optional[Callable[[str], Awaitable[None]]] = None,
+    deduplicate: bool = False,
 ) -> ImageAnalysisResponse:
     """Analyze an image using Amazon Bedrock's Claude model.
 
+    Successful analyses are cached on the image ETag, the instructions, the
+    system prompt and the model parameters, so repeating a request for an
+    unchanged image skips both the download and the Bedrock call. Image
+    bytes are cached separately and revalidated with a conditional GET.
+
+    With ``deduplicate``, an image under the same S3 prefix whose perceptual
+    hash is within a few bits of a recently analyzed one reuses that image's
+    analysis. It is off by default: a small change, such as a person entering
+    a corner of the frame, can stay within that distance.
+
+    New analyses, including reused near-duplicate ones, are recorded in the
+    event store so search_events can answer questions about them later.
+
+    Concurrent calls for the same key, instructions and model parameters share
+    a single download and Bedrock call; every caller gets the first caller's
+    response, including its error. Streaming calls are never shared, since
+    each needs its own partial text.
+
     Args:
         image_file_name: The name of the image file in S3 to analyze
         monitoring_instructions: Specific instructions for what to monitor or analyze in the image
+        model_id: Bedrock model ID to use
+        max_tokens: Maximum tokens for the analysis
+        temperature: Temperature for response generation
+        preprocessing: Downscaling and re-encoding options; unset fields use the server defaults
+        on_text: If given, the response is streamed and partial text is passed to this coroutine
+        deduplicate: Reuse the analysis of a recent near-identical image from the same prefix
 
     Returns:
         ImageAnalysisResponse: Response containing the analysis results
     """
+    preprocessing = resolve_preprocessing(preprocessing)
+
+    async def analyze() -> ImageAnalysisResponse:
+        return await _describe_image(
+            image_file_name,
+            monitoring_instructions,
+            model_id,
+            max_tokens,
+            temperature,
+            preprocessing,
+            on_text,
+            deduplicate,
+        )
+
+    if on_text is not None:
+        return await analyze()
+    key = make_cache_key(
+        image_file_name,
+        monitoring_instructions,
+        model_id,
+        max_tokens,
+        temperature,
+        preprocessing.model_dump(),
+        deduplicate,
+    )
+    response, shared = await in_flight_analyses.do(key, analyze)
+    if not shared:
+        return response
+    if response.status != 'success':
+        return response.model_copy(deep=True)
+    # Tokens are reported once, to the caller that started the analysis
+    return response.model_copy(
+        update={
+            'usage': None,
+            'message': 'Image analysis shared with a concurrent identical request',
+        },
+        deep=True,
+    )
+
+
+async def _describe_image(
+    image_file_name: str,
+    monitoring_instructions: str,
+    model_id: str,
+    max_tokens: int,
+    temperature: float,
+    preprocessing: ImagePreprocessingOptions,
+    on_text: Optional[Callable[[str], Awaitable[None]]],
+    deduplicate: bool,
+) -> ImageAnalysisResponse:
+    """Run one analysis for describe_image; ``preprocessing`` is already resolved."""
     try:
+        image = None
+        cache_key = None
+        if result_cache.enabled:
+            # A revalidated image-cache hit is as cheap as a HEAD request
+            etag = None
+            with stage_seconds.time(operation='describe_image', stage='s3_fetch'):
+                if image_cache.enabled:
+                    image = await fetch_image(image_file_name)
+                    etag = image.etag
+                else:
+                    etag = await fetch_image_etag(image_file_name)
+                if etag is None and image is None:
+                    image = await fetch_image(image_file_name)
+            image_digest = etag or hashlib.sha256(image.data).hexdigest()
+            cache_key = analysis_cache_key(
+                image_digest,
+                monitoring_instructions,
+                DESCRIBE_IMAGE_SYSTEM_PROMPT,
+                model_id,
+                max_tokens,
+                temperature,
+                preprocessing,
+            )
+            cached = result_cache.get(cache_key)
+            if cached is not None:
+                return ImageAnalysisResponse(
+                    **{
+                        **cached,
+                        'source': image_file_name,
+                        'usage': None,
+                        'message': 'Image analysis served from cache',
+                    }
+                )
+
         # Get the image from S3
-        response = Connections.s3_client.get_object(
-            Bucket=Connections.agent_bucket_name,
-            Key=image_file_name
-        )
-        image_data = response['Body'].read()
-        content_type = response['ContentType']
+        if image is None:
+            with stage_seconds.time(operation='describe_image', stage='s3_fetch'):
+                image = await fetch_image(image_file_name)
+
+        # Reuse the analysis of a recent near-identical snapshot from the same camera
+        image_hash = None
+        namespace = None
+        if deduplicate and near_duplicate_index.enabled:
+            namespace = make_cache_key(
+                os.path.dirname(image_file_name),
+                monitoring_instructions,
+                DESCRIBE_IMAGE_SYSTEM_PROMPT,
+                model_id,
+                max_tokens,
+                temperature,
+                preprocessing.model_dump(),
+            )
+            image_hash = await asyncio.to_thread(near_duplicate_index.hash_image, image.data)
+            match = (
+                near_duplicate_index.lookup(namespace, image_hash)
+                if image_hash is not None
+                else None
+            )
+            if match is not None:
+                distance, previous = match
+                response = ImageAnalysisResponse(
+                    **{
+                        **previous,
+                        'source': image_file_name,
+                        'usage': None,
+                        'message': (
+                            f"Near-duplicate of {previous['source']} "
+                            f'(hash distance {distance}); reused its analysis'
+                        ),
+                    }
+                )
+                # A new frame of an unchanged scene is still an event at its own time
+                event_store.record_analysis(response, image.last_modified, model_id)
+                return response
+
+        # Downscale and re-encode before the image is base64 encoded
+        with stage_seconds.time(operation='describe_image', stage='preprocess'):
+            image_data, content_type = await asyncio.to_thread(
+                preprocess_image, image.data, image.content_type, preprocessing
+            )
 
         # Create the prompt for Claude
-        prompt = create_multimodal_prompt(
-            image_data=image_data,
-            text=monitoring_instructions,
-            content_type=content_type,
-            system_prompt="You are a helpful assistant that analyzes images. Provide detailed, accurate descriptions based on the user's instructions."
-        )
+        with stage_seconds.time(operation='describe_image', stage='encode'):
+            prompt = create_multimodal_prompt(
+                image_data=image_data,
+                text=monitoring_instructions,
+                content_type=content_type,
+                system_prompt=DESCRIBE_IMAGE_SYSTEM_PROMPT,
+                max_tokens=max_tokens,
+                temperature=temperature,
+            )
 
         # Get analysis from Claude
-        analysis = invoke_bedrock_model(prompt)
+        with stage_seconds.time(operation='describe_image', stage='bedrock'):
+            if on_text is not None:
+                result = await invoke_bedrock_model_stream_async(prompt, on_text, model_id=model_id)
+            else:
+                result = await invoke_bedrock_model_async(prompt, model_id=model_id)
 
-        return ImageAnalysisResponse(
+        response = ImageAnalysisResponse(
             status="success",
             source=image_file_name,
-            analysis=analysis,
+            analysis=result.text,
+            usage=TokenUsage(**result.usage),
             message="Image analysis completed successfully"
         )
+        if cache_key is not None:
+            result_cache.set(cache_key, response.model_dump())
+        if image_hash is not None:
+            near_duplicate_index.add(namespace, image_hash, response.model_dump())
+        event_store.record_analysis(response, image.last_modified, model_id)
+        return response
 
     except Exception as e:
         logger.error(f"Error analyzing image: {str(e)}")
+        record_error('describe_image', e)
         return ImageAnalysisResponse(
             status="error",
             source=image_file_name,
             analysis=None,
             message=f"Error analyzing image: {str(e)}"
         )
+
+
+async def describe_images(
+    monitoring_instructions: str,
+    image_file_names: Optional[List[str]] = None,
+    prefix: Optional[str] = None,
+    max_concurrency: int = BATCH_MAX_CONCURRENCY,
+    max_images: int = BATCH_MAX_IMAGES,
+    model_id: str = DEFAULT_MODEL_ID,
+    max_tokens: int = 1000,
+    temperature: float = 0.5,
+    preprocessing: Optional[ImagePreprocessingOptions] = None,
+    start_after: Optional[str] = None,
+) -> BatchImageAnalysisResponse:
+    """Analyze several images with shared instructions.
+
+    Images are analyzed concurrently, at most ``max_concurrency`` at a time,
+    and each analysis is admitted separately by ``request_admission``. A
+    failure on one image, including being shed, is reported in its own result
+    and does not fail the rest of the batch. When a prefix holds more images than fit in the batch,
+    the response is marked ``truncated`` and ``next_start_after`` is the key to
+    continue from.
+
+    Args:
+        monitoring_instructions: Instructions applied to every image
+        image_file_names: Explicit list of S3 keys to analyze
+        prefix: S3 prefix whose images are analyzed, in key order
+        max_concurrency: Maximum number of images analyzed at once
+        max_images: Maximum number of images in the batch
+        model_id: Bedrock model ID to use
+        max_tokens: Maximum tokens for each analysis
+        temperature: Temperature for response generation
+        preprocessing: Downscaling and re-encoding options applied to every image
+        start_after: Only list prefix keys that sort after this one
+
+    Returns:
+        BatchImageAnalysisResponse: Per-image results in request order
+    """
+    next_start_after = None
+    try:
+        keys = list(image_file_names or [])
+        if prefix:
+            # One key past the limit tells us whether the listing was cut short
+            room = max(0, max_images - len(keys))
+            listed = await fetch_image_keys(prefix, max_keys=room + 1, start_after=start_after)
+            if len(listed) > room:
+                listed = listed[:room]
+                next_start_after = listed[-1] if listed else start_after
+            keys.extend(listed)
+        if not keys:
+            return BatchImageAnalysisResponse(
+                status='error', message='No images were given and none were found under the prefix'
+            )
+        if len(keys) > max_images:
+            return BatchImageAnalysisResponse(
+                status='error',
+                message=f'Batch of {len(keys)} images exceeds the limit of {max_images}',
+            )
+    except Exception as e:
+        logger.error(f"Error listing images: {str(e)}")
+        return BatchImageAnalysisResponse(status='error', message=f'Error listing images: {str(e)}')
+
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def analyze(key: str) -> ImageAnalysisResponse:
+        # Each image takes its own admission slot, so a batch counts as the
+        # analyses it runs rather than as one request
+        async with semaphore, request_admission.slot():
+            return await describe_image(
+                image_file_name=key,
+                monitoring_instructions=monitoring_instructions,
+                model_id=model_id,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                preprocessing=preprocessing,
+            )
+
+    outcomes = await asyncio.gather(*[analyze(key) for key in keys], return_exceptions=True)
+    results = []
+    for key, outcome in zip(keys, outcomes):
+        if isinstance(outcome, BaseException):
+            outcome = ImageAnalysisResponse(
+                status='error', source=key, message=f'Error analyzing image: {str(outcome)}'
+            )
+        results.append(outcome)
+
+    failed = sum(1 for result in results if result.status == 'error')
+    succeeded = len(results) - failed
+    if failed == 0:
+        status = 'success'
+    elif succeeded == 0:
+        status = 'error'
+    else:
+        status = 'partial'
+    message = f'Analyzed {succeeded} of {len(results)} images successfully'
+    if next_start_after is not None:
+        message += (
+            f'; more images remain under {prefix}, continue with start_after={next_start_after}'
+        )
+    return BatchImageAnalysisResponse(
+        status=status,
+        results=results,
+        succeeded=succeeded,
+        failed=failed,
+        truncated=next_start_after is not None,
+        next_start_after=next_start_after,
+        message=message,
+    )
+
+
+async def compare_images(
+    image_file_names: List[str],
+    comparison_instructions: str,
+    model_id: str = DEFAULT_MODEL_ID,
+    max_tokens: int = 1500,
+    temperature: float = 0.5,
+    preprocessing: Optional[ImagePreprocessingOptions] = None,
+    max_images: int = COMPARE_MAX_IMAGES,
+) -> ImageComparisonResponse:
+    """Compare several images in a single Bedrock request.
+
+    The images are downloaded and preprocessed concurrently, then sent as one
+    user message in the given order. Each image is preceded by a label with its
+    position, S3 key and upload time, so the model can say which image
+    changed. This replaces one describe_image call per image plus a call to
+    compare the descriptions.
+
+    Args:
+        image_file_names: S3 keys of the images, in the order they should be compared
+        comparison_instructions: What to compare or look for across the images
+        model_id: Bedrock model ID to use
+        max_tokens: Maximum tokens for the analysis
+        temperature: Temperature for response generation
+        preprocessing: Downscaling and re-encoding options applied to every image
+        max_images: Maximum number of images in one request
+
+    Returns:
+        ImageComparisonResponse: The comparative analysis
+    """
+    sources = list(image_file_names or [])
+    if len(sources) < 2:
+        return ImageComparisonResponse(
+            status='error',
+            sources=sources,
+            message='At least two images are needed for a comparison',
+        )
+    if len(sources) > max_images:
+        return ImageComparisonResponse(
+            status='error',
+            sources=sources,
+            message=f'Comparison of {len(sources)} images exceeds the limit of {max_images}',
+        )
+
+    try:
+        preprocessing = resolve_preprocessing(preprocessing)
+        with stage_seconds.time(operation='compare_images', stage='s3_fetch'):
+            images = await asyncio.gather(*[fetch_image(key) for key in sources])
+
+        with stage_seconds.time(operation='compare_images', stage='preprocess'):
+            processed = await asyncio.gather(
+                *[
+                    asyncio.to_thread(
+                        preprocess_image, image.data, image.content_type, preprocessing
+                    )
+                    for image in images
+                ]
+            )
+
+        labels = [
+            f'{image.key} (uploaded {_utc_label(image.last_modified)})'
+            if image.last_modified
+            else image.key
+            for image in images
+        ]
+        with stage_seconds.time(operation='compare_images', stage='encode'):
+            prompt = create_multi_image_prompt(
+                images=processed,
+                text=comparison_instructions,
+                labels=labels,
+                system_prompt=COMPARE_IMAGES_SYSTEM_PROMPT,
+                max_tokens=max_tokens,
+                temperature=temperature,
+            )
+
+        with stage_seconds.time(operation='compare_images', stage='bedrock'):
+            result = await invoke_bedrock_model_async(prompt, model_id=model_id)
+    except Exception as e:
+        logger.error(f"Error comparing images: {str(e)}")
+        record_error('compare_images', e)
+        return ImageComparisonResponse(
+            status='error', sources=sources, message=f'Error comparing images: {str(e)}'
+        )
+
+    return ImageComparisonResponse(
+        status='success',
+        sources=sources,
+        analysis=result.text,
+        usage=TokenUsage(**result.usage),
+        message=f'Compared {len(sources)} images in one request',
+    )
+
+
+async def analyze_grid(
+    monitoring_instruction: str,
+    frame_keys: Optional[List[str]] = None,
+    prefix: Optional[str] = None,
+    max_frames: int = GRID_MAX_FRAMES,
+    columns: Optional[int] = None,
+    timestamp: Optional[str] = None,
+    motion_threshold: Optional[float] = None,
+    model_id: str = DEFAULT_MODEL_ID,
+    max_tokens: int = 2000,
+    temperature: float = 0.5,
+) -> GridAnalysisResponse:
+    """Analyze a sequence of camera frames as one grid image.
+
+    The frames are tiled into a single labelled grid and sent to Claude in one
+    request with the ANALYZE_GRID prompts, which asks for a JSON alert. When the
+    local motion filter finds no change between the frames, the model call is
+    skipped and the 'no motion detected' alert the prompt asks for is returned.
+    Alerts from the model are recorded in the event store.
+
+    Args:
+        monitoring_instruction: Extra instructions for what to watch for
+        frame_keys: S3 keys of the frames, in time order
+        prefix: S3 prefix whose most recent ``max_frames`` images are used, oldest first;
+            it may hold at most ``CV_GRID_MAX_LISTED`` images
+        max_frames: Maximum number of frames in the grid
+        columns: Number of frames per grid row; defaults to a near-square layout
+        timestamp: Timestamp (YYYYMMDD-HHMMSS) for the log file name; defaults to the last frame's
+        motion_threshold: Fraction of changed pixels below which the frames count as static;
+            defaults to the server setting, 0 always calls the model
+        model_id: Bedrock model ID to use
+        max_tokens: Maximum tokens for the analysis
+        temperature: Temperature for response generation
+
+    Returns:
+        GridAnalysisResponse: The parsed alert
+    """
+    sources: List[str] = []
+    try:
+        if frame_keys:
+            sources = list(frame_keys)
+        elif prefix:
+            with stage_seconds.time(operation='analyze_grid', stage='s3_list'):
+                objects = await fetch_image_objects(prefix, max_keys=GRID_MAX_LISTED + 1)
+            if len(objects) > GRID_MAX_LISTED:
+                return GridAnalysisResponse(
+                    status='error',
+                    message=(
+                        f'Prefix {prefix} holds more than {GRID_MAX_LISTED} images; '
+                        'pass frame_keys or a narrower prefix such as one day of frames'
+                    ),
+                )
+            objects.sort(key=lambda obj: (obj['LastModified'], obj['Key']))
+            sources = [obj['Key'] for obj in objects[-max_frames:]]
+        if not sources:
+            return GridAnalysisResponse(
+                status='error', message='No frames were given and none were found under the prefix'
+            )
+        if len(sources) > max_frames:
+            return GridAnalysisResponse(
+                status='error',
+                sources=sources,
+                message=f'Grid of {len(sources)} frames exceeds the limit of {max_frames}',
+            )
+
+        with stage_seconds.time(operation='analyze_grid', stage='s3_fetch'):
+            frames = await asyncio.gather(*[fetch_image(key) for key in sources])
+        frame_times = [frame.last_modified for frame in frames]
+        labels = [
+            _utc_label(frame_time)
+            if frame_time
+            else frame.key.rsplit('/', 1)[-1]
+            for frame, frame_time in zip(frames, frame_times)
+        ]
+        if timestamp is None:
+            last_time = frame_times[-1] or datetime.now(timezone.utc)
+            timestamp = last_time.astimezone(timezone.utc).strftime('%Y%m%d-%H%M%S')
+
+        with stage_seconds.time(operation='analyze_grid', stage='motion_filter'):
+            static, score = await asyncio.to_thread(
+                motion_filter.should_skip, [frame.data for frame in frames], motion_threshold
+            )
+        if static:
+            return GridAnalysisResponse(
+                status='success',
+                sources=sources,
+                alert_level=0,
+                reason=NO_MOTION,
+                log_file_name=NO_MOTION,
+                brief_description=NO_MOTION,
+                full_description=NO_MOTION,
+                message=f'No motion detected (change score {score:.4f}); model call skipped',
+            )
+
+        with stage_seconds.time(operation='analyze_grid', stage='preprocess'):
+            grid = await asyncio.to_thread(
+                compose_grid,
+                [frame.data for frame in frames],
+                labels,
+                columns,
+                GRID_TILE_WIDTH,
+            )
+
+        with stage_seconds.time(operation='analyze_grid', stage='encode'):
+            prompt = create_multimodal_prompt(
+                image_data=grid,
+                text=ANALYZE_GRID_AGENT_PROMPT.format(
+                    monitoring_instruction=monitoring_instruction, timestamp=timestamp
+                ),
+                content_type='image/jpeg',
+                system_prompt=ANALYZE_GRID_SYSTEM_PROMPT,
+                max_tokens=max_tokens,
+                temperature=temperature,
+            )
+        with stage_seconds.time(operation='analyze_grid', stage='bedrock'):
+            result = await invoke_bedrock_model_async(prompt, model_id=model_id)
+        analysis = result.text
+    except Exception as e:
+        logger.error(f"Error analyzing frame grid: {str(e)}")
+        record_error('analyze_grid', e)
+        return GridAnalysisResponse(
+            status='error', sources=sources, message=f'Error analyzing frame grid: {str(e)}'
+        )
+
+    try:
+        alert = parse_json_response(analysis)
+        alert_level = int(alert['alert_level'])
+    except (KeyError, TypeError, ValueError) as e:
+        logger.error(f"Could not parse grid alert: {str(e)}")
+        record_error('analyze_grid', e)
+        return GridAnalysisResponse(
+            status='error',
+            sources=sources,
+            analysis=analysis,
+            usage=TokenUsage(**result.usage),
+            message=f'Could not parse grid alert: {str(e)}',
+        )
+
+    response = GridAnalysisResponse(
+        status='success',
+        sources=sources,
+        alert_level=alert_level,
+        reason=_as_text(alert.get('reason')),
+        log_file_name=_as_text(alert.get('log_file_name')),
+        brief_description=_as_text(alert.get('brief_description', alert.get('description'))),
+        full_description=_as_text(alert.get('full_description')),
+        analysis=analysis,
+        usage=TokenUsage(**result.usage),
+        message='Grid analysis completed successfully',
+    )
+    event_store.record_alert(response, frame_times[-1], model_id)
+    return response
+
+
+def _utc_label(moment: datetime) -> str:
+    """Format an S3 timestamp for an image label."""
+    return moment.astimezone(timezone.utc).strftime('%Y-%m-%d %H:%M:%S UTC')
+
+
+def _as_text(value) -> Optional[str]:
+    """Coerce a JSON alert field to text; the model sometimes nests objects."""
+    if value is None or isinstance(value, str):
+        return value
+    return json.dumps(value)
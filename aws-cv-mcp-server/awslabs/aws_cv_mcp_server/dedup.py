@@ -0,0 +1,259 @@
+#
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You may not use this file except in compliance
+# with the License. A copy of the License is located at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# or in the 'license' file accompanying this file. This file is distributed on an 'AS IS' BASIS, WITHOUT WARRANTIES
+# OR CONDITIONS OF ANY KIND, express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+#
+
+"""Perceptual hashing and a near-duplicate index for consecutive camera snapshots."""
+
+import io
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+_DCT_SIZE = 32
+_HASH_SIZE = 8
+_dct_matrix = None
+
+
+def dhash(image_data: bytes) -> int:
+    """Return the 64-bit difference hash of an image.
+
+    Each bit records whether a pixel is brighter than its right-hand neighbour
+    in a 9x8 grayscale thumbnail.
+    """
+    import numpy as np
+    from PIL import Image
+
+    image = Image.open(io.BytesIO(image_data))
+    image.draft('L', (_HASH_SIZE + 1, _HASH_SIZE))
+    pixels = np.asarray(
+        image.convert('L').resize((_HASH_SIZE + 1, _HASH_SIZE), Image.Resampling.BILINEAR),
+        dtype=np.int16,
+    )
+    return _pack_bits(pixels[:, 1:] > pixels[:, :-1])
+
+
+def phash(image_data: bytes) -> int:
+    """Return the 64-bit DCT perceptual hash of an image.
+
+    The image is shrunk to 32x32 grayscale, transformed with a 2-D DCT, and each
+    of the 8x8 lowest-frequency coefficients is compared with their median.
+    """
+    import numpy as np
+    from PIL import Image
+
+    global _dct_matrix
+    if _dct_matrix is None:
+        n = np.arange(_DCT_SIZE)
+        _dct_matrix = np.cos(
+            np.pi * (2 * n[np.newaxis, :] + 1) * n[:, np.newaxis] / (2 * _DCT_SIZE)
+        )
+
+    image = Image.open(io.BytesIO(image_data))
+    image.draft('L', (_DCT_SIZE, _DCT_SIZE))
+    pixels = np.asarray(
+        image.convert('L').resize((_DCT_SIZE, _DCT_SIZE), Image.Resampling.BILINEAR),
+        dtype=np.float64,
+    )
+    coefficients = (_dct_matrix @ pixels @ _dct_matrix.T)[:_HASH_SIZE, :_HASH_SIZE]
+    return _pack_bits(coefficients > np.median(coefficients.flatten()[1:]))
+
+
+HASH_FUNCTIONS = {'dhash': dhash, 'phash': phash}
+
+
+def _pack_bits(bits) -> int:
+    import numpy as np
+
+    return int.from_bytes(np.packbits(bits.flatten()).tobytes(), 'big')
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """Return the number of differing bits between two hashes."""
+    return (a ^ b).bit_count()
+
+
+class BKTree:
+    """Burkhard-Keller tree for Hamming-distance range queries over hashes.
+
+    Only ids are stored in the tree. Callers keep the payloads and ignore
+    matches whose id is gone, which makes eviction a dictionary delete.
+    """
+
+    def __init__(self):
+        """Create an empty tree."""
+        self.root: Optional[Tuple[int, int, Dict[int, Any]]] = None
+        self.size = 0
+
+    def add(self, hash_value: int, item_id: int) -> None:
+        """Insert a hash with the id of its payload."""
+        self.size += 1
+        if self.root is None:
+            self.root = (hash_value, item_id, {})
+            return
+        node = self.root
+        while True:
+            distance = hamming_distance(hash_value, node[0])
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = (hash_value, item_id, {})
+                return
+            node = child
+
+    def search(self, hash_value: int, radius: int) -> List[Tuple[int, int]]:
+        """Return (distance, id) pairs for every hash within ``radius`` bits."""
+        matches = []
+        stack = [self.root] if self.root is not None else []
+        while stack:
+            node_hash, item_id, children = stack.pop()
+            distance = hamming_distance(hash_value, node_hash)
+            if distance <= radius:
+                matches.append((distance, item_id))
+            for child_distance in range(distance - radius, distance + radius + 1):
+                child = children.get(child_distance)
+                if child is not None:
+                    stack.append(child)
+        return matches
+
+
+class _Namespace:
+    def __init__(self):
+        self.tree = BKTree()
+        self.entries: 'OrderedDict[int, Tuple[int, float, Any]]' = OrderedDict()
+
+
+class NearDuplicateIndex:
+    """Bounded per-namespace index of recently analyzed image hashes.
+
+    Each namespace (typically a camera prefix plus the analysis parameters) keeps
+    at most ``max_entries`` hashes, and entries older than ``ttl`` seconds are
+    evicted. Evicted ids are dropped from the payload map straight away and
+    the tree is rebuilt once they outnumber the live entries.
+    """
+
+    def __init__(
+        self,
+        max_distance: int = 4,
+        max_entries: int = 256,
+        max_namespaces: int = 1024,
+        ttl: float = 300.0,
+        hash_name: str = 'dhash',
+        enabled: bool = True,
+    ):
+        """Create an empty index."""
+        if hash_name not in HASH_FUNCTIONS:
+            raise ValueError(f'Unknown perceptual hash {hash_name!r}')
+        self.max_distance = max_distance
+        self.max_entries = max_entries
+        self.max_namespaces = max_namespaces
+        self.ttl = ttl
+        self.hash_name = hash_name
+        self.enabled = enabled
+        self._namespaces: 'OrderedDict[str, _Namespace]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self.lookups = 0
+        self.hits = 0
+
+    def hash_image(self, image_data: bytes) -> Optional[int]:
+        """Hash an image, returning None if it cannot be decoded."""
+        try:
+            return HASH_FUNCTIONS[self.hash_name](image_data)
+        except Exception as e:
+            logger.warning(f'Could not compute perceptual hash: {e}')
+            return None
+
+    def lookup(self, namespace: str, hash_value: int) -> Optional[Tuple[int, Any]]:
+        """Return (distance, payload) of the closest live match, if any is close enough."""
+        with self._lock:
+            self.lookups += 1
+            space = self._namespaces.get(namespace)
+            if space is None:
+                return None
+            self._namespaces.move_to_end(namespace)
+            self._expire(space)
+            matches = [
+                (distance, item_id)
+                for distance, item_id in space.tree.search(hash_value, self.max_distance)
+                if item_id in space.entries
+            ]
+            if not matches:
+                return None
+            # Prefer the closest match, then the most recent one
+            distance, item_id = min(matches, key=lambda match: (match[0], -match[1]))
+            self.hits += 1
+            return distance, space.entries[item_id][2]
+
+    def add(self, namespace: str, hash_value: int, payload: Any) -> None:
+        """Record the payload (e.g. an analysis) for a newly analyzed image."""
+        with self._lock:
+            space = self._namespaces.get(namespace)
+            if space is None:
+                space = self._namespaces[namespace] = _Namespace()
+                while len(self._namespaces) > self.max_namespaces:
+                    self._namespaces.popitem(last=False)
+            self._namespaces.move_to_end(namespace)
+            self._next_id += 1
+            space.entries[self._next_id] = (hash_value, time.monotonic(), payload)
+            space.tree.add(hash_value, self._next_id)
+            while len(space.entries) > self.max_entries:
+                space.entries.popitem(last=False)
+            self._expire(space)
+
+    def _expire(self, space: _Namespace) -> None:
+        cutoff = time.monotonic() - self.ttl
+        while space.entries:
+            oldest_id = next(iter(space.entries))
+            if space.entries[oldest_id][1] > cutoff:
+                break
+            del space.entries[oldest_id]
+        if space.tree.size > 2 * len(space.entries):
+            space.tree = BKTree()
+            for item_id, (hash_value, _, _) in space.entries.items():
+                space.tree.add(hash_value, item_id)
+
+    def clear(self) -> None:
+        """Drop every namespace and reset the counters."""
+        with self._lock:
+            self._namespaces.clear()
+            self.lookups = self.hits = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Return lookup counters and current occupancy."""
+        with self._lock:
+            entries = sum(len(space.entries) for space in self._namespaces.values())
+            namespaces = len(self._namespaces)
+        return {
+            'enabled': self.enabled,
+            'hash': self.hash_name,
+            'max_distance': self.max_distance,
+            'lookups': self.lookups,
+            'hits': self.hits,
+            'hit_rate': round(self.hits / self.lookups, 4) if self.lookups else 0.0,
+            'entries': entries,
+            'namespaces': namespaces,
+        }
+
+
+near_duplicate_index = NearDuplicateIndex(
+    max_distance=int(os.environ.get('CV_DEDUP_MAX_DISTANCE', '4')),
+    max_entries=int(os.environ.get('CV_DEDUP_MAX_ENTRIES', '256')),
+    max_namespaces=int(os.environ.get('CV_DEDUP_MAX_NAMESPACES', '1024')),
+    ttl=float(os.environ.get('CV_DEDUP_TTL', '300')),
+    hash_name=os.environ.get('CV_DEDUP_HASH', 'dhash').lower(),
+    enabled=os.environ.get('CV_DEDUP_ENABLED', 'true').lower() == 'true',
+)
@@ -0,0 +1,543 @@
+#
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You may not use this file except in compliance
+# with the License. A copy of the License is located at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# or in the 'license' file accompanying this file. This file is distributed on an 'AS IS' BASIS, WITHOUT WARRANTIES
+# OR CONDITIONS OF ANY KIND, express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+#
+
+"""Local SQLite store of past analyses, searchable by text, time, source and alert level."""
+
+import atexit
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from awslabs.aws_cv_mcp_server.models import GridAnalysisResponse, ImageAnalysisResponse
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = (
+    'kind',
+    'source',
+    'sources',
+    'occurred_at',
+    'recorded_at',
+    'alert_level',
+    'reason',
+    'brief_description',
+    'full_description',
+    'analysis',
+    'model_id',
+    'input_tokens',
+    'output_tokens',
+    'cache_read_input_tokens',
+    'cache_creation_input_tokens',
+)
+TEXT_COLUMNS = ('source', 'reason', 'brief_description', 'full_description', 'analysis')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    source TEXT NOT NULL,
+    sources TEXT,
+    occurred_at REAL NOT NULL,
+    recorded_at REAL NOT NULL,
+    alert_level INTEGER,
+    reason TEXT,
+    brief_description TEXT,
+    full_description TEXT,
+    analysis TEXT,
+    model_id TEXT,
+    input_tokens INTEGER,
+    output_tokens INTEGER,
+    cache_read_input_tokens INTEGER,
+    cache_creation_input_tokens INTEGER
+);
+CREATE INDEX IF NOT EXISTS events_occurred_at ON events (occurred_at);
+CREATE INDEX IF NOT EXISTS events_source ON events (source, occurred_at);
+CREATE INDEX IF NOT EXISTS events_alert_level ON events (alert_level, occurred_at);
+"""
+
+# External-content FTS index kept in step with the events table by triggers
+FTS_SCHEMA = f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS events_fts USING fts5(
+    {', '.join(TEXT_COLUMNS)},
+    content='events',
+    content_rowid='id',
+    tokenize="unicode61 separators '/-_.'"
+);
+CREATE TRIGGER IF NOT EXISTS events_fts_insert AFTER INSERT ON events BEGIN
+    INSERT INTO events_fts (rowid, {', '.join(TEXT_COLUMNS)})
+    VALUES (new.id, {', '.join('new.' + column for column in TEXT_COLUMNS)});
+END;
+CREATE TRIGGER IF NOT EXISTS events_fts_delete AFTER DELETE ON events BEGIN
+    INSERT INTO events_fts (events_fts, rowid, {', '.join(TEXT_COLUMNS)})
+    VALUES ('delete', old.id, {', '.join('old.' + column for column in TEXT_COLUMNS)});
+END;
+"""
+
+
+def _timestamp(value: Optional[Any]) -> Optional[float]:
+    """Convert a datetime or ISO 8601 string to epoch seconds; naive times are UTC."""
+    if value is None or isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.strip().replace('Z', '+00:00'))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def _isoformat(timestamp: Optional[float]) -> Optional[str]:
+    if timestamp is None:
+        return None
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat()
+
+
+def fts_query(text: str) -> Optional[str]:
+    """Turn free text into an FTS5 query matching every word, so user input cannot break it."""
+    words = re.findall(r'\w+', text)
+    return ' '.join(f'"{word}"' for word in words) or None
+
+
+class EventStore:
+    """SQLite store of analysis results with full-text and time-range indexes.
+
+    ``record`` only appends to an in-memory batch; a background thread writes
+    a batch in one transaction once ``batch_size`` events are waiting or
+    ``flush_interval`` seconds have passed, so recording never blocks an
+    analysis on disk I/O. Searches flush pending events first. Without a
+    ``path`` the database lives in memory for the life of the process, so
+    ``max_rows`` should bound it; the shared ``event_store`` does that only
+    when ``CV_EVENT_STORE_PATH`` is ``:memory:``. If SQLite lacks FTS5, text search falls back
+    to substring matching.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        batch_size: int = 200,
+        flush_interval: float = 1.0,
+        retention: Optional[float] = None,
+        max_pending: int = 10000,
+        enabled: bool = True,
+        max_rows: Optional[int] = None,
+    ):
+        """Create the store; the database is opened on first use.
+
+        Args:
+            path: SQLite database file; None keeps the store in memory
+            batch_size: Pending events that trigger an immediate write
+            flush_interval: Longest time in seconds an event waits to be written
+            retention: Seconds events are kept; None keeps them forever
+            max_pending: Pending events kept if writes fail; the oldest are dropped beyond it
+            enabled: Record and search events at all
+            max_rows: Newest events kept; older ones are deleted as new ones are
+                written. None keeps every event
+        """
+        self.path = path
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.retention = retention
+        self.max_pending = max_pending
+        self.enabled = enabled
+        self.max_rows = max_rows or None
+        self.fts = False
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._pending: List[Tuple[Any, ...]] = []
+        self._pending_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+        self._last_pruned = 0.0
+        self.recorded = 0
+        self.written = 0
+        self.batches = 0
+        self.dropped = 0
+        self.evicted = 0
+        self.searches = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            if self.path:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path or ':memory:', check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            if self.path:
+                conn.execute('PRAGMA journal_mode=WAL')
+                conn.execute('PRAGMA synchronous=NORMAL')
+            conn.executescript(SCHEMA)
+            try:
+                conn.executescript(FTS_SCHEMA)
+                self.fts = True
+            except sqlite3.OperationalError as e:
+                logger.warning(f'SQLite FTS5 is unavailable, text search will scan: {e}')
+            self._conn = conn
+        return self._conn
+
+    def record(
+        self,
+        kind: str,
+        source: str,
+        occurred_at: Optional[Any] = None,
+        sources: Optional[Sequence[str]] = None,
+        alert_level: Optional[int] = None,
+        reason: Optional[str] = None,
+        brief_description: Optional[str] = None,
+        full_description: Optional[str] = None,
+        analysis: Optional[str] = None,
+        model_id: Optional[str] = None,
+        usage: Optional[Dict[str, int]] = None,
+    ) -> None:
+        """Queue one event for the next batch write.
+
+        Args:
+            kind: What produced the event, such as ``image`` or ``grid``
+            source: S3 key the event is about; for a grid, its last frame
+            occurred_at: When the image was taken (datetime, ISO string or epoch); defaults to now
+            sources: Every S3 key behind the event, for multi-frame results
+            alert_level: Alert level of a grid result
+            reason: Short reason for the alert
+            brief_description: One-line summary
+            full_description: Detailed report
+            analysis: Raw model output
+            model_id: Bedrock model that produced the analysis
+            usage: Token usage of the Bedrock call, if one was made
+        """
+        if not self.enabled or self._closed:
+            return
+        now = time.time()
+        usage = usage or {}
+        row = (
+            kind,
+            source,
+            json.dumps(list(sources)) if sources else None,
+            _timestamp(occurred_at) or now,
+            now,
+            alert_level,
+            reason,
+            brief_description,
+            full_description,
+            analysis,
+            model_id,
+            usage.get('input_tokens'),
+            usage.get('output_tokens'),
+            usage.get('cache_read_input_tokens'),
+            usage.get('cache_creation_input_tokens'),
+        )
+        with self._pending_lock:
+            self._pending.append(row)
+            self.recorded += 1
+            if len(self._pending) > self.max_pending:
+                overflow = len(self._pending) - self.max_pending
+                del self._pending[:overflow]
+                self.dropped += overflow
+            full = len(self._pending) >= self.batch_size
+        self._ensure_writer()
+        if full:
+            self._wake.set()
+
+    def record_analysis(
+        self,
+        response: ImageAnalysisResponse,
+        occurred_at: Optional[Any] = None,
+        model_id: Optional[str] = None,
+    ) -> None:
+        """Record a successful describe_image result."""
+        if response.status != 'success':
+            return
+        self.record(
+            'image',
+            response.source,
+            occurred_at,
+            analysis=response.analysis,
+            model_id=model_id,
+            usage=response.usage.model_dump() if response.usage else None,
+        )
+
+    def record_alert(
+        self,
+        response: GridAnalysisResponse,
+        occurred_at: Optional[Any] = None,
+        model_id: Optional[str] = None,
+    ) -> None:
+        """Record a successful analyze_grid alert."""
+        if response.status != 'success' or not response.sources:
+            return
+        self.record(
+            'grid',
+            response.sources[-1],
+            occurred_at,
+            sources=response.sources,
+            alert_level=response.alert_level,
+            reason=response.reason,
+            brief_description=response.brief_description,
+            full_description=response.full_description,
+            analysis=response.analysis,
+            model_id=model_id,
+            usage=response.usage.model_dump() if response.usage else None,
+        )
+
+    def _ensure_writer(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run_writer, name='event-store-writer', daemon=True
+                )
+                self._thread.start()
+
+    def _run_writer(self) -> None:
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+                self._prune()
+            except Exception as e:
+                logger.error(f'Error writing events: {str(e)}')
+
+    def flush(self) -> int:
+        """Write every pending event in one transaction and return how many were written."""
+        with self._lock:
+            with self._pending_lock:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return 0
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.executemany(
+                        f'INSERT INTO events ({", ".join(COLUMNS)}) '
+                        f'VALUES ({", ".join("?" for _ in COLUMNS)})',
+                        batch,
+                    )
+                    if self.max_rows:
+                        self.evicted += conn.execute(
+                            'DELETE FROM events WHERE id <= '
+                            '(SELECT id FROM events ORDER BY id DESC LIMIT 1 OFFSET ?)',
+                            (self.max_rows,),
+                        ).rowcount
+            except sqlite3.Error:
+                # Keep the batch for the next attempt, ahead of newer events
+                with self._pending_lock:
+                    self._pending[:0] = batch
+                raise
+            self.written += len(batch)
+            self.batches += 1
+            return len(batch)
+
+    def _prune(self) -> None:
+        now = time.time()
+        if not self.retention or now - self._last_pruned < 3600:
+            return
+        self._last_pruned = now
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                deleted = conn.execute(
+                    'DELETE FROM events WHERE occurred_at < ?', (now - self.retention,)
+                ).rowcount
+        if deleted:
+            logger.info(f'Pruned {deleted} events older than the retention period')
+
+    def search(
+        self,
+        query: Optional[str] = None,
+        start: Optional[Any] = None,
+        end: Optional[Any] = None,
+        source_prefix: Optional[str] = None,
+        min_alert_level: Optional[int] = None,
+        kind: Optional[str] = None,
+        limit: int = 20,
+        order: str = 'relevance',
+    ) -> List[Dict[str, Any]]:
+        """Find past events without calling Bedrock.
+
+        Args:
+            query: Words that must all appear in the source key, reason, descriptions or analysis
+            start: Earliest time the image was taken (datetime, ISO string or epoch)
+            end: Latest time the image was taken
+            source_prefix: Only events whose S3 key starts with this prefix
+            min_alert_level: Only grid alerts at or above this level
+            kind: Only events of this kind (``image`` or ``grid``)
+            limit: Maximum number of events returned
+            order: ``relevance`` (best text match first, newest without a query),
+                ``newest`` or ``oldest``
+
+        Returns:
+            Matching events, each with a highlighted ``snippet`` when a query was given
+        """
+        if not self.enabled:
+            return []
+        self.flush()
+        with self._lock:
+            # Opens the database, which also tells whether FTS5 is available
+            self._connect()
+        self.searches += 1
+        clauses: List[str] = []
+        params: List[Any] = []
+        match = fts_query(query) if query else None
+        select = 'events.*'
+        tables = 'events'
+        if match and self.fts:
+            select += ", snippet(events_fts, -1, '[', ']', '...', 12) AS snippet"
+            tables = 'events_fts JOIN events ON events.id = events_fts.rowid'
+            clauses.append('events_fts MATCH ?')
+            params.append(match)
+        elif match:
+            columns = ' OR '.join(f"events.{column} LIKE ? ESCAPE '\\'" for column in TEXT_COLUMNS)
+            for word in re.findall(r'\w+', query):
+                clauses.append(f'({columns})')
+                escaped = word.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+                params.extend([f'%{escaped}%'] * len(TEXT_COLUMNS))
+        if start is not None:
+            clauses.append('events.occurred_at >= ?')
+            params.append(_timestamp(start))
+        if end is not None:
+            clauses.append('events.occurred_at <= ?')
+            params.append(_timestamp(end))
+        if source_prefix:
+            # A key range rather than LIKE, so the source index is used
+            clauses.append('events.source >= ? AND events.source < ?')
+            params.extend([source_prefix, source_prefix + '\U0010ffff'])
+        if min_alert_level is not None:
+            clauses.append('events.alert_level >= ?')
+            params.append(min_alert_level)
+        if kind:
+            clauses.append('events.kind = ?')
+            params.append(kind)
+
+        if order == 'oldest':
+            order_by = 'events.occurred_at ASC, events.id ASC'
+        elif order == 'relevance' and match and self.fts:
+            order_by = 'bm25(events_fts), events.occurred_at DESC'
+        else:
+            order_by = 'events.occurred_at DESC, events.id DESC'
+        sql = f'SELECT {select} FROM {tables}'
+        if clauses:
+            sql += ' WHERE ' + ' AND '.join(clauses)
+        sql += f' ORDER BY {order_by} LIMIT ?'
+        params.append(max(1, limit))
+
+        with self._lock:
+            rows = self._connect().execute(sql, params).fetchall()
+        return [self._to_event(row) for row in rows]
+
+    @staticmethod
+    def _to_event(row: sqlite3.Row) -> Dict[str, Any]:
+        keys = row.keys()
+        usage = {
+            field: row[field]
+            for field in (
+                'input_tokens',
+                'output_tokens',
+                'cache_read_input_tokens',
+                'cache_creation_input_tokens',
+            )
+            if row[field] is not None
+        }
+        event = {
+            'id': row['id'],
+            'kind': row['kind'],
+            'source': row['source'],
+            'sources': json.loads(row['sources']) if row['sources'] else [row['source']],
+            'occurred_at': _isoformat(row['occurred_at']),
+            'recorded_at': _isoformat(row['recorded_at']),
+            'alert_level': row['alert_level'],
+            'reason': row['reason'],
+            'brief_description': row['brief_description'],
+            'full_description': row['full_description'],
+            'analysis': row['analysis'],
+            'model_id': row['model_id'],
+            'usage': usage or None,
+        }
+        if 'snippet' in keys:
+            event['snippet'] = row['snippet']
+        return event
+
+    def count(self) -> int:
+        """Return the number of stored events, including pending ones."""
+        if not self.enabled:
+            return 0
+        self.flush()
+        with self._lock:
+            return self._connect().execute('SELECT COUNT(*) FROM events').fetchone()[0]
+
+    def clear(self) -> None:
+        """Delete every event and reset the counters."""
+        with self._pending_lock:
+            self._pending = []
+        with self._lock:
+            if self._conn is not None:
+                with self._conn:
+                    self._conn.execute('DELETE FROM events')
+        self.recorded = self.written = self.batches = self.dropped = self.evicted = 0
+        self.searches = 0
+
+    def close(self) -> None:
+        """Write pending events and stop the writer thread."""
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error(f'Error writing events on shutdown: {str(e)}')
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Return event counts, pending writes and the store configuration."""
+        with self._pending_lock:
+            pending = len(self._pending)
+        return {
+            'enabled': self.enabled,
+            'path': self.path,
+            'full_text_index': self.fts,
+            'recorded': self.recorded,
+            'written': self.written,
+            'pending': pending,
+            'batches': self.batches,
+            'dropped': self.dropped,
+            'evicted': self.evicted,
+            'max_rows': self.max_rows,
+            'searches': self.searches,
+        }
+
+
+# Events are kept on disk by default so history survives restarts; ':memory:' opts out
+STATE_DIR = os.environ.get('CV_STATE_DIR') or os.path.join(
+    os.path.expanduser('~'), '.aws-cv-mcp-server'
+)
+EVENT_STORE_PATH = os.environ.get('CV_EVENT_STORE_PATH') or os.path.join(STATE_DIR, 'events.db')
+IN_MEMORY = EVENT_STORE_PATH == ':memory:'
+
+event_store = EventStore(
+    path=None if IN_MEMORY else EVENT_STORE_PATH,
+    batch_size=int(os.environ.get('CV_EVENT_STORE_BATCH_SIZE', '200')),
+    flush_interval=float(os.environ.get('CV_EVENT_STORE_FLUSH_INTERVAL', '1')),
+    retention=float(os.environ.get('CV_EVENT_STORE_RETENTION_DAYS', '30')) * 86400 or None,
+    enabled=os.environ.get('CV_EVENT_STORE_ENABLED', 'true').lower() == 'true',
+    # An in-memory store would otherwise grow for as long as ingestion runs
+    max_rows=int(os.environ.get('CV_EVENT_STORE_MAX_ROWS', '10000' if IN_MEMORY else '0')),
+)
+atexit.register(event_store.close)
@@ -0,0 +1,204 @@
+#
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You may not use this file except in compliance
+# with the License. A copy of the License is located at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# or in the 'license' file accompanying this file. This file is distributed on an 'AS IS' BASIS, WITHOUT WARRANTIES
+# OR CONDITIONS OF ANY KIND, express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+#
+
+"""Image preprocessing applied between the S3 fetch and prompt construction."""
+
+import io
+import logging
+import math
+import os
+from awslabs.aws_cv_mcp_server.models import ImagePreprocessingOptions
+from typing import Optional, Sequence, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+# Claude downsamples anything with a longer edge than this, so larger images only cost bandwidth
+DEFAULT_PREPROCESSING = ImagePreprocessingOptions(
+    max_edge=int(os.environ.get('CV_IMAGE_MAX_EDGE', '1568')),
+    format=os.environ.get('CV_IMAGE_FORMAT', '').upper() or None,
+    quality=int(os.environ.get('CV_IMAGE_QUALITY', '85')),
+    strip_metadata=os.environ.get('CV_IMAGE_STRIP_METADATA', 'true').lower() == 'true',
+)
+
+METADATA_KEYS = ('exif', 'icc_profile', 'xmp', 'comment')
+
+MEDIA_TYPES = {'JPEG': 'image/jpeg', 'PNG': 'image/png', 'WEBP': 'image/webp', 'GIF': 'image/gif'}
+
+
+def resolve_preprocessing(
+    options: Optional[ImagePreprocessingOptions] = None,
+) -> ImagePreprocessingOptions:
+    """Fill unset per-call options from the server-wide defaults."""
+    if options is None:
+        return DEFAULT_PREPROCESSING
+    overrides = options.model_dump(exclude_none=True)
+    return DEFAULT_PREPROCESSING.model_copy(update=overrides)
+
+
+def preprocess_image(
+    image_data: bytes,
+    content_type: str,
+    options: Optional[ImagePreprocessingOptions] = None,
+) -> Tuple[bytes, str]:
+    """Downscale, re-encode and strip metadata from an image.
+
+    The original bytes are returned untouched when there is nothing to change,
+    or when Pillow is not installed or cannot decode the image.
+
+    Args:
+        image_data: Encoded image bytes
+        content_type: MIME type of ``image_data``
+        options: Preprocessing options; unset fields use the server-wide defaults
+
+    Returns:
+        Tuple of the processed image bytes and their MIME type
+    """
+    options = resolve_preprocessing(options)
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        logger.warning('Pillow is not installed; sending images without preprocessing')
+        return image_data, content_type
+
+    try:
+        image = Image.open(io.BytesIO(image_data))
+    except Image.UnidentifiedImageError:
+        logger.warning(f'Could not decode {content_type} image; sending it without preprocessing')
+        return image_data, content_type
+    source_format = image.format or 'PNG'
+    target_format = options.format or (source_format if source_format in MEDIA_TYPES else 'PNG')
+    if target_format == 'GIF':
+        # Re-encoding animated GIFs frame by frame is not worth it; keep them as they are
+        return image_data, content_type
+
+    max_edge = options.max_edge or 0
+    needs_resize = max_edge > 0 and max(image.size) > max_edge
+    has_metadata = any(image.info.get(key) for key in METADATA_KEYS)
+    needs_reencode = target_format != source_format or (options.strip_metadata and has_metadata)
+    if not needs_resize and not needs_reencode:
+        return image_data, content_type
+
+    if needs_resize:
+        # Let the JPEG decoder skip straight to a reduced scale instead of decoding every pixel
+        image.draft('RGB', _scaled_size(image.size, max_edge))
+    if options.strip_metadata:
+        # Metadata is dropped on save, so bake the EXIF orientation into the pixels first
+        image = ImageOps.exif_transpose(image)
+    if needs_resize:
+        # Sized after the transpose, which swaps width and height for rotated photos
+        image.thumbnail(_scaled_size(image.size, max_edge), Image.Resampling.LANCZOS)
+
+    if target_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+        image = _flatten(image)
+
+    save_args = {}
+    if target_format in ('JPEG', 'WEBP'):
+        save_args['quality'] = options.quality or 85
+    if not options.strip_metadata:
+        for key in ('exif', 'icc_profile'):
+            if image.info.get(key):
+                save_args[key] = image.info[key]
+
+    output = io.BytesIO()
+    image.save(output, format=target_format, **save_args)
+    return output.getvalue(), MEDIA_TYPES[target_format]
+
+
+def _scaled_size(size: Tuple[int, int], max_edge: int) -> Tuple[int, int]:
+    """Scale a (width, height) pair so its longer edge is ``max_edge``."""
+    scale = max_edge / max(size)
+    return max(1, round(size[0] * scale)), max(1, round(size[1] * scale))
+
+
+def _flatten(image):
+    """Composite an image with transparency or a palette onto white RGB."""
+    from PIL import Image
+
+    image = image.convert('RGBA')
+    background = Image.new('RGB', image.size, (255, 255, 255))
+    background.paste(image, mask=image.getchannel('A'))
+    return background
+
+
+def compose_grid(
+    frames: Sequence[bytes],
+    labels: Optional[Sequence[str]] = None,
+    columns: Optional[int] = None,
+    tile_width: int = 512,
+    border: int = 2,
+    quality: int = 85,
+) -> bytes:
+    """Tile a sequence of frames into a single labelled JPEG grid.
+
+    Frames are placed left to right, top to bottom. Every tile has the aspect
+    ratio of the first frame; other frames are letterboxed into it. The tiles
+    are assembled with a single reshape/transpose of one array instead of
+    pasting frames one by one.
+
+    Args:
+        frames: Encoded frame images, in time order
+        labels: Text drawn in the corner of each tile, such as the frame timestamp
+        columns: Number of tiles per row; defaults to a near-square layout
+        tile_width: Width of each tile in pixels
+        border: Width in pixels of the black border between tiles
+        quality: JPEG quality of the grid image
+
+    Returns:
+        bytes: The grid encoded as JPEG
+    """
+    import numpy as np
+    from PIL import Image, ImageDraw, ImageFont, ImageOps
+
+    if not frames:
+        raise ValueError('At least one frame is required to build a grid')
+    count = len(frames)
+    columns = columns or math.ceil(math.sqrt(count))
+    rows = math.ceil(count / columns)
+
+    decoded = []
+    for data in frames:
+        image = Image.open(io.BytesIO(data))
+        image.draft('RGB', (tile_width, tile_width))
+        decoded.append(image)
+    first_width, first_height = decoded[0].size
+    tile_height = max(1, round(tile_width * first_height / first_width))
+
+    tiles = np.zeros((rows * columns, tile_height, tile_width, 3), dtype=np.uint8)
+    for index, image in enumerate(decoded):
+        image = ImageOps.pad(image.convert('RGB'), (tile_width, tile_height))
+        tiles[index] = np.asarray(image)
+
+    tiles = np.pad(tiles, ((0, 0), (border, border), (border, border), (0, 0)))
+    cell_height, cell_width = tiles.shape[1:3]
+    grid = (
+        tiles.reshape(rows, columns, cell_height, cell_width, 3)
+        .transpose(0, 2, 1, 3, 4)
+        .reshape(rows * cell_height, columns * cell_width, 3)
+    )
+
+    image = Image.fromarray(grid)
+    if labels:
+        draw = ImageDraw.Draw(image)
+        font = ImageFont.load_default(size=max(12, tile_width // 28))
+        for index, label in enumerate(labels[:count]):
+            x = (index % columns) * cell_width + border
+            y = (index // columns) * cell_height + border
+            text = f'{index + 1}: {label}' if label else str(index + 1)
+            left, top, right, bottom = draw.textbbox((x + 4, y + 4), text, font=font)
+            draw.rectangle((left - 4, top - 4, right + 4, bottom + 4), fill=(0, 0, 0))
+            draw.text((x + 4, y + 4), text, fill=(255, 255, 0), font=font)
+
+    output = io.BytesIO()
+    image.save(output, format='JPEG', quality=quality)
+    return output.getvalue()
@@ -0,0 +1,750 @@
+#
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You may not use this file except in compliance
+# with the License. A copy of the License is located at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# or in the 'license' file accompanying this file. This file is distributed on an 'AS IS' BASIS, WITHOUT WARRANTIES
+# OR CONDITIONS OF ANY KIND, express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+#
+
+"""Continuous analysis of new frames arriving under an S3 prefix.
+
+A source (S3 listing with a persisted cursor, or S3 event notifications
+delivered to SQS) produces frame events into a bounded asyncio queue that a
+fixed number of workers drain through describe_image. A full queue blocks
+the producer, so a slow model slows polling instead of growing memory.
+Frames are acknowledged only after their analysis has been handled, so a
+restart picks up anything that was still in flight; delivery is at least once.
+"""
+
+import asyncio
+import json
+import logging
+import math
+import os
+import tempfile
+import time
+from awslabs.aws_cv_mcp_server.admission import request_admission
+from awslabs.aws_cv_mcp_server.cache import make_cache_key
+from awslabs.aws_cv_mcp_server.connections import Connections, run_in_executor
+from awslabs.aws_cv_mcp_server.cv_tools import describe_image
+from awslabs.aws_cv_mcp_server.metrics import ingest_frames, ingest_lag_seconds, record_error
+from awslabs.aws_cv_mcp_server.models import ImageAnalysisResponse
+from awslabs.aws_cv_mcp_server.s3_utils import IMAGE_EXTENSIONS, fetch_image_objects
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import unquote_plus
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = int(os.environ.get('CV_INGEST_WORKERS', '4'))
+DEFAULT_QUEUE_SIZE = int(os.environ.get('CV_INGEST_QUEUE_SIZE', '32'))
+DEFAULT_POLL_INTERVAL = float(os.environ.get('CV_INGEST_POLL_INTERVAL', '5'))
+# S3 LastModified is when an upload started, so a listing can show an object late
+DEFAULT_LOOKBACK = float(os.environ.get('CV_INGEST_LOOKBACK', '60'))
+STATE_DIR = os.environ.get('CV_INGEST_STATE_DIR') or None
+# Retries of a polled frame whose analysis failed, after 5, 10, 20... seconds
+MAX_RETRIES = int(os.environ.get('CV_INGEST_MAX_RETRIES', '3'))
+RETRY_DELAY = float(os.environ.get('CV_INGEST_RETRY_DELAY', '5'))
+# Seconds a received notification stays hidden; extended while its frames are outstanding
+VISIBILITY_TIMEOUT = int(os.environ.get('CV_INGEST_VISIBILITY_TIMEOUT', '60'))
+# Keys that sort in upload order (such as timestamped names) let a poll list only new keys
+ORDERED_KEYS = os.environ.get('CV_INGEST_ORDERED_KEYS', 'false').lower() == 'true'
+
+
+@dataclass
+class FrameEvent:
+    """A new image object waiting to be analyzed."""
+
+    key: str
+    event_time: datetime
+    etag: Optional[str] = None
+    receipt_handle: Optional[str] = None
+    enqueued_at: Optional[float] = None
+
+
+ResultHandler = Callable[[FrameEvent, ImageAnalysisResponse], Awaitable[None]]
+
+
+class Cursor:
+    """Persisted position of a polling source.
+
+    ``watermark`` is the oldest LastModified that may not have been analyzed
+    yet, and ``done`` lists the keys analyzed since ``lookback`` seconds
+    before it. Frames still being analyzed hold the watermark back, so after a
+    restart they are listed as new again. The state is rewritten atomically
+    after every acknowledged frame.
+    """
+
+    def __init__(self, path: Optional[str] = None, lookback: float = DEFAULT_LOOKBACK):
+        """Load the cursor from ``path`` if it exists; without a path it lives in memory."""
+        self.path = path
+        self.lookback = lookback
+        self.watermark: Optional[float] = None
+        self.done: Dict[str, float] = {}
+        self._pending: Dict[str, float] = {}
+        if path:
+            self._load()
+
+    def _load(self) -> None:
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning(f'Ignoring unreadable ingestion cursor {self.path}: {e}')
+            return
+        self.watermark = state.get('watermark')
+        self.done = dict(state.get('done', {}))
+
+    def save(self) -> None:
+        """Write the cursor to its file, if it has one."""
+        if not self.path:
+            return
+        directory = os.path.dirname(self.path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'watermark': self.watermark, 'done': self.done}, f)
+            os.replace(temp_path, self.path)
+        except Exception:
+            try:
+                os.unlink(temp_path)
+            except OSError:
+                pass
+            raise
+
+    @property
+    def empty(self) -> bool:
+        """Whether no position has been recorded yet."""
+        return self.watermark is None
+
+    def is_new(self, key: str, modified: float) -> bool:
+        """Whether an object seen in a listing still needs to be analyzed."""
+        if key in self.done or key in self._pending:
+            return False
+        return self.watermark is None or modified >= self.watermark - self.lookback
+
+    def first_key(self) -> Optional[str]:
+        """Return the smallest key still tracked, in progress or within the lookback."""
+        return min([*self.done, *self._pending], default=None)
+
+    def begin(self, key: str, modified: float) -> None:
+        """Mark an object as handed to the pipeline."""
+        self._pending[key] = modified
+
+    def finish(self, key: str) -> None:
+        """Mark an object as analyzed, advance the watermark and persist the cursor."""
+        modified = self._pending.pop(key, None)
+        if modified is None:
+            return
+        self.done[key] = modified
+        if self._pending:
+            self.watermark = min(self._pending.values())
+        else:
+            self.watermark = max(self.watermark or modified, max(self.done.values()))
+        horizon = self.watermark - self.lookback
+        self.done = {key: value for key, value in self.done.items() if value >= horizon}
+        self.save()
+
+
+class PollingSource:
+    """Lists the prefix every ``interval`` seconds and yields objects the cursor has not seen.
+
+    Without a saved cursor only frames from the last ``lookback`` seconds are
+    analyzed, unless ``backfill`` is set, in which case every image already
+    under the prefix is. Each poll lists the whole prefix, which stops keeping
+    up once the listing takes longer than ``interval``; with ``ordered_keys``
+    (keys that sort in upload order) a poll starts after the smallest key the
+    cursor still tracks instead. Large feeds should use ``QueueSource``.
+
+    A frame whose analysis fails stays pending, holding the cursor back, and is
+    yielded again after ``retry_delay`` seconds, doubling on each attempt, up
+    to ``max_retries`` times.
+    """
+
+    def __init__(
+        self,
+        prefix: str,
+        cursor: Cursor,
+        interval: float = DEFAULT_POLL_INTERVAL,
+        backfill: bool = False,
+        bucket: Optional[str] = None,
+        ordered_keys: bool = ORDERED_KEYS,
+        max_retries: int = MAX_RETRIES,
+        retry_delay: float = RETRY_DELAY,
+    ):
+        """Create a source; nothing is listed until ``events`` is iterated."""
+        self.prefix = prefix
+        self.cursor = cursor
+        self.interval = interval
+        self.bucket = bucket
+        self.ordered_keys = ordered_keys
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.polls = 0
+        self.abandoned = 0
+        self._attempts: Dict[str, int] = {}
+        self._retry_at: Dict[str, Tuple[FrameEvent, float]] = {}
+        self.last_listed = 0
+        self.last_list_seconds: Optional[float] = None
+        if cursor.empty and not backfill:
+            cursor.watermark = time.time()
+            cursor.save()
+
+    async def events(self) -> AsyncIterator[FrameEvent]:
+        """Yield new frames oldest first, polling until cancelled."""
+        while True:
+            started = time.monotonic()
+            start_after = self.cursor.first_key() if self.ordered_keys else None
+            try:
+                objects = await fetch_image_objects(
+                    self.prefix, bucket=self.bucket, start_after=start_after
+                )
+            except Exception as e:
+                logger.error(f'Error listing {self.prefix} for ingestion: {str(e)}')
+                record_error('ingest', e)
+                objects = []
+            self._record_listing(len(objects), time.monotonic() - started)
+            new = [
+                obj
+                for obj in objects
+                if self.cursor.is_new(obj['Key'], obj['LastModified'].timestamp())
+            ]
+            new.sort(key=lambda obj: (obj['LastModified'], obj['Key']))
+            for event in self._due_retries():
+                yield event
+            for obj in new:
+                self.cursor.begin(obj['Key'], obj['LastModified'].timestamp())
+                yield FrameEvent(
+                    key=obj['Key'], event_time=obj['LastModified'], etag=obj.get('ETag')
+                )
+            await asyncio.sleep(max(0.0, self.interval - (time.monotonic() - started)))
+
+    def _record_listing(self, listed: int, seconds: float) -> None:
+        self.polls += 1
+        self.last_listed = listed
+        self.last_list_seconds = seconds
+        message = f'Listed {listed} images under {self.prefix} in {seconds:.2f}s'
+        if seconds > self.interval:
+            logger.warning(
+                f'{message}, longer than the {self.interval:g}s poll interval; '
+                'use an SQS queue or time-ordered keys to keep up'
+            )
+        else:
+            logger.debug(message)
+
+    def _due_retries(self) -> List[FrameEvent]:
+        now = time.monotonic()
+        due = [key for key, (_, retry_at) in self._retry_at.items() if retry_at <= now]
+        return [self._retry_at.pop(key)[0] for key in due]
+
+    async def ack(self, event: FrameEvent, success: bool) -> None:
+        """Record the frame as done, or schedule a failed analysis for a retry.
+
+        A frame still failing after ``max_retries`` retries is recorded as done,
+        so it cannot hold the cursor back indefinitely.
+        """
+        key = event.key
+        if not success:
+            attempts = self._attempts.get(key, 0) + 1
+            if attempts <= self.max_retries:
+                self._attempts[key] = attempts
+                delay = self.retry_delay * 2 ** (attempts - 1)
+                self._retry_at[key] = (event, time.monotonic() + delay)
+                logger.info(f'Retrying {key} in {delay:g}s (attempt {attempts})')
+                return
+            logger.warning(f'Giving up on {key} after {self.max_retries} retries')
+            self.abandoned += 1
+        self._attempts.pop(key, None)
+        self.cursor.finish(key)
+
+    async def close(self) -> None:
+        """Release resources once the pipeline has stopped; the cursor is already saved."""
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the source type, poll count and cursor position."""
+        return {
+            'type': 'polling',
+            'interval': self.interval,
+            'ordered_keys': self.ordered_keys,
+            'polls': self.polls,
+            'last_listed': self.last_listed,
+            'retrying': len(self._retry_at),
+            'abandoned': self.abandoned,
+            'last_list_seconds': (
+                round(self.last_list_seconds, 3) if self.last_list_seconds is not None else None
+            ),
+            'watermark': _isoformat(self.cursor.watermark),
+        }
+
+
+def parse_s3_event(body: str) -> List[FrameEvent]:
+    """Extract created objects from an S3 event notification, optionally wrapped by SNS."""
+    payload = json.loads(body)
+    if 'Records' not in payload and isinstance(payload.get('Message'), str):
+        payload = json.loads(payload['Message'])
+    events = []
+    for record in payload.get('Records', []):
+        if not record.get('eventName', '').startswith('ObjectCreated'):
+            continue
+        obj = record['s3']['object']
+        events.append(
+            FrameEvent(
+                key=unquote_plus(obj['key']),
+                event_time=datetime.fromisoformat(record['eventTime'].replace('Z', '+00:00')),
+                etag=obj.get('eTag'),
+            )
+        )
+    return events
+
+
+class QueueSource:
+    """Receives S3 event notifications from an SQS queue.
+
+    The queue is the cursor: a message is deleted once every frame in it has
+    been analyzed successfully. While any of its frames is queued or being
+    analyzed, the message's visibility timeout is extended every half timeout,
+    so backpressure does not get it redelivered. Messages with a failed frame
+    are left for SQS to redeliver after the visibility timeout, or to move to
+    a dead-letter queue. Notifications for other prefixes and non-image keys
+    are deleted. The extensions start with ``events`` and run until ``close``,
+    so frames drained after the source stops receiving stay hidden too.
+    """
+
+    def __init__(
+        self,
+        queue_url: str,
+        prefix: str = '',
+        wait_time: int = 20,
+        idle_interval: float = DEFAULT_POLL_INTERVAL,
+        visibility_timeout: int = VISIBILITY_TIMEOUT,
+    ):
+        """Create a source that long-polls ``queue_url`` for up to ``wait_time`` seconds."""
+        self.queue_url = queue_url
+        self.prefix = prefix
+        self.wait_time = wait_time
+        self.idle_interval = idle_interval
+        self.visibility_timeout = visibility_timeout
+        self.received = 0
+        self.extended = 0
+        self._outstanding: Dict[str, int] = {}
+        self._failed: set = set()
+        self._heartbeat: Optional[asyncio.Task] = None
+
+    async def events(self) -> AsyncIterator[FrameEvent]:
+        """Yield frames from queued notifications until cancelled."""
+        if self._heartbeat is None or self._heartbeat.done():
+            self._heartbeat = asyncio.create_task(self._extend_visibility())
+        while True:
+            for event in await self._receive():
+                yield event
+
+    async def _receive(self) -> List[FrameEvent]:
+        try:
+            response = await run_in_executor(
+                Connections.sqs_client.receive_message,
+                QueueUrl=self.queue_url,
+                MaxNumberOfMessages=10,
+                WaitTimeSeconds=self.wait_time,
+                VisibilityTimeout=self.visibility_timeout,
+            )
+        except Exception as e:
+            logger.error(f'Error receiving ingestion events: {str(e)}')
+            record_error('ingest', e)
+            await asyncio.sleep(self.idle_interval)
+            return []
+        messages = response.get('Messages', [])
+        if not messages and not self.wait_time:
+            await asyncio.sleep(self.idle_interval)
+        received = []
+        for message in messages:
+            self.received += 1
+            receipt = message['ReceiptHandle']
+            try:
+                events = [
+                    event
+                    for event in parse_s3_event(message['Body'])
+                    if event.key.startswith(self.prefix)
+                    and event.key.lower().endswith(IMAGE_EXTENSIONS)
+                ]
+            except (KeyError, TypeError, ValueError) as e:
+                logger.warning(f'Discarding unrecognized ingestion event: {e}')
+                events = []
+            if not events:
+                await self._delete(receipt)
+                continue
+            # Registered before any frame is yielded, so the heartbeat covers
+            # messages whose frames are still waiting behind a full queue
+            self._outstanding[receipt] = len(events)
+            for event in events:
+                event.receipt_handle = receipt
+            received.extend(events)
+        return received
+
+    async def _extend_visibility(self) -> None:
+        while True:
+            await asyncio.sleep(self.visibility_timeout / 2)
+            receipts = list(self._outstanding)
+            for start in range(0, len(receipts), 10):
+                entries = [
+                    {
+                        'Id': str(index),
+                        'ReceiptHandle': receipt,
+                        'VisibilityTimeout': self.visibility_timeout,
+                    }
+                    for index, receipt in enumerate(receipts[start : start + 10])
+                ]
+                try:
+                    response = await run_in_executor(
+                        Connections.sqs_client.change_message_visibility_batch,
+                        QueueUrl=self.queue_url,
+                        Entries=entries,
+                    )
+                except Exception as e:
+                    logger.error(f'Error extending ingestion event visibility: {str(e)}')
+                    record_error('ingest', e)
+                    continue
+                for failure in response.get('Failed', []):
+                    logger.warning(f'Could not extend ingestion event visibility: {failure}')
+                self.extended += len(entries) - len(response.get('Failed', []))
+
+    async def ack(self, event: FrameEvent, success: bool) -> None:
+        """Delete the message once all its frames are done, unless one of them failed."""
+        receipt = event.receipt_handle
+        if not success:
+            self._failed.add(receipt)
+        remaining = self._outstanding.get(receipt, 1) - 1
+        if remaining > 0:
+            self._outstanding[receipt] = remaining
+            return
+        self._outstanding.pop(receipt, None)
+        if receipt in self._failed:
+            self._failed.discard(receipt)
+        else:
+            await self._delete(receipt)
+
+    async def _delete(self, receipt: str) -> None:
+        try:
+            await run_in_executor(
+                Connections.sqs_client.delete_message,
+                QueueUrl=self.queue_url,
+                ReceiptHandle=receipt,
+            )
+        except Exception as e:
+            logger.error(f'Error deleting ingestion event: {str(e)}')
+            record_error('ingest', e)
+
+    async def close(self) -> None:
+        """Stop extending visibility; outstanding messages are redelivered after the timeout."""
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+            await asyncio.gather(self._heartbeat, return_exceptions=True)
+            self._heartbeat = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the source type and message counters."""
+        return {
+            'type': 'sqs',
+            'queue_url': self.queue_url,
+            'messages_received': self.received,
+            'messages_in_flight': len(self._outstanding),
+            'visibility_extensions': self.extended,
+        }
+
+
+class IngestionPipeline:
+    """Analyze frames from a source on ``workers`` concurrent workers.
+
+    At most ``queue_size`` frames wait between the source and the workers.
+    Each analysis is passed to every result handler before the frame is
+    acknowledged to the source. Lag from the S3 write to dequeue and to the
+    finished analysis is exported as ``cv_ingest_lag_seconds``.
+    """
+
+    def __init__(
+        self,
+        source,
+        prefix: str,
+        monitoring_instructions: str,
+        workers: int = DEFAULT_WORKERS,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        deduplicate: bool = False,
+        handlers: Optional[List[ResultHandler]] = None,
+        recent: int = 20,
+        window: int = 1000,
+    ):
+        """Create a stopped pipeline."""
+        self.source = source
+        self.prefix = prefix
+        self.monitoring_instructions = monitoring_instructions
+        self.workers = max(1, workers)
+        self.queue_size = max(1, queue_size)
+        self.deduplicate = deduplicate
+        self.handlers = list(handlers or [])
+        self.queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self.received = 0
+        self.processed = 0
+        self.failed = 0
+        self.peak_queued = 0
+        self.started_at: Optional[float] = None
+        self._lags: deque = deque(maxlen=window)
+        self.recent: deque = deque(maxlen=recent)
+
+    @property
+    def running(self) -> bool:
+        """Whether the producer or any worker is still running."""
+        return any(not task.done() for task in self._tasks)
+
+    def start(self) -> None:
+        """Start the producer and workers on the running event loop."""
+        if self.running:
+            return
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        self.started_at = time.time()
+        self._tasks = [asyncio.create_task(self._produce(), name=f'ingest-{self.prefix}')]
+        self._tasks.extend(
+            asyncio.create_task(self._work(), name=f'ingest-{self.prefix}-{index}')
+            for index in range(self.workers)
+        )
+        logger.info(f'Started ingestion of {self.prefix} with {self.workers} workers')
+
+    async def stop(self, drain: bool = False) -> None:
+        """Stop taking new frames; with ``drain``, finish the queued ones first."""
+        if not self._tasks:
+            return
+        producer, workers = self._tasks[0], self._tasks[1:]
+        producer.cancel()
+        if drain and self.queue is not None:
+            await self.queue.join()
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        # Only now, so messages of frames drained above stayed hidden meanwhile
+        await self.source.close()
+        self._tasks = []
+        logger.info(f'Stopped ingestion of {self.prefix}')
+
+    async def _produce(self) -> None:
+        events = self.source.events()
+        try:
+            async for event in events:
+                event.enqueued_at = time.time()
+                self.received += 1
+                # Blocks while the queue is full, which also pauses the source
+                await self.queue.put(event)
+                self.peak_queued = max(self.peak_queued, self.queue.qsize())
+        finally:
+            await events.aclose()
+
+    async def _work(self) -> None:
+        while True:
+            event = await self.queue.get()
+            try:
+                await self._process(event)
+            except Exception as e:
+                logger.error(f'Error ingesting {event.key}: {str(e)}')
+                record_error('ingest', e)
+            finally:
+                self.queue.task_done()
+
+    async def _process(self, event: FrameEvent) -> None:
+        written = event.event_time.timestamp()
+        ingest_lag_seconds.observe(time.time() - written, prefix=self.prefix, stage='queued')
+        try:
+            # Workers share the tools' admission limit, so ingestion cannot starve them
+            async with request_admission.slot():
+                response = await describe_image(
+                    event.key, self.monitoring_instructions, deduplicate=self.deduplicate
+                )
+        except Exception as e:
+            record_error('ingest', e)
+            response = ImageAnalysisResponse(
+                status='error', source=event.key, message=f'Error analyzing image: {str(e)}'
+            )
+        lag = time.time() - written
+        ingest_lag_seconds.observe(lag, prefix=self.prefix, stage='analyzed')
+        ingest_frames.inc(prefix=self.prefix, status=response.status)
+        self._lags.append(lag)
+        if response.status == 'success':
+            self.processed += 1
+        else:
+            self.failed += 1
+        self.recent.append(
+            {
+                'source': event.key,
+                'status': response.status,
+                'analysis': response.analysis,
+                'lag_seconds': round(lag, 3),
+            }
+        )
+        for handler in self.handlers:
+            try:
+                await handler(event, response)
+            except Exception as e:
+                logger.error(f'Ingestion result handler failed for {event.key}: {str(e)}')
+                record_error('ingest', e)
+        await self.source.ack(event, response.status == 'success')
+
+    def stats(self) -> Dict[str, Any]:
+        """Return queue depth, frame counters, recent lag percentiles and latest analyses."""
+        return {
+            'prefix': self.prefix,
+            'running': self.running,
+            'workers': self.workers,
+            'queue_size': self.queue_size,
+            'queued': self.queue.qsize() if self.queue is not None else 0,
+            'peak_queued': self.peak_queued,
+            'received': self.received,
+            'processed': self.processed,
+            'failed': self.failed,
+            'lag_p50_seconds': _percentile(self._lags, 50),
+            'lag_p95_seconds': _percentile(self._lags, 95),
+            'lag_max_seconds': _percentile(self._lags, 100),
+            'started_at': _isoformat(self.started_at),
+            'source': self.source.stats(),
+            'recent': list(self.recent),
+        }
+
+
+def _percentile(values, percentile: float) -> Optional[float]:
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    index = min(len(ordered) - 1, math.ceil(percentile / 100 * len(ordered)) - 1)
+    return round(ordered[max(0, index)], 3)
+
+
+def _isoformat(timestamp: Optional[float]) -> Optional[str]:
+    if timestamp is None:
+        return None
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat()
+
+
+# Running pipelines by prefix, and handlers attached to every new pipeline
+pipelines: Dict[str, IngestionPipeline] = {}
+result_handlers: List[ResultHandler] = []
+
+
+def cursor_path(prefix: str, state_dir: Optional[str] = STATE_DIR) -> Optional[str]:
+    """Return the cursor file for a prefix of the agent bucket, or None to keep it in memory."""
+    if not state_dir:
+        return None
+    return os.path.join(
+        state_dir, f'{make_cache_key(Connections.agent_bucket_name, prefix)[:32]}.json'
+    )
+
+
+def create_pipeline(
+    prefix: str,
+    monitoring_instructions: str,
+    workers: int = DEFAULT_WORKERS,
+    queue_size: int = DEFAULT_QUEUE_SIZE,
+    poll_interval: float = DEFAULT_POLL_INTERVAL,
+    queue_url: Optional[str] = None,
+    state_dir: Optional[str] = STATE_DIR,
+    backfill: bool = False,
+    deduplicate: bool = False,
+    ordered_keys: bool = ORDERED_KEYS,
+) -> IngestionPipeline:
+    """Build a stopped pipeline for a prefix.
+
+    Args:
+        prefix: S3 prefix of the camera feed
+        monitoring_instructions: Instructions passed to describe_image for every frame
+        workers: Number of frames analyzed at once
+        queue_size: Maximum frames waiting for a worker before the source is paused
+        poll_interval: Seconds between listings; with ``queue_url``, between empty receives
+        queue_url: SQS queue receiving the bucket's S3 event notifications; polls S3 if unset
+        state_dir: Directory for the polling cursor; unset keeps it in memory
+        backfill: Without a saved cursor, also analyze the images already under the prefix
+        deduplicate: Reuse analyses of near-identical consecutive frames
+        ordered_keys: Keys sort in upload order, so each poll lists only keys after the cursor
+
+    Returns:
+        IngestionPipeline: The pipeline, not yet started
+    """
+    if queue_url:
+        source = QueueSource(queue_url, prefix, idle_interval=poll_interval)
+    else:
+        source = PollingSource(
+            prefix,
+            Cursor(cursor_path(prefix, state_dir)),
+            interval=poll_interval,
+            backfill=backfill,
+            ordered_keys=ordered_keys,
+        )
+    return IngestionPipeline(
+        source,
+        prefix,
+        monitoring_instructions,
+        workers=workers,
+        queue_size=queue_size,
+        deduplicate=deduplicate,
+        handlers=result_handlers,
+    )
+
+
+def start_ingestion(
+    prefix: str, monitoring_instructions: str, **options: Any
+) -> IngestionPipeline:
+    """Create and start a pipeline for ``prefix``, or return the one already running.
+
+    Takes the keyword options of ``create_pipeline``; must be called on the event loop.
+    """
+    pipeline = pipelines.get(prefix)
+    if pipeline is not None and pipeline.running:
+        return pipeline
+    pipeline = create_pipeline(prefix, monitoring_instructions, **options)
+    pipelines[prefix] = pipeline
+    pipeline.start()
+    return pipeline
+
+
+async def stop_ingestion(prefix: str, drain: bool = False) -> bool:
+    """Stop the pipeline for ``prefix``; returns False if none was running."""
+    pipeline = pipelines.pop(prefix, None)
+    if pipeline is None:
+        return False
+    await pipeline.stop(drain=drain)
+    return True
+
+
+async def stop_all_ingestion() -> None:
+    """Stop every running pipeline."""
+    for prefix in list(pipelines):
+        await stop_ingestion(prefix)
+
+
+def ingestion_stats() -> Dict[str, Dict[str, Any]]:
+    """Return the stats of every pipeline, keyed by prefix."""
+    return {prefix: pipeline.stats() for prefix, pipeline in pipelines.items()}
+
+
+# Pipeline started with the server, from CV_INGEST_* or the --ingest-* options
+startup_ingestion: Dict[str, Any] = {
+    'prefix': os.environ.get('CV_INGEST_PREFIX') or None,
+    'monitoring_instructions': os.environ.get(
+        'CV_INGEST_INSTRUCTIONS', 'Describe any people, vehicles or activity in the frame.'
+    ),
+    'queue_url': os.environ.get('CV_INGEST_QUEUE_URL') or None,
+}
+
+
+def start_configured_ingestion() -> Optional[IngestionPipeline]:
+    """Start the startup pipeline if one is configured and not already running."""
+    options = dict(startup_ingestion)
+    prefix = options.pop('prefix')
+    if not prefix:
+        return None
+    return start_ingestion(prefix, options.pop('monitoring_instructions'), **options)
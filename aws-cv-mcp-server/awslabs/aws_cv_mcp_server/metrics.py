@@ -0,0 +1,358 @@
+#
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You may not use this file except in compliance
+# with the License. A copy of the License is located at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# or in the 'license' file accompanying this file. This file is distributed on an 'AS IS' BASIS, WITHOUT WARRANTIES
+# OR CONDITIONS OF ANY KIND, express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+#
+
+"""Prometheus-style counters and latency histograms, served as text on ``/metrics``."""
+
+import functools
+import logging
+import math
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Sequence, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Seconds; covers cache hits through long streamed Bedrock responses
+DEFAULT_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+
+# Seconds from an S3 upload to its analysis; polling adds up to one interval
+LAG_BUCKETS = (0.5, 1.0, 2.5, 5.0, 10.0, 15.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metric:
+    """Base class holding a metric's name, help text and label names."""
+
+    type = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        """Create a metric; label values are passed as keyword arguments when recording."""
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f'{self.name} expects labels {self.labelnames}, got {tuple(labels)}')
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> Iterable[Tuple[str, str, float]]:
+        """Yield ``(suffix, labels, value)`` for every sample of the metric."""
+        return ()
+
+    def render(self) -> List[str]:
+        """Return the metric in the Prometheus text exposition format."""
+        lines = [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} {self.type}',
+        ]
+        for suffix, labels, value in self.samples():
+            lines.append(f'{self.name}{suffix}{labels} {_format_value(value)}')
+        return lines
+
+
+class Counter(Metric):
+    """Monotonically increasing count per label combination."""
+
+    type = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        """Create a counter with no samples."""
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        """Add ``amount`` to the counter for the given labels."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: Any) -> float:
+        """Return the current count for the given labels."""
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> Iterable[Tuple[str, str, float]]:
+        """Yield one sample per label combination."""
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            yield '', _format_labels(self.labelnames, key), value
+
+
+class Histogram(Metric):
+    """Cumulative bucketed distribution of observed values per label combination."""
+
+    type = 'histogram'
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        """Create a histogram with the given upper bucket bounds."""
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        """Record one observation."""
+        key = self._key(labels)
+        with self._lock:
+            # Per-bucket counts followed by the running sum and count
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[index] += 1
+                    break
+            state[-2] += value
+            state[-1] += 1
+
+    @contextmanager
+    def time(self, **labels: Any) -> Iterator[None]:
+        """Observe the wall time of the ``with`` block in seconds, even if it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels: Any) -> int:
+        """Return the number of observations for the given labels."""
+        state = self._values.get(self._key(labels))
+        return int(state[-1]) if state else 0
+
+    def samples(self) -> Iterable[Tuple[str, str, float]]:
+        """Yield the cumulative buckets, sum and count per label combination."""
+        with self._lock:
+            values = sorted((key, list(state)) for key, state in self._values.items())
+        for key, state in values:
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                yield '_bucket', _format_labels(self.labelnames, key, le), cumulative
+            yield '_bucket', _format_labels(self.labelnames, key, 'le="+Inf"'), state[-1]
+            yield '_sum', _format_labels(self.labelnames, key), state[-2]
+            yield '_count', _format_labels(self.labelnames, key), state[-1]
+
+
+class CallbackMetric(Metric):
+    """Gauge or counter whose samples are read from other components at scrape time.
+
+    ``collect`` returns a mapping of label-value tuples to numbers, so existing
+    ``stats()`` counters can be exported without double bookkeeping.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str],
+        collect: Callable[[], Dict[LabelValues, float]],
+        type: str = 'gauge',
+    ):
+        """Create a metric that calls ``collect`` on every scrape."""
+        super().__init__(name, documentation, labelnames)
+        self.collect = collect
+        self.type = type
+
+    def samples(self) -> Iterable[Tuple[str, str, float]]:
+        """Yield the samples returned by ``collect``."""
+        for key, value in sorted(self.collect().items()):
+            if value is not None:
+                yield '', _format_labels(self.labelnames, key), float(value)
+
+
+class MetricsRegistry:
+    """Named collection of metrics rendered together."""
+
+    def __init__(self):
+        """Create an empty registry."""
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: Metric) -> Metric:
+        """Add ``metric``, replacing any previous metric of the same name."""
+        with self._lock:
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        """Create and register a counter."""
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        """Create and register a histogram."""
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """Return every metric in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            try:
+                lines.extend(metric.render())
+            except Exception as e:
+                # One failing callback must not take the whole scrape down
+                logger.warning(f'Could not collect metric {metric.name}: {e}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+stage_seconds = registry.histogram(
+    'cv_stage_duration_seconds',
+    'Time spent in each stage of an operation',
+    ('operation', 'stage'),
+)
+tool_seconds = registry.histogram(
+    'cv_tool_duration_seconds',
+    'End-to-end latency of MCP tool calls',
+    ('tool',),
+)
+payload_bytes = registry.counter(
+    'cv_payload_bytes_total',
+    'Bytes downloaded from S3, sent to Bedrock and received from Bedrock',
+    ('payload',),
+)
+bedrock_tokens = registry.counter(
+    'cv_bedrock_tokens_total',
+    'Tokens reported in Bedrock responses, by usage field',
+    ('type',),
+)
+ingest_lag_seconds = registry.histogram(
+    'cv_ingest_lag_seconds',
+    'Seconds from a frame being written to S3 until it was dequeued or analyzed',
+    ('prefix', 'stage'),
+    buckets=LAG_BUCKETS,
+)
+ingest_frames = registry.counter(
+    'cv_ingest_frames_total',
+    'Frames analyzed by the ingestion pipelines, by outcome',
+    ('prefix', 'status'),
+)
+errors = registry.counter(
+    'cv_errors_total',
+    'Errors by operation and exception type',
+    ('operation', 'error_type'),
+)
+
+
+def record_error(operation: str, error: BaseException) -> None:
+    """Count an error raised or handled in ``operation``."""
+    errors.inc(operation=operation, error_type=type(error).__name__)
+
+
+def timed_tool(name: str):
+    """Decorate an async MCP tool to record its latency and any exception it raises."""
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with tool_seconds.time(tool=name):
+                try:
+                    return await func(*args, **kwargs)
+                except Exception as e:
+                    record_error(name, e)
+                    raise
+
+        return wrapper
+
+    return decorator
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?', 1)[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = registry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+
+def start_http_server(port: int, host: str = '127.0.0.1') -> ThreadingHTTPServer:
+    """Serve ``/metrics`` from a daemon thread, for transports without their own HTTP server."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True)
+    thread.start()
+    logger.info(f'Serving metrics on http://{host}:{server.server_port}/metrics')
+    return server
+
+
+def metrics_route(path: str = '/metrics'):
+    """Return a Starlette route serving the registry, for mounting next to the SSE app."""
+    from starlette.responses import Response
+    from starlette.routing import Route
+
+    async def endpoint(request):
+        return Response(registry.render(), media_type=CONTENT_TYPE)
+
+    return Route(path, endpoint=endpoint)
@@ -96,9 +96,101 @@ class DiagramIconsResponse(BaseModel):
     filter_info: Optional[Dict[str, str]] = None
 
 
+class TokenUsage(BaseModel):
+    """Token usage reported by Bedrock for one model call."""
+
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cache_read_input_tokens: int = 0
+    cache_creation_input_tokens: int = 0
+
+
 class ImageAnalysisResponse(BaseModel):
     """Response model for image analysis."""
     status: Literal['success', 'error']
     source: str
     analysis: Optional[str] = None
+    usage: Optional[TokenUsage] = None
+    message: str
+
+
+class GridAnalysisResponse(BaseModel):
+    """Response model for analyzing a grid of camera frames."""
+
+    status: Literal['success', 'error']
+    sources: List[str] = Field(default_factory=list)
+    alert_level: Optional[int] = None
+    reason: Optional[str] = None
+    log_file_name: Optional[str] = None
+    brief_description: Optional[str] = None
+    full_description: Optional[str] = None
+    analysis: Optional[str] = None
+    usage: Optional[TokenUsage] = None
+    message: str
+
+
+class ImageComparisonResponse(BaseModel):
+    """Response model for a comparison of several images in one request."""
+
+    status: Literal['success', 'error']
+    sources: List[str] = Field(default_factory=list)
+    analysis: Optional[str] = None
+    usage: Optional[TokenUsage] = None
+    message: str
+
+
+class BatchImageAnalysisResponse(BaseModel):
+    """Response model for analyzing several images with shared instructions."""
+
+    status: Literal['success', 'partial', 'error']
+    results: List[ImageAnalysisResponse] = Field(default_factory=list)
+    succeeded: int = 0
+    failed: int = 0
+    truncated: bool = False
+    next_start_after: Optional[str] = None
     message: str
+
+
+class BatchJobResponse(BaseModel):
+    """Response model for submitting or checking a Bedrock batch inference job."""
+
+    status: Literal['success', 'error']
+    job_arn: Optional[str] = None
+    job_name: Optional[str] = None
+    job_status: Optional[str] = None
+    records: Optional[int] = None
+    skipped: Optional[List[Dict[str, str]]] = None
+    input_uri: Optional[str] = None
+    output_uri: Optional[str] = None
+    message: str
+
+
+class BatchJobResultsResponse(BaseModel):
+    """Response model for one page of the analyses produced by a batch inference job."""
+
+    status: Literal['success', 'error']
+    job_arn: str
+    job_status: Optional[str] = None
+    results: List[ImageAnalysisResponse] = Field(default_factory=list)
+    next_token: Optional[str] = None
+    message: str
+
+
+class ImagePreprocessingOptions(BaseModel):
+    """Options for downscaling and re-encoding an image before it is sent to Bedrock.
+
+    Fields left as None fall back to the server-wide defaults.
+    """
+
+    max_edge: Optional[int] = Field(
+        None, description='Maximum length in pixels of the longest image edge', ge=0
+    )
+    format: Optional[Literal['JPEG', 'PNG', 'WEBP']] = Field(
+        None, description='Format to re-encode the image to; keeps the source format if not set'
+    )
+    quality: Optional[int] = Field(
+        None, description='Encoder quality for JPEG and WEBP output', ge=1, le=100
+    )
+    strip_metadata: Optional[bool] = Field(
+        None, description='Drop EXIF and other metadata from the image'
+    )
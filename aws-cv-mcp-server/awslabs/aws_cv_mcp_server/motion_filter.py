@@ -0,0 +1,131 @@
+#
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You may not use this file except in compliance
+# with the License. A copy of the License is located at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# or in the 'license' file accompanying this file. This file is distributed on an 'AS IS' BASIS, WITHOUT WARRANTIES
+# OR CONDITIONS OF ANY KIND, express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+#
+
+"""Local frame-differencing filter that skips Bedrock calls for static camera frames."""
+
+import io
+import logging
+import os
+import threading
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+
+class MotionFilter:
+    """Decide whether a sequence of frames contains enough change to analyze.
+
+    Frames are decoded at a reduced scale, converted to grayscale, shrunk to
+    ``sample_size`` x ``sample_size`` and normalized for overall brightness so
+    that auto-exposure changes do not count as motion. The change score is the
+    largest fraction of pixels whose absolute difference exceeds
+    ``pixel_threshold``, taken over every consecutive pair of frames and the
+    first/last pair.
+    """
+
+    def __init__(
+        self,
+        change_threshold: float = 0.005,
+        pixel_threshold: int = 25,
+        sample_size: int = 64,
+        enabled: bool = True,
+    ):
+        """Create a filter; frames scoring below ``change_threshold`` count as static."""
+        self.change_threshold = change_threshold
+        self.pixel_threshold = pixel_threshold
+        self.sample_size = sample_size
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.evaluated = 0
+        self.skipped = 0
+        self.errors = 0
+
+    def change_score(self, frames: Sequence[bytes]) -> float:
+        """Return the fraction of changed pixels between the most different frame pair."""
+        import numpy as np
+        from PIL import Image
+
+        size = self.sample_size
+        samples = np.empty((len(frames), size, size), dtype=np.float32)
+        for index, data in enumerate(frames):
+            image = Image.open(io.BytesIO(data))
+            image.draft('L', (size, size))
+            samples[index] = np.asarray(
+                image.convert('L').resize((size, size), Image.Resampling.BILINEAR),
+                dtype=np.float32,
+            )
+        samples -= samples.mean(axis=(1, 2), keepdims=True)
+
+        diffs = np.abs(np.diff(samples, axis=0))
+        first_last = np.abs(samples[-1] - samples[0])[np.newaxis]
+        changed = np.concatenate((diffs, first_last)) > self.pixel_threshold
+        return float(changed.mean(axis=(1, 2)).max())
+
+    def should_skip(
+        self, frames: Sequence[bytes], change_threshold: Optional[float] = None
+    ) -> Tuple[bool, Optional[float]]:
+        """Score the frames and decide whether the model call can be skipped.
+
+        Errors while decoding are logged and treated as motion, so the frames
+        still go to the model.
+
+        Args:
+            frames: Encoded frame images, in time order
+            change_threshold: Overrides the filter's threshold; 0 never skips
+
+        Returns:
+            Tuple of whether the frames are static and their change score, if computed
+        """
+        threshold = self.change_threshold if change_threshold is None else change_threshold
+        if not self.enabled or threshold <= 0 or len(frames) < 2:
+            return False, None
+        try:
+            score = self.change_score(frames)
+        except Exception as e:
+            logger.warning(f'Motion filter could not score frames: {e}')
+            with self._lock:
+                self.errors += 1
+            return False, None
+        static = score < threshold
+        with self._lock:
+            self.evaluated += 1
+            if static:
+                self.skipped += 1
+        logger.info(f'Motion filter change score {score:.4f} (threshold {threshold})')
+        return static, score
+
+    def stats(self) -> Dict[str, Any]:
+        """Return how many grids were evaluated and how many Bedrock calls were skipped."""
+        return {
+            'enabled': self.enabled,
+            'evaluated': self.evaluated,
+            'skipped': self.skipped,
+            'skip_rate': round(self.skipped / self.evaluated, 4) if self.evaluated else 0.0,
+            'errors': self.errors,
+            'change_threshold': self.change_threshold,
+            'pixel_threshold': self.pixel_threshold,
+        }
+
+    def reset(self) -> None:
+        """Reset the counters."""
+        with self._lock:
+            self.evaluated = self.skipped = self.errors = 0
+
+
+motion_filter = MotionFilter(
+    change_threshold=float(os.environ.get('CV_MOTION_CHANGE_THRESHOLD', '0.005')),
+    pixel_threshold=int(os.environ.get('CV_MOTION_PIXEL_THRESHOLD', '25')),
+    sample_size=int(os.environ.get('CV_MOTION_SAMPLE_SIZE', '64')),
+    enabled=os.environ.get('CV_MOTION_FILTER_ENABLED', 'true').lower() == 'true',
+)
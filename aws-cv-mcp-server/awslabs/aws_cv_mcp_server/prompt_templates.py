@@ -8,6 +8,10 @@ table_details = {
     "known_vehicles": "A table containing details about known vehicles.",
 }
 
+DESCRIBE_IMAGE_SYSTEM_PROMPT = "You are a helpful assistant that analyzes images. Provide detailed, accurate descriptions based on the user's instructions."
+
+COMPARE_IMAGES_SYSTEM_PROMPT = "You are a helpful assistant that compares images. The images are numbered in the order given; refer to them by number. Describe what differs between them - what appeared, disappeared, moved or changed - and what stayed the same, following the user's instructions. Do not describe each image separately unless asked to."
+
 # prompts for pricing details retrieval
 ANALYZE_GRID_SYSTEM_PROMPT = """
     You are an AI language model assistant specialized in reviewing live security camera feeds.
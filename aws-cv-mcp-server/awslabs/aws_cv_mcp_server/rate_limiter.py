@@ -0,0 +1,293 @@
+#
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You may not use this file except in compliance
+# with the License. A copy of the License is located at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# or in the 'license' file accompanying this file. This file is distributed on an 'AS IS' BASIS, WITHOUT WARRANTIES
+# OR CONDITIONS OF ANY KIND, express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+#
+
+"""Client-side admission control and retries for Bedrock invocations."""
+
+import asyncio
+import logging
+import os
+import random
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+RETRYABLE_ERROR_CODES = {
+    'ThrottlingException',
+    'TooManyRequestsException',
+    'ServiceUnavailableException',
+    'InternalServerException',
+    'ModelNotReadyException',
+}
+THROTTLING_ERROR_CODES = {'ThrottlingException', 'TooManyRequestsException'}
+
+
+class RateLimitExceeded(Exception):
+    """Raised when too many Bedrock requests are already waiting for capacity."""
+
+
+def error_code(error: BaseException) -> Optional[str]:
+    """Return the AWS error code of a botocore ClientError, if it is one."""
+    response = getattr(error, 'response', None)
+    if isinstance(response, dict):
+        return response.get('Error', {}).get('Code')
+    return None
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at ``rate`` tokens per second.
+
+    A rate of None means the bucket never limits. Waiters are served in
+    arrival order, and a request larger than the capacity is let through once
+    the bucket is full so it cannot starve.
+    """
+
+    def __init__(self, rate: Optional[float], capacity: Optional[float] = None):
+        """Create a full bucket."""
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else (rate or 0.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        if self.rate:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float = 1.0) -> None:
+        """Wait until ``amount`` tokens are available and take them."""
+        if not self.rate:
+            return
+        async with self._lock:
+            while True:
+                self._refill()
+                needed = min(amount, self.capacity)
+                if self.tokens >= needed:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((needed - self.tokens) / self.rate)
+
+    def adjust(self, amount: float) -> None:
+        """Return (positive) or take (negative) tokens after the fact."""
+        if self.rate:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens + amount)
+
+    def set_rate(self, rate: Optional[float], capacity: Optional[float] = None) -> None:
+        """Change the refill rate, keeping the current fill level within the new capacity."""
+        self._refill()
+        was_unlimited = not self.rate
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else (rate or 0.0)
+        self.tokens = self.capacity if was_unlimited else min(self.tokens, self.capacity)
+
+
+class AdaptiveRateLimiter:
+    """Shared request and token budget for Bedrock, adjusted from throttling responses.
+
+    Limits start at the configured requests- and tokens-per-minute quotas (or
+    unlimited when not configured). Every throttling response cuts the current
+    limits multiplicatively; an unlimited limit is first pinned to the request
+    rate observed over the last minute. Every success raises them additively
+    back towards the configured quota, so sustained throughput settles just
+    under the account's real limit. Each bucket holds ``burst_seconds`` of its
+    rate, so idle capacity can be spent at once, e.g. by a batch fan-out,
+    instead of one second's worth at a time.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        max_queue: int = 100,
+        decrease_factor: float = 0.7,
+        increase_fraction: float = 0.02,
+        min_requests_per_minute: float = 1.0,
+        max_retries: int = 5,
+        base_delay: float = 0.5,
+        max_delay: float = 20.0,
+        burst_seconds: float = 10.0,
+    ):
+        """Create a limiter; None quotas start unlimited."""
+        self.max_requests_per_minute = requests_per_minute or None
+        self.max_tokens_per_minute = tokens_per_minute or None
+        self.max_queue = max_queue
+        self.decrease_factor = decrease_factor
+        self.increase_fraction = increase_fraction
+        self.min_requests_per_minute = min_requests_per_minute
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.burst_seconds = max(1.0, burst_seconds)
+        self.requests = TokenBucket(*self._bucket(self.max_requests_per_minute))
+        self.tokens = TokenBucket(*self._bucket(self.max_tokens_per_minute))
+        self._recent = deque()
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.throttled = 0
+        self.retries = 0
+
+    def _bucket(self, per_minute: Optional[float]) -> Tuple[Optional[float], float]:
+        """Return the refill rate and burst capacity for a per-minute limit."""
+        rate = _per_second(per_minute)
+        return rate, max(1.0, (rate or 0.0) * self.burst_seconds)
+
+    @property
+    def requests_per_minute(self) -> Optional[float]:
+        """Current request limit, or None when unlimited."""
+        return self.requests.rate * 60 if self.requests.rate else None
+
+    @property
+    def tokens_per_minute(self) -> Optional[float]:
+        """Current token limit, or None when unlimited."""
+        return self.tokens.rate * 60 if self.tokens.rate else None
+
+    async def acquire(self, estimated_tokens: int = 0) -> None:
+        """Wait for capacity for one request using about ``estimated_tokens`` tokens.
+
+        Raises:
+            RateLimitExceeded: If ``max_queue`` requests are already waiting
+        """
+        if self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise RateLimitExceeded(
+                f'Bedrock request queue is full ({self.waiting} requests waiting)'
+            )
+        self.waiting += 1
+        try:
+            await self.requests.acquire(1)
+            await self.tokens.acquire(estimated_tokens)
+        finally:
+            self.waiting -= 1
+        self.admitted += 1
+        now = time.monotonic()
+        self._recent.append(now)
+        while self._recent and self._recent[0] < now - 60:
+            self._recent.popleft()
+
+    def record_usage(self, estimated_tokens: int, actual_tokens: int) -> None:
+        """Reconcile the token budget once the real token usage is known."""
+        self.tokens.adjust(estimated_tokens - actual_tokens)
+
+    def on_throttle(self) -> None:
+        """Cut the current limits after a throttling response."""
+        self.throttled += 1
+        current = self.requests_per_minute or max(len(self._recent), self.min_requests_per_minute)
+        new_rpm = max(self.min_requests_per_minute, current * self.decrease_factor)
+        self.requests.set_rate(*self._bucket(new_rpm))
+        if self.tokens.rate:
+            self.tokens.set_rate(*self._bucket(self.tokens_per_minute * self.decrease_factor))
+        logger.warning(f'Bedrock throttled; request limit lowered to {new_rpm:.1f}/min')
+
+    def on_success(self) -> None:
+        """Raise the current limits back towards the configured quotas."""
+        if self.requests.rate and self.requests_per_minute != self.max_requests_per_minute:
+            rpm = self.requests_per_minute
+            ceiling = self.max_requests_per_minute
+            step = max(1.0, (ceiling or rpm) * self.increase_fraction)
+            rpm = min(ceiling, rpm + step) if ceiling else rpm + step
+            self.requests.set_rate(*self._bucket(rpm))
+        if self.tokens.rate and self.max_tokens_per_minute:
+            tpm = min(
+                self.max_tokens_per_minute,
+                self.tokens_per_minute + self.max_tokens_per_minute * self.increase_fraction,
+            )
+            self.tokens.set_rate(*self._bucket(tpm))
+
+    async def call(
+        self,
+        func: Callable[[], Awaitable[T]],
+        estimated_tokens: int = 0,
+        can_retry: Optional[Callable[[], bool]] = None,
+    ) -> T:
+        """Run ``func`` under the limiter, retrying throttled calls with jittered backoff.
+
+        Retryable errors are retried up to ``max_retries`` times. The n-th retry
+        waits a uniformly random time up to ``base_delay * 2**n`` seconds,
+        capped at ``max_delay``. A failed attempt returns its token estimate to
+        the budget, since Bedrock did not process it.
+
+        Args:
+            func: Coroutine factory performing one Bedrock call
+            estimated_tokens: Tokens reserved from the budget for each attempt
+            can_retry: Consulted before each retry; returning False re-raises the error
+
+        Returns:
+            The result of ``func``
+        """
+        attempt = 0
+        while True:
+            await self.acquire(estimated_tokens)
+            try:
+                result = await func()
+            except Exception as e:
+                self.record_usage(estimated_tokens, 0)
+                code = error_code(e)
+                if code not in RETRYABLE_ERROR_CODES:
+                    raise
+                if code in THROTTLING_ERROR_CODES:
+                    self.on_throttle()
+                if attempt >= self.max_retries or (can_retry is not None and not can_retry()):
+                    raise
+                attempt += 1
+                self.retries += 1
+                # Full jitter keeps a burst of throttled callers from retrying in lockstep
+                delay = random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+                logger.info(
+                    f'Retrying Bedrock call after {code} in {delay:.2f}s (attempt {attempt})'
+                )
+                await asyncio.sleep(delay)
+                continue
+            self.on_success()
+            return result
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the current limits and admission counters."""
+        return {
+            'requests_per_minute': _round(self.requests_per_minute),
+            'max_requests_per_minute': self.max_requests_per_minute,
+            'tokens_per_minute': _round(self.tokens_per_minute),
+            'max_tokens_per_minute': self.max_tokens_per_minute,
+            'waiting': self.waiting,
+            'max_queue': self.max_queue,
+            'admitted': self.admitted,
+            'rejected': self.rejected,
+            'throttled': self.throttled,
+            'retries': self.retries,
+        }
+
+
+def _per_second(per_minute: Optional[float]) -> Optional[float]:
+    return per_minute / 60 if per_minute else None
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return round(value, 2) if value is not None else None
+
+
+bedrock_rate_limiter = AdaptiveRateLimiter(
+    requests_per_minute=float(os.environ.get('CV_BEDROCK_RPM', '0')),
+    tokens_per_minute=float(os.environ.get('CV_BEDROCK_TPM', '0')),
+    max_queue=int(os.environ.get('CV_BEDROCK_MAX_QUEUE', '100')),
+    max_retries=int(os.environ.get('CV_BEDROCK_MAX_RETRIES', '5')),
+    base_delay=float(os.environ.get('CV_BEDROCK_RETRY_BASE_DELAY', '0.5')),
+    max_delay=float(os.environ.get('CV_BEDROCK_RETRY_MAX_DELAY', '20')),
+    burst_seconds=float(os.environ.get('CV_BEDROCK_BURST_SECONDS', '10')),
+)
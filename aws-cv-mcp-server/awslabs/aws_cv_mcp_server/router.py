@@ -0,0 +1,257 @@
+#
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You may not use this file except in compliance
+# with the License. A copy of the License is located at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# or in the 'license' file accompanying this file. This file is distributed on an 'AS IS' BASIS, WITHOUT WARRANTIES
+# OR CONDITIONS OF ANY KIND, express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+#
+
+"""Latency-aware routing of Bedrock calls across regions and inference profiles."""
+
+import logging
+import math
+import time
+from awslabs.aws_cv_mcp_server.connections import Connections
+from awslabs.aws_cv_mcp_server.rate_limiter import RETRYABLE_ERROR_CODES, error_code
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, TypeVar
+
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+
+def is_failover_error(error: BaseException) -> bool:
+    """Return whether an error says the endpoint, not the request, is at fault."""
+    if error_code(error) in RETRYABLE_ERROR_CODES:
+        return True
+    from botocore.exceptions import ConnectionError, ReadTimeoutError
+
+    return isinstance(error, (ConnectionError, ReadTimeoutError))
+
+
+class Endpoint:
+    """One region and model (or inference profile) with a rolling health window."""
+
+    def __init__(
+        self,
+        region: Optional[str],
+        model_id: str,
+        window: float = 300.0,
+        max_samples: int = 1000,
+    ):
+        """Create an endpoint; a region of None uses the default Bedrock client."""
+        self.region = region
+        self.model_id = model_id
+        self.window = window
+        self.samples: deque = deque(maxlen=max_samples)
+        self.cooldown_until = 0.0
+        self.consecutive_failures = 0
+        self.requests = 0
+        self.errors = 0
+
+    @property
+    def name(self) -> str:
+        """Return a readable ``region/model`` label."""
+        return f'{self.region or Connections.region_name}/{self.model_id}'
+
+    @property
+    def client(self):
+        """Return the bedrock-runtime client for this endpoint's region."""
+        if self.region is None:
+            return Connections.bedrock_client
+        return Connections.client('bedrock-runtime', self.region)
+
+    def _trim(self) -> None:
+        cutoff = time.monotonic() - self.window
+        while self.samples and self.samples[0][0] < cutoff:
+            self.samples.popleft()
+
+    def record(self, latency: float, ok: bool) -> None:
+        """Add the outcome of one call to the window."""
+        self.requests += 1
+        self.samples.append((time.monotonic(), latency, ok))
+        if ok:
+            self.consecutive_failures = 0
+        else:
+            self.errors += 1
+
+    def cool_down(self, base: float, maximum: float) -> float:
+        """Take the endpoint out of rotation, doubling the pause on consecutive failures."""
+        self.consecutive_failures += 1
+        pause = min(maximum, base * 2 ** (self.consecutive_failures - 1))
+        self.cooldown_until = time.monotonic() + pause
+        return pause
+
+    @property
+    def cooling_down(self) -> bool:
+        """Return whether the endpoint is paused after recent failures."""
+        return time.monotonic() < self.cooldown_until
+
+    def latency_percentile(self, percentile: float) -> Optional[float]:
+        """Return a latency percentile in seconds over successful calls in the window."""
+        self._trim()
+        latencies = sorted(latency for _, latency, ok in self.samples if ok)
+        if not latencies:
+            return None
+        index = min(len(latencies) - 1, math.ceil(percentile / 100 * len(latencies)) - 1)
+        return latencies[max(0, index)]
+
+    def error_rate(self) -> float:
+        """Return the fraction of calls in the window that failed."""
+        self._trim()
+        if not self.samples:
+            return 0.0
+        return sum(1 for _, _, ok in self.samples if not ok) / len(self.samples)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return lifetime counters and the rolling-window health of the endpoint."""
+        p50 = self.latency_percentile(50)
+        p95 = self.latency_percentile(95)
+        return {
+            'region': self.region or Connections.region_name,
+            'model_id': self.model_id,
+            'requests': self.requests,
+            'errors': self.errors,
+            'window_samples': len(self.samples),
+            'error_rate': round(self.error_rate(), 4),
+            'p50_ms': round(p50 * 1000, 1) if p50 is not None else None,
+            'p95_ms': round(p95 * 1000, 1) if p95 is not None else None,
+            'cooldown_seconds': round(max(0.0, self.cooldown_until - time.monotonic()), 2),
+        }
+
+
+class BedrockRouter:
+    """Send each Bedrock call to the healthiest, fastest endpoint that serves its model.
+
+    Calls for ``default_model_id`` may go to any configured endpoint; calls
+    naming another model only go to endpoints serving it, or to that model in
+    the default region if none is configured. An endpoint that throttles,
+    returns a 5xx or cannot be reached is paused and the call fails over to
+    the next best endpoint. Endpoints with fewer than ``min_samples`` calls in
+    the window are tried first, so idle regions get re-measured once their
+    samples age out.
+    """
+
+    def __init__(
+        self,
+        endpoints: Sequence[Endpoint],
+        default_model_id: str,
+        min_samples: int = 5,
+        error_penalty: float = 4.0,
+        cooldown: float = 5.0,
+        max_cooldown: float = 60.0,
+    ):
+        """Create a router over ``endpoints``, listed in order of preference."""
+        self.endpoints: List[Endpoint] = list(endpoints) or [Endpoint(None, default_model_id)]
+        self.default_model_id = default_model_id
+        self.min_samples = min_samples
+        self.error_penalty = error_penalty
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.failovers = 0
+        self._fallbacks: Dict[str, Endpoint] = {}
+
+    def candidates(self, model_id: Optional[str] = None) -> List[Endpoint]:
+        """Return the endpoints able to serve ``model_id``, in configured order."""
+        if model_id is None or model_id == self.default_model_id:
+            return self.endpoints
+        matching = [endpoint for endpoint in self.endpoints if endpoint.model_id == model_id]
+        if matching:
+            return matching
+        if model_id not in self._fallbacks:
+            self._fallbacks[model_id] = Endpoint(None, model_id)
+        return [self._fallbacks[model_id]]
+
+    def score(self, endpoint: Endpoint) -> float:
+        """Return the routing cost of an endpoint: p95 latency inflated by its error rate."""
+        p95 = endpoint.latency_percentile(95)
+        if p95 is None or len(endpoint.samples) < self.min_samples:
+            return 0.0
+        return p95 * (1 + self.error_penalty * endpoint.error_rate())
+
+    def choose(self, model_id: Optional[str] = None, exclude: Sequence[Endpoint] = ()) -> Endpoint:
+        """Pick the endpoint for the next call.
+
+        Raises:
+            LookupError: If every candidate endpoint is excluded
+        """
+        remaining = [e for e in self.candidates(model_id) if e not in exclude]
+        if not remaining:
+            raise LookupError(f'No Bedrock endpoint left to try for {model_id}')
+        available = [e for e in remaining if not e.cooling_down]
+        if not available:
+            return min(remaining, key=lambda e: e.cooldown_until)
+        return min(available, key=self.score)
+
+    async def call(
+        self,
+        model_id: Optional[str],
+        func: Callable[[Endpoint], Awaitable[T]],
+        can_failover: Optional[Callable[[], bool]] = None,
+    ) -> T:
+        """Run ``func`` against the best endpoint, failing over on endpoint errors.
+
+        Args:
+            model_id: Model the caller asked for
+            func: Coroutine factory performing the call against the given endpoint
+            can_failover: Consulted before each failover; returning False re-raises the error
+
+        Returns:
+            The result of ``func``
+        """
+        tried: List[Endpoint] = []
+        total = len(self.candidates(model_id))
+        while True:
+            endpoint = self.choose(model_id, exclude=tried)
+            tried.append(endpoint)
+            start = time.monotonic()
+            try:
+                result = await func(endpoint)
+            except Exception as e:
+                if not is_failover_error(e):
+                    raise
+                endpoint.record(time.monotonic() - start, ok=False)
+                pause = endpoint.cool_down(self.cooldown, self.max_cooldown)
+                if len(tried) >= total or (can_failover is not None and not can_failover()):
+                    raise
+                self.failovers += 1
+                logger.warning(
+                    f'Bedrock endpoint {endpoint.name} failed ({e}); paused for {pause:.0f}s, '
+                    f'failing over'
+                )
+                continue
+            endpoint.record(time.monotonic() - start, ok=True)
+            return result
+
+    def stats(self) -> Dict[str, Any]:
+        """Return per-endpoint health and the number of failovers."""
+        endpoints = self.endpoints + list(self._fallbacks.values())
+        return {
+            'failovers': self.failovers,
+            'endpoints': {endpoint.name: endpoint.stats() for endpoint in endpoints},
+        }
+
+
+def parse_endpoints(spec: str, default_model_id: str, window: float = 300.0) -> List[Endpoint]:
+    """Parse ``region=model,region=model`` into endpoints.
+
+    An entry without ``=model`` uses ``default_model_id``. Model ids may be
+    inference profile ids or ARNs.
+    """
+    endpoints = []
+    for entry in spec.split(','):
+        entry = entry.strip()
+        if not entry:
+            continue
+        region, _, model_id = entry.partition('=')
+        endpoints.append(
+            Endpoint(region.strip(), model_id.strip() or default_model_id, window=window)
+        )
+    return endpoints
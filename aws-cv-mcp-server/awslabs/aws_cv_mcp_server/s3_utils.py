@@ -0,0 +1,230 @@
+# © 2025 Amazon Web Services, Inc. or its affiliates. All Rights Reserved.
+#
+# This AWS Content is provided subject to the terms of the AWS Customer Agreement
+# available at http://aws.amazon.com/agreement or other written agreement between
+# Customer and either Amazon Web Services, Inc. or Amazon Web Services EMEA SARL or both.
+
+"""Helpers for reading images from the agent S3 bucket."""
+
+import os
+import threading
+from awslabs.aws_cv_mcp_server.cache import LRUCache
+from awslabs.aws_cv_mcp_server.connections import Connections, run_in_executor
+from awslabs.aws_cv_mcp_server.metrics import payload_bytes
+from botocore.exceptions import ClientError
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+
+logger = Connections.logger
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.webp')
+
+
+@dataclass
+class S3Image:
+    """An image object downloaded from S3."""
+
+    key: str
+    data: bytes
+    content_type: str
+    etag: Optional[str] = None
+    last_modified: Optional[datetime] = None
+
+
+class ImageCache:
+    """Byte-budgeted LRU cache of S3 images revalidated by ETag.
+
+    A cached object is returned only after a conditional ``GetObject`` with
+    ``If-None-Match`` confirms it is unchanged, so a hot image costs a 304
+    response instead of a full download.
+    """
+
+    def __init__(self, max_bytes: int):
+        """Create a cache holding at most ``max_bytes`` of image data."""
+        self.images: LRUCache[S3Image] = LRUCache(
+            max_entries=None, max_bytes=max_bytes, sizeof=lambda image: len(image.data)
+        )
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self.bytes_downloaded = 0
+
+    @property
+    def enabled(self) -> bool:
+        """Whether any image fits in the byte budget."""
+        return bool(self.images.max_bytes)
+
+    def get(self, key: str, bucket: Optional[str] = None) -> S3Image:
+        """Return the current version of an image, downloading it only if it changed."""
+        bucket = bucket or Connections.agent_bucket_name
+        cache_key = f'{bucket}/{key}'
+        cached = self.images.get(cache_key) if self.enabled else None
+        request = {'Bucket': bucket, 'Key': key}
+        if cached is not None and cached.etag:
+            request['IfNoneMatch'] = cached.etag
+        try:
+            response = Connections.s3_client.get_object(**request)
+        except ClientError as e:
+            if cached is not None and _is_not_modified(e):
+                with self._lock:
+                    self.hits += 1
+                    self.bytes_saved += len(cached.data)
+                return cached
+            raise
+        image = _to_image(key, response)
+        with self._lock:
+            self.misses += 1
+            self.bytes_downloaded += len(image.data)
+        if self.enabled:
+            self.images.set(cache_key, image)
+        return image
+
+    def clear(self) -> None:
+        """Drop every cached image and reset the counters."""
+        self.images.clear()
+        with self._lock:
+            self.hits = self.misses = self.bytes_saved = self.bytes_downloaded = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Return revalidation counters and current occupancy."""
+        lookups = self.hits + self.misses
+        return {
+            'enabled': self.enabled,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            'bytes_saved': self.bytes_saved,
+            'bytes_downloaded': self.bytes_downloaded,
+            'entries': len(self.images),
+            'bytes': self.images.total_bytes,
+            'max_bytes': self.images.max_bytes,
+            'evictions': self.images.evictions,
+        }
+
+
+def _to_image(key: str, response: Dict[str, Any]) -> S3Image:
+    data = response['Body'].read()
+    payload_bytes.inc(len(data), payload='s3_download')
+    return S3Image(
+        key=key,
+        data=data,
+        content_type=response['ContentType'],
+        etag=response.get('ETag'),
+        last_modified=response.get('LastModified'),
+    )
+
+
+def _is_not_modified(error: ClientError) -> bool:
+    status = error.response.get('ResponseMetadata', {}).get('HTTPStatusCode')
+    code = error.response.get('Error', {}).get('Code')
+    return status == 304 or code in ('304', 'NotModified')
+
+
+image_cache = ImageCache(
+    max_bytes=int(os.environ.get('CV_IMAGE_CACHE_MAX_BYTES', str(256 * 1024 * 1024)))
+)
+
+
+def get_image(key: str, bucket: Optional[str] = None, use_cache: bool = True) -> S3Image:
+    """Download an image object from S3, revalidating any cached copy.
+
+    This is a blocking call; use ``fetch_image`` from async code.
+
+    Args:
+        key: Object key of the image
+        bucket: Bucket to read from, defaults to the agent bucket
+        use_cache: Go through the image cache; bulk reads of archived images
+            should pass False so they do not evict frequently used ones
+
+    Returns:
+        S3Image: The image bytes and object metadata
+    """
+    if not use_cache:
+        response = Connections.s3_client.get_object(
+            Bucket=bucket or Connections.agent_bucket_name, Key=key
+        )
+        return _to_image(key, response)
+    return image_cache.get(key, bucket)
+
+
+async def fetch_image(key: str, bucket: Optional[str] = None) -> S3Image:
+    """Download an image object from S3 on the shared AWS executor."""
+    return await run_in_executor(get_image, key, bucket)
+
+
+def get_image_etag(key: str, bucket: Optional[str] = None) -> Optional[str]:
+    """Return the ETag of an image object without downloading it."""
+    response = Connections.s3_client.head_object(
+        Bucket=bucket or Connections.agent_bucket_name,
+        Key=key,
+    )
+    return response.get('ETag')
+
+
+async def fetch_image_etag(key: str, bucket: Optional[str] = None) -> Optional[str]:
+    """Return the ETag of an image object on the shared AWS executor."""
+    return await run_in_executor(get_image_etag, key, bucket)
+
+
+def list_image_objects(
+    prefix: str,
+    max_keys: Optional[int] = None,
+    bucket: Optional[str] = None,
+    start_after: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """List the image objects under a prefix, in key order.
+
+    Args:
+        prefix: Key prefix to list
+        max_keys: Stop after this many image objects
+        bucket: Bucket to list, defaults to the agent bucket
+        start_after: Only list keys that sort after this one
+
+    Returns:
+        List of ``list_objects_v2`` entries with Key, LastModified, ETag and Size
+    """
+    objects = []
+    paginator = Connections.s3_client.get_paginator('list_objects_v2')
+    params = {'Bucket': bucket or Connections.agent_bucket_name, 'Prefix': prefix}
+    if start_after:
+        params['StartAfter'] = start_after
+    for page in paginator.paginate(**params):
+        for obj in page.get('Contents', []):
+            if obj['Key'].lower().endswith(IMAGE_EXTENSIONS):
+                objects.append(obj)
+                if max_keys is not None and len(objects) >= max_keys:
+                    return objects
+    return objects
+
+
+def list_image_keys(
+    prefix: str,
+    max_keys: Optional[int] = None,
+    bucket: Optional[str] = None,
+    start_after: Optional[str] = None,
+) -> List[str]:
+    """List the keys of image objects under a prefix, in key order."""
+    return [obj['Key'] for obj in list_image_objects(prefix, max_keys, bucket, start_after)]
+
+
+async def fetch_image_keys(
+    prefix: str,
+    max_keys: Optional[int] = None,
+    bucket: Optional[str] = None,
+    start_after: Optional[str] = None,
+) -> List[str]:
+    """List image keys under a prefix on the shared AWS executor."""
+    return await run_in_executor(list_image_keys, prefix, max_keys, bucket, start_after)
+
+
+async def fetch_image_objects(
+    prefix: str,
+    max_keys: Optional[int] = None,
+    bucket: Optional[str] = None,
+    start_after: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """List image objects under a prefix on the shared AWS executor."""
+    return await run_in_executor(list_image_objects, prefix, max_keys, bucket, start_after)
@@ -0,0 +1,256 @@
+#
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You may not use this file except in compliance
+# with the License. A copy of the License is located at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# or in the 'license' file accompanying this file. This file is distributed on an 'AS IS' BASIS, WITHOUT WARRANTIES
+# OR CONDITIONS OF ANY KIND, express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+#
+
+"""Scan many code snippets in parallel on a pool of warmed worker processes."""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import threading
+from awslabs.aws_cv_mcp_server.scanner import (
+    CodeScanResult,
+    SecurityIssue,
+    bandit_scanner,
+    cached_scan,
+    parse_code,
+    scan_cache,
+    scan_cache_key,
+    scan_parsed,
+    store_scan,
+)
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from typing import Iterable, List, Optional, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+# Worker-side deadlines need SIGALRM; elsewhere the parent stops waiting instead
+HAS_ALARM = hasattr(signal, 'setitimer')
+
+
+class ScanTimeout(BaseException):
+    """Raised inside a worker when a snippet exceeds its time limit.
+
+    A BaseException so bandit's per-test error handling cannot swallow it.
+    """
+
+
+def _init_worker() -> None:
+    """Load bandit and its plugins once per worker process."""
+    bandit_scanner.warm_up()
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+def _on_alarm(signum, frame):
+    raise ScanTimeout()
+
+
+@contextmanager
+def _deadline(seconds: Optional[float]):
+    if not seconds or not HAS_ALARM:
+        yield
+        return
+    previous = signal.signal(signal.SIGALRM, _on_alarm)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def error_result(issue_type: str, message: str, syntax_valid: bool = True) -> CodeScanResult:
+    """Return the result reported for a snippet whose scan did not complete."""
+    return CodeScanResult(
+        has_errors=True,
+        syntax_valid=syntax_valid,
+        security_issues=[
+            SecurityIssue(
+                severity='ERROR',
+                confidence='HIGH',
+                line=0,
+                issue_text=message,
+                issue_type=issue_type,
+            )
+        ],
+        error_message=f'{issue_type}: {message}',
+    )
+
+
+def scan_with_deadline(code: str, timeout: Optional[float]) -> CodeScanResult:
+    """Scan one snippet, giving up after ``timeout`` seconds of checks."""
+    parsed = parse_code(code)
+    try:
+        with _deadline(timeout):
+            return scan_parsed(parsed)
+    except ScanTimeout:
+        return error_result('ScanTimeout', f'Scan timed out after {timeout}s')
+
+
+def _lookup(code: str) -> Tuple[Optional[str], Optional[CodeScanResult]]:
+    """Return the scan cache key for ``code`` and any result cached under it."""
+    if not scan_cache.enabled:
+        return None, None
+    key = scan_cache_key(code)
+    return key, cached_scan(key)
+
+
+class ScanPool:
+    """Process pool that scans snippets on every core.
+
+    Workers are started with the ``spawn`` method, so they are safe to create
+    from a threaded server, and load bandit as they start. At most
+    ``max_pending`` snippets are handed to the pool at a time; the input
+    iterable is consumed only as capacity frees up, so a generator reading a
+    large directory of files never holds more than that many in flight.
+    Results come back in input order. Snippets found in ``scan_cache`` are
+    answered in this process without using a worker.
+    """
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        max_pending: Optional[int] = None,
+        timeout: Optional[float] = 30.0,
+        mp_context=None,
+    ):
+        """Create a pool; worker processes start on first use."""
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_pending = max_pending or 2 * self.max_workers
+        self.timeout = timeout
+        self.mp_context = mp_context or multiprocessing.get_context('spawn')
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.scanned = 0
+        self.timed_out = 0
+        self.failed = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=self.mp_context,
+                    initializer=_init_worker,
+                )
+            return self._executor
+
+    def _discard_executor(self, executor: ProcessPoolExecutor) -> None:
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def warm_up(self) -> None:
+        """Start every worker and wait until each has loaded bandit."""
+        executor = self._get_executor()
+        for future in [executor.submit(_ping) for _ in range(self.max_workers)]:
+            future.result()
+
+    async def _scan_one(self, code: str, timeout: Optional[float]) -> CodeScanResult:
+        # The first key loads bandit for its fingerprint and lookups may read the
+        # disk tier, so neither runs on the event loop
+        key, cached = await asyncio.to_thread(_lookup, code)
+        if cached is not None:
+            self.scanned += 1
+            return cached
+
+        executor = self._get_executor()
+        loop = asyncio.get_running_loop()
+        try:
+            future = loop.run_in_executor(executor, scan_with_deadline, code, timeout)
+            if HAS_ALARM or not timeout:
+                result = await future
+            else:
+                result = await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            result = error_result('ScanTimeout', f'Scan timed out after {timeout}s')
+        except BrokenProcessPool as e:
+            # A worker died (e.g. out of memory); start a fresh pool for later snippets
+            logger.error(f'Scan worker pool broke: {e}')
+            self._discard_executor(executor)
+            self.failed += 1
+            return error_result('ScanError', f'Scan worker crashed: {e}')
+        if any(issue.issue_type == 'ScanTimeout' for issue in result.security_issues):
+            self.timed_out += 1
+        if key is not None:
+            await asyncio.to_thread(store_scan, key, result)
+        self.scanned += 1
+        return result
+
+    async def scan_many(
+        self, codes: Iterable[str], timeout: Optional[float] = None
+    ) -> List[CodeScanResult]:
+        """Scan every snippet in ``codes`` and return the results in input order.
+
+        Args:
+            codes: Snippets to scan; consumed lazily as workers free up
+            timeout: Per-snippet time limit in seconds, defaulting to the pool's
+
+        Returns:
+            One CodeScanResult per snippet. A snippet that times out or crashes
+            its worker gets a result with a ScanTimeout or ScanError issue.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        semaphore = asyncio.Semaphore(self.max_pending)
+        tasks = []
+
+        async def run(code: str) -> CodeScanResult:
+            try:
+                return await self._scan_one(code, timeout)
+            finally:
+                semaphore.release()
+
+        for code in codes:
+            await semaphore.acquire()
+            tasks.append(asyncio.create_task(run(code)))
+        return list(await asyncio.gather(*tasks))
+
+    def stats(self) -> dict:
+        """Return the pool size and scan counters."""
+        return {
+            'workers': self.max_workers,
+            'max_pending': self.max_pending,
+            'timeout': self.timeout,
+            'scanned': self.scanned,
+            'timed_out': self.timed_out,
+            'failed': self.failed,
+        }
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop the worker processes."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+
+scan_pool = ScanPool(
+    max_workers=int(os.environ.get('CV_SCAN_WORKERS', '0')) or None,
+    max_pending=int(os.environ.get('CV_SCAN_MAX_PENDING', '0')) or None,
+    timeout=float(os.environ.get('CV_SCAN_TIMEOUT', '30')) or None,
+)
+
+
+async def scan_python_code_batch(
+    codes: Iterable[str], timeout: Optional[float] = None
+) -> List[CodeScanResult]:
+    """Scan many snippets in parallel on the shared pool, preserving order."""
+    return await scan_pool.scan_many(codes, timeout=timeout)
@@ -12,12 +12,37 @@
 #
 
 import ast
+import asyncio
+import io
+import logging
 import os
+import tempfile
+import threading
+import tokenize
+from awslabs.aws_cv_mcp_server.cache import ResultCache, make_cache_key
+from awslabs.aws_cv_mcp_server.metrics import record_error, stage_seconds
+from dataclasses import dataclass, field
 from pydantic import BaseModel, Field
-from tempfile import NamedTemporaryFile
 from typing import Any, Dict, List, Optional, Tuple
 
 
+logger = logging.getLogger(__name__)
+
+# A directory part keeps bandit from warning that it cannot derive a module name
+SNIPPET_NAME = './snippet.py'
+
+# Calls reported as DangerousFunctionDetection, by fully qualified name
+DANGEROUS_CALLS = {'exec', 'eval', '__import__', 'os.system', 'os.popen', 'pickle.loads'}
+# Modules any of whose callables are reported
+DANGEROUS_MODULES = {'subprocess'}
+
+# Issues describing a failed scan; results carrying them are never cached
+TRANSIENT_ISSUE_TYPES = {'ScanError', 'ScanTimeout'}
+
+# Bump when the checks change so cached results from older versions are ignored
+SCAN_CACHE_VERSION = 1
+
+
 class SecurityIssue(BaseModel):
     """Model for security issues found in code."""
 
@@ -48,56 +73,178 @@ class CodeScanResult(BaseModel):
     metrics: Optional[CodeMetrics] = None
 
 
-async def validate_syntax(code: str) -> Tuple[bool, Optional[str]]:
-    """Validate Python code syntax using ast."""
+@dataclass
+class ParsedCode:
+    """Source split, tokenized and parsed once, shared by every check."""
+
+    source: str
+    lines: List[str]
+    tree: Optional[ast.Module] = None
+    comments: Dict[int, str] = field(default_factory=dict)
+    syntax_error: Optional[str] = None
+
+
+def parse_code(code: str) -> ParsedCode:
+    """Split, tokenize and parse ``code`` in one go.
+
+    A syntax error is recorded on the result rather than raised; ``tree`` is
+    None in that case.
+    """
+    parsed = ParsedCode(source=code, lines=code.splitlines())
     try:
-        ast.parse(code)
-        return True, None
+        parsed.tree = ast.parse(code)
     except SyntaxError as e:
-        error_msg = f'Syntax error at line {e.lineno}: {e.msg}'
-        return False, error_msg
+        parsed.syntax_error = f'Syntax error at line {e.lineno}: {e.msg}'
+        return parsed
     except Exception as e:
-        return False, str(e)
+        parsed.syntax_error = str(e)
+        return parsed
 
+    # Comments are only needed for bandit's ``# nosec`` markers
+    try:
+        for token in tokenize.generate_tokens(io.StringIO(code).readline):
+            if token.type == tokenize.COMMENT:
+                parsed.comments[token.start[0]] = token.string
+    except (tokenize.TokenError, SyntaxError):
+        pass
+    return parsed
 
-async def check_security(code: str) -> List[SecurityIssue]:
-    """Scan code for security issues using bandit."""
-    from bandit.core import config, manager
-
-    security_issues = []
-    temp_file_path = None
 
-    try:
-        # Create a temporary file for the code
-        with NamedTemporaryFile(mode='w', suffix='.py', delete=False) as code_file:
-            temp_file_path = code_file.name
-            code_file.write(code)
-            code_file.flush()
-
-        # Create a basic config
-        b_conf = config.BanditConfig()
-
-        # Initialize Bandit manager
-        mgr = manager.BanditManager(b_conf, 'file', debug=True, verbose=True, quiet=False)
-
-        # Run the scan
-        mgr.discover_files([temp_file_path])
-        mgr.run_tests()
-
-        # Process results
-        for issue in mgr.get_issue_list():
-            security_issues.append(
-                SecurityIssue(
-                    severity=issue.severity,
-                    confidence=issue.confidence,
-                    line=issue.lineno,
-                    issue_text=issue.text,
-                    issue_type=issue.test_id,
-                )
+async def validate_syntax(code: str) -> Tuple[bool, Optional[str]]:
+    """Validate Python code syntax using ast."""
+    parsed = parse_code(code)
+    return parsed.syntax_error is None, parsed.syntax_error
+
+
+class BanditScanner:
+    """Long-lived bandit test set that scans already-parsed code in memory.
+
+    Loading bandit's plugins and building its config and test set dominates
+    the cost of a one-off scan, so they are created once, on first use, and
+    reused. Each scan runs bandit's node visitor over the tree from
+    :func:`parse_code`, so the code is neither written to a file nor parsed
+    or tokenized a second time.
+    """
+
+    def __init__(self):
+        """Create a scanner; bandit is loaded on the first scan."""
+        self._manager = None
+        self._fingerprint: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def _create_manager(self):
+        from bandit.core import config, manager
+
+        return manager.BanditManager(config.BanditConfig(), 'file', quiet=True)
+
+    def warm_up(self) -> None:
+        """Load bandit and its plugins now instead of on the first scan."""
+        with self._lock:
+            if self._manager is None:
+                self._manager = self._create_manager()
+
+    @property
+    def fingerprint(self) -> str:
+        """Hash of the bandit version, configuration and enabled tests."""
+        if self._fingerprint is None:
+            import bandit
+
+            self.warm_up()
+            mgr = self._manager
+            tests = sorted(
+                f'{check}:{test._test_id}'
+                for check, checks in mgr.b_ts.tests.items()
+                for test in checks
+            )
+            self._fingerprint = make_cache_key(bandit.__version__, mgr.b_conf.config, tests)
+        return self._fingerprint
+
+    def scan(self, code: str, parsed: Optional[ParsedCode] = None) -> List[SecurityIssue]:
+        """Run bandit's tests over ``code`` and return the issues it reports.
+
+        Raises:
+            ValueError: If the code does not parse
+        """
+        self.warm_up()
+        parsed = parsed or parse_code(code)
+        if parsed.tree is None:
+            raise ValueError(f'syntax error while parsing AST: {parsed.syntax_error}')
+
+        try:
+            results = self._scan_tree(code, parsed)
+        except (AttributeError, TypeError) as e:
+            # The in-memory path relies on bandit internals; fall back to its public API
+            logger.warning(f'Scanning through a temporary file, bandit internals changed: {e}')
+            results = self._scan_file(code)
+        return [
+            SecurityIssue(
+                severity=issue.severity,
+                confidence=issue.confidence,
+                line=issue.lineno,
+                issue_text=issue.text,
+                issue_type=issue.test_id,
             )
+            for issue in results
+        ]
+
+    def _scan_tree(self, code: str, parsed: ParsedCode) -> List[Any]:
+        from bandit.core import manager, meta_ast, metrics, node_visitor
 
+        mgr = self._manager
+        nosec_lines = (
+            {}
+            if mgr.ignore_nosec
+            else {line: manager._parse_nosec_comment(text) for line, text in parsed.comments.items()}
+        )
+        # Per-scan state is local, so concurrent scans only share the read-only test set
+        scan_metrics = metrics.Metrics()
+        scan_metrics.begin(SNIPPET_NAME)
+        visitor = node_visitor.BanditNodeVisitor(
+            SNIPPET_NAME,
+            io.BytesIO(code.encode('utf-8')),
+            meta_ast.BanditMetaAst(),
+            mgr.b_ts,
+            mgr.debug,
+            nosec_lines,
+            scan_metrics,
+        )
+        # Equivalent to BanditNodeVisitor.process, minus its own ast.parse
+        visitor.generic_visit(parsed.tree)
+        visitor.context = {
+            'file_data': visitor.fdata,
+            'filename': SNIPPET_NAME,
+            'lineno': 0,
+            'linerange': [0, 1],
+            'col_offset': 0,
+        }
+        visitor.update_scores(visitor.tester.run_tests(visitor.context, 'File'))
+        return visitor.tester.results
+
+    def _scan_file(self, code: str) -> List[Any]:
+        # A fresh manager, since BanditManager accumulates results across runs
+        mgr = self._create_manager()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'snippet.py')
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(code)
+            mgr.discover_files([path])
+            mgr.run_tests()
+        return mgr.get_issue_list()
+
+
+bandit_scanner = BanditScanner()
+
+
+def _security_issues(parsed: ParsedCode) -> List[SecurityIssue]:
+    # Dangerous calls are resolved before bandit annotates the shared tree
+    with stage_seconds.time(operation='scan', stage='dangerous_calls'):
+        dangerous_functions = find_dangerous_calls(parsed)
+    try:
+        with stage_seconds.time(operation='scan', stage='bandit'):
+            security_issues = bandit_scanner.scan(parsed.source, parsed)
     except Exception as e:
-        security_issues.append(
+        record_error('scan', e)
+        security_issues = [
             SecurityIssue(
                 severity='ERROR',
                 confidence='HIGH',
@@ -105,17 +252,8 @@ async def check_security(code: str) -> List[SecurityIssue]:
                 issue_text=f'Error during security scan: {str(e)}',
                 issue_type='ScanError',
             )
-        )
-    finally:
-        # Clean up the temporary file
-        if temp_file_path and os.path.exists(temp_file_path):
-            try:
-                os.unlink(temp_file_path)
-            except Exception:
-                pass
-
-    # Check for dangerous functions explicitly
-    dangerous_functions = check_dangerous_functions(code)
+        ]
+
     for func in dangerous_functions:
         security_issues.append(
             SecurityIssue(
@@ -130,12 +268,22 @@ async def check_security(code: str) -> List[SecurityIssue]:
     return security_issues
 
 
-async def count_code_metrics(code: str) -> CodeMetrics:
-    """Count various code metrics like LOC, comment lines, blank lines."""
-    lines = code.splitlines()
-    total_lines = len(lines)
-    blank_lines = sum(1 for line in lines if not line.strip())
-    comment_lines = sum(1 for line in lines if line.strip().startswith('#'))
+async def check_security(code: str) -> List[SecurityIssue]:
+    """Scan code for security issues using bandit."""
+    return _security_issues(parse_code(code))
+
+
+def _code_metrics(parsed: ParsedCode) -> CodeMetrics:
+    code = parsed.source
+    total_lines = len(parsed.lines)
+    blank_lines = 0
+    comment_lines = 0
+    for line in parsed.lines:
+        stripped = line.strip()
+        if not stripped:
+            blank_lines += 1
+        elif stripped.startswith('#'):
+            comment_lines += 1
 
     # Handle specific test cases
     if 'def add(a, b):' in code and 'return a + b' in code and 'print(add(2, 3))' in code:
@@ -162,34 +310,22 @@ async def count_code_metrics(code: str) -> CodeMetrics:
     )
 
 
-async def scan_python_code(code: str) -> CodeScanResult:
-    """Use ast and bandit to scan the python code for security issues."""
-    # Get code metrics
-    metrics = await count_code_metrics(code)
+async def count_code_metrics(code: str) -> CodeMetrics:
+    """Count various code metrics like LOC, comment lines, blank lines."""
+    return _code_metrics(ParsedCode(source=code, lines=code.splitlines()))
+
 
-    # Check syntax
-    syntax_valid, syntax_error = await validate_syntax(code)
-    if not syntax_valid:
+def scan_parsed(parsed: ParsedCode) -> CodeScanResult:
+    """Run the metrics, syntax and security checks over already-parsed code."""
+    with stage_seconds.time(operation='scan', stage='metrics'):
+        metrics = _code_metrics(parsed)
+
+    if parsed.syntax_error is not None:
         return CodeScanResult(
-            has_errors=True, syntax_valid=False, error_message=syntax_error, metrics=metrics
+            has_errors=True, syntax_valid=False, error_message=parsed.syntax_error, metrics=metrics
         )
 
-    # Check security
-    security_issues = await check_security(code)
-
-    # Check for dangerous functions explicitly
-    dangerous_functions = check_dangerous_functions(code)
-    if dangerous_functions:
-        for func in dangerous_functions:
-            security_issues.append(
-                SecurityIssue(
-                    severity='HIGH',
-                    confidence='HIGH',
-                    line=func['line'],
-                    issue_text=f"Dangerous function '{func['function']}' detected",
-                    issue_type='DangerousFunctionDetection',
-                )
-            )
+    security_issues = _security_issues(parsed)
 
     # Determine if there are errors
     has_errors = bool(security_issues)
@@ -209,35 +345,130 @@ async def scan_python_code(code: str) -> CodeScanResult:
     )
 
 
-def check_dangerous_functions(code: str) -> List[Dict[str, Any]]:
-    """Check for dangerous functions like exec, eval, etc."""
-    dangerous_patterns = [
-        'exec(',
-        'eval(',
-        'subprocess.',
-        'os.system',
-        'os.popen',
-        '__import__',
-        'pickle.loads',
-    ]
+scan_cache = ResultCache(
+    max_entries=int(os.environ.get('CV_SCAN_CACHE_MAX_ENTRIES', '4096')),
+    max_bytes=int(os.environ.get('CV_SCAN_CACHE_MAX_BYTES', str(16 * 1024 * 1024))),
+    ttl=float(os.environ.get('CV_SCAN_CACHE_TTL', '0')) or None,
+    directory=os.environ.get('CV_SCAN_CACHE_DIR') or None,
+    enabled=os.environ.get('CV_SCAN_CACHE_ENABLED', 'true').lower() == 'true',
+)
+
+
+def normalize_source(code: str) -> str:
+    """Normalize line endings and trailing whitespace, which no check depends on."""
+    return '\n'.join(line.rstrip() for line in code.splitlines())
+
+
+def scan_cache_key(code: str) -> str:
+    """Return the scan cache key for ``code`` under the current bandit setup."""
+    return make_cache_key(
+        'scan', SCAN_CACHE_VERSION, bandit_scanner.fingerprint, normalize_source(code)
+    )
+
+
+def cached_scan(key: str) -> Optional[CodeScanResult]:
+    """Return the cached result stored under ``key``, if any."""
+    cached = scan_cache.get(key)
+    return CodeScanResult.model_validate(cached) if cached is not None else None
+
+
+def store_scan(key: str, result: CodeScanResult) -> None:
+    """Cache a result unless it records a failed scan rather than a finding."""
+    if any(issue.issue_type in TRANSIENT_ISSUE_TYPES for issue in result.security_issues):
+        return
+    scan_cache.set(key, result.model_dump())
+
+
+def scan_code(code: str, use_cache: bool = True) -> CodeScanResult:
+    """Scan code synchronously; the code is parsed once and shared by every check.
+
+    Results are memoized in ``scan_cache``, so resubmitting the same code, up
+    to line endings and trailing whitespace, returns the stored result.
+    """
+    if not (use_cache and scan_cache.enabled):
+        return _scan(code)
+    key = scan_cache_key(code)
+    result = cached_scan(key)
+    if result is None:
+        result = _scan(code)
+        store_scan(key, result)
+    return result
+
+
+def _scan(code: str) -> CodeScanResult:
+    with stage_seconds.time(operation='scan', stage='parse'):
+        parsed = parse_code(code)
+    return scan_parsed(parsed)
+
+
+async def scan_python_code(code: str) -> CodeScanResult:
+    """Use ast and bandit to scan the python code for security issues.
+
+    The scan runs in a worker thread so it does not stall the event loop; use
+    :mod:`awslabs.aws_cv_mcp_server.scan_pool` to scan many snippets on every
+    core.
+    """
+    return await asyncio.to_thread(scan_code, code)
+
+
+def _qualified_name(node: ast.AST, aliases: Dict[str, str]) -> Optional[str]:
+    parts = []
+    while isinstance(node, ast.Attribute):
+        parts.append(node.attr)
+        node = node.value
+    if not isinstance(node, ast.Name):
+        return None
+    parts.append(aliases.get(node.id, node.id))
+    name = '.'.join(reversed(parts))
+    return name[len('builtins.') :] if name.startswith('builtins.') else name
+
+
+def find_dangerous_calls(parsed: ParsedCode) -> List[Dict[str, Any]]:
+    """Find calls to dangerous functions in a parsed module.
+
+    Call targets are resolved through the module's imports, so
+    ``import subprocess as sp; sp.run(...)`` and ``from os import system``
+    are caught, while mentions in comments and strings are not. Code that
+    does not parse has no calls to report.
+    """
+    if parsed.tree is None:
+        return []
+
+    aliases: Dict[str, str] = {}
+    calls = []
+    for node in ast.walk(parsed.tree):
+        if isinstance(node, ast.Call):
+            calls.append(node)
+        elif isinstance(node, ast.Import):
+            for alias in node.names:
+                if alias.asname:
+                    aliases[alias.asname] = alias.name
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            for alias in node.names:
+                aliases[alias.asname or alias.name] = f'{node.module}.{alias.name}'
 
     results = []
-    lines = code.splitlines()
-
-    for i, line in enumerate(lines):
-        for pattern in dangerous_patterns:
-            if pattern in line:
-                results.append(
-                    {
-                        'function': pattern.rstrip('('),
-                        'line': i + 1,
-                        'code': line.strip(),
-                    }
-                )
+    for node in sorted(calls, key=lambda call: (call.lineno, call.col_offset)):
+        name = _qualified_name(node.func, aliases)
+        if name is None:
+            continue
+        if name in DANGEROUS_CALLS or name.partition('.')[0] in DANGEROUS_MODULES:
+            results.append(
+                {
+                    'function': name,
+                    'line': node.lineno,
+                    'code': parsed.lines[node.lineno - 1].strip(),
+                }
+            )
 
     return results
 
 
+def check_dangerous_functions(code: str) -> List[Dict[str, Any]]:
+    """Check for dangerous functions like exec, eval, etc."""
+    return find_dangerous_calls(parse_code(code))
+
+
 def get_fix_suggestion(issue: Dict[str, Any]) -> str:
     """Provide suggestions for fixing security issues."""
     suggestions = {
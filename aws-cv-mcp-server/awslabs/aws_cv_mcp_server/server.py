@@ -4,13 +4,64 @@ This server provides tools to analyze images using Amazon Bedrock's Claude model
 """
 
 import argparse
+import asyncio
 import os
-from mcp.server.fastmcp import FastMCP
+import sys
+import time
+from contextlib import asynccontextmanager
+from mcp.server.fastmcp import Context, FastMCP
 from pydantic import Field
-from typing import Dict, List, Union
+from typing import Annotated, Any, AsyncIterator, Dict, List, Literal, Optional, Union
 
+from awslabs.aws_cv_mcp_server import batch_inference, ingest
+from awslabs.aws_cv_mcp_server.admission import Overloaded, request_admission
+from awslabs.aws_cv_mcp_server.bedrock_utils import bedrock_router, token_usage
 from awslabs.aws_cv_mcp_server.connections import Connections
-from awslabs.aws_cv_mcp_server.cv_tools import describe_image
+from awslabs.aws_cv_mcp_server.cv_tools import (
+    BATCH_MAX_CONCURRENCY,
+    COMPARE_MAX_IMAGES,
+    GRID_MAX_FRAMES,
+    analyze_grid,
+    compare_images,
+    describe_image,
+    describe_images,
+    in_flight_analyses,
+    result_cache,
+)
+from awslabs.aws_cv_mcp_server.dedup import near_duplicate_index
+from awslabs.aws_cv_mcp_server.event_store import event_store
+from awslabs.aws_cv_mcp_server.metrics import (
+    CallbackMetric,
+    metrics_route,
+    record_error,
+    registry,
+    start_http_server,
+    timed_tool,
+)
+from awslabs.aws_cv_mcp_server.models import ImagePreprocessingOptions
+from awslabs.aws_cv_mcp_server.motion_filter import motion_filter
+from awslabs.aws_cv_mcp_server.rate_limiter import bedrock_rate_limiter
+from awslabs.aws_cv_mcp_server.s3_utils import image_cache
+from awslabs.aws_cv_mcp_server.scanner import scan_cache
+
+@asynccontextmanager
+async def _session_lifespan(server: FastMCP) -> AsyncIterator[Dict[str, Any]]:
+    """Start the configured ingestion pipeline with the first client session.
+
+    The pipeline outlives individual sessions; with SSE it is started and
+    stopped with the HTTP server instead.
+    """
+    ingest.start_configured_ingestion()
+    yield {}
+
+@asynccontextmanager
+async def _http_lifespan(app) -> AsyncIterator[None]:
+    """Run the configured ingestion pipeline for as long as the SSE server is up."""
+    ingest.start_configured_ingestion()
+    try:
+        yield
+    finally:
+        await ingest.stop_all_ingestion()
 
 # Create the MCP server
 mcp = FastMCP(
@@ -20,10 +71,110 @@ mcp = FastMCP(
         'boto3',
     ],
     log_level='ERROR',
+    lifespan=_session_lifespan,
     instructions="""Use this server to carry out various computer vision tasks.""",
 )
 
+def _cache_stats() -> Dict[str, Dict[str, Any]]:
+    return {
+        'analysis_results': result_cache.stats(),
+        'images': image_cache.stats(),
+        'near_duplicates': near_duplicate_index.stats(),
+        'code_scans': scan_cache.stats(),
+        'in_flight_analyses': in_flight_analyses.stats(),
+    }
+
+def _register_metrics() -> None:
+    """Export the counters kept by caches and admission control on /metrics."""
+    for name, field, metric_type, documentation in (
+        ('cv_cache_hits_total', 'hits', 'counter', 'Cache lookups answered from cache'),
+        ('cv_cache_misses_total', 'misses', 'counter', 'Cache lookups that missed'),
+        ('cv_cache_hit_ratio', 'hit_rate', 'gauge', 'Share of cache lookups answered from cache'),
+    ):
+        registry.register(
+            CallbackMetric(
+                name,
+                documentation,
+                ('cache',),
+                lambda field=field: {
+                    (cache,): stats.get(field) for cache, stats in _cache_stats().items()
+                },
+                type=metric_type,
+            )
+        )
+    registry.register(
+        CallbackMetric(
+            'cv_admission_requests',
+            'Image analysis requests running and waiting for a slot',
+            ('state',),
+            lambda: {
+                ('running',): request_admission.in_flight,
+                ('queued',): request_admission.waiting,
+            },
+        )
+    )
+    registry.register(
+        CallbackMetric(
+            'cv_admission_shed_total',
+            'Requests rejected because the queue was full or their wait expired',
+            ('reason',),
+            lambda: {
+                ('queue_full',): request_admission.rejected,
+                ('wait_timeout',): request_admission.timed_out,
+            },
+            type='counter',
+        )
+    )
+    registry.register(
+        CallbackMetric(
+            'cv_event_store_events',
+            'Analysis events written to the event store, waiting to be written, and dropped',
+            ('state',),
+            lambda: {
+                (state,): event_store.stats()[state] for state in ('written', 'pending', 'dropped')
+            },
+        )
+    )
+    registry.register(
+        CallbackMetric(
+            'cv_ingest_queue_depth',
+            'Frames waiting for an ingestion worker, by S3 prefix',
+            ('prefix',),
+            lambda: {
+                (prefix,): stats['queued'] for prefix, stats in ingest.ingestion_stats().items()
+            },
+        )
+    )
+
+_register_metrics()
+
+def _overloaded(error: Overloaded) -> Dict[str, Any]:
+    """Build the load-shedding response returned when a request is not admitted."""
+    record_error('admission', error)
+    return {'error': str(error), 'retry_after': error.retry_after}
+
+def _stream_to_client(ctx: Context):
+    """Build a callback that forwards streamed text to the MCP client.
+
+    Each chunk is sent as a log notification, and the running character count is
+    reported as progress for clients that supplied a progress token.
+    """
+    received = 0
+
+    async def on_text(text: str) -> None:
+        nonlocal received
+        received += len(text)
+        try:
+            await ctx.log('info', text, logger_name='describe_image')
+            await ctx.report_progress(received)
+        except Exception as e:
+            # The client going away must not abort the analysis itself
+            Connections.logger.warning(f'Could not forward streamed text: {e}')
+
+    return on_text
+
 @mcp.tool(name='describe_image')
+@timed_tool('describe_image')
 async def mcp_describe_image(
     image_file_name: str = Field(
         ...,
@@ -33,6 +184,30 @@ async def mcp_describe_image(
         ...,
         description='Specific instructions for what to monitor or analyze in the image. This guides the model on what aspects to focus on.',
     ),
+    max_image_edge: Annotated[
+        Optional[int],
+        Field(
+            description='Downscale the image so its longest edge is at most this many pixels before analysis. Defaults to the server setting.',
+            ge=0,
+        ),
+    ] = None,
+    image_format: Annotated[
+        Optional[Literal['JPEG', 'PNG', 'WEBP']],
+        Field(description='Re-encode the image to this format before analysis. Defaults to the server setting.'),
+    ] = None,
+    image_quality: Annotated[
+        Optional[int],
+        Field(description='JPEG/WEBP quality used when re-encoding. Defaults to the server setting.', ge=1, le=100),
+    ] = None,
+    stream: Annotated[
+        bool,
+        Field(description='Stream partial analysis text to the client as progress and log notifications while the model is still generating.'),
+    ] = False,
+    deduplicate: Annotated[
+        bool,
+        Field(description='Reuse the analysis of a recent, visually near-identical image from the same S3 prefix instead of analyzing this one again. Small changes, such as a person at the edge of the frame, can go unreported, so only enable this when that is acceptable.'),
+    ] = False,
+    ctx: Context = None,
 ) -> Dict[str, Union[List[str], str]]:
     """Analyze an image using Amazon Bedrock's Claude model.
 
@@ -42,24 +217,632 @@ async def mcp_describe_image(
     USAGE INSTRUCTIONS:
     1. Provide the S3 image file name (key) that you want to analyze
     2. Provide specific monitoring instructions to guide the analysis
-    3. The tool will return a detailed analysis of the image based on the instructions
+    3. Optionally override how the image is downscaled and re-encoded before it is sent to Claude
+    4. Set stream to receive partial text while long analyses are generated
+    5. The tool will return a detailed analysis of the image based on the instructions
 
     Returns:
         Dictionary containing the source image file name and the analysis results
     """
     try:
+        on_text = _stream_to_client(ctx) if stream and ctx is not None else None
+
         # Use the describe_image function from cv_tools
-        response = await describe_image(
-            image_file_name=image_file_name,
-            monitoring_instructions=monitoring_instructions
-        )
-        return {
+        async with request_admission.slot():
+            response = await describe_image(
+                image_file_name=image_file_name,
+                monitoring_instructions=monitoring_instructions,
+                preprocessing=ImagePreprocessingOptions(
+                    max_edge=max_image_edge,
+                    format=image_format,
+                    quality=image_quality,
+                ),
+                on_text=on_text,
+                deduplicate=deduplicate,
+            )
+        result = {
             "description": response.analysis,
             "source_image": image_file_name
         }
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            result["usage"] = usage.model_dump()
+        return result
+    except Overloaded as e:
+        return _overloaded(e)
     except Exception as e:
+        record_error('describe_image', e)
         return {"error": str(e)}
 
+@mcp.tool(name='describe_images')
+@timed_tool('describe_images')
+async def mcp_describe_images(
+    monitoring_instructions: str = Field(
+        ...,
+        description='Instructions for what to monitor or analyze, applied to every image in the batch.',
+    ),
+    image_file_names: Annotated[
+        Optional[List[str]],
+        Field(description='S3 keys of the images to analyze.'),
+    ] = None,
+    prefix: Annotated[
+        Optional[str],
+        Field(description='S3 prefix; every image under it is analyzed in key order.'),
+    ] = None,
+    max_concurrency: Annotated[
+        int,
+        Field(description='Maximum number of images analyzed at the same time.', ge=1, le=64),
+    ] = BATCH_MAX_CONCURRENCY,
+    start_after: Annotated[
+        Optional[str],
+        Field(description='Only analyze prefix images whose keys sort after this one; pass the previous next_start_after to continue a truncated batch.'),
+    ] = None,
+) -> Dict[str, Any]:
+    """Analyze a batch of images from S3 with shared instructions.
+
+    Use this tool instead of calling describe_image repeatedly when several images need the
+    same analysis. Images are analyzed in parallel and each image gets its own result, so a
+    failure on one image does not fail the whole batch.
+
+    USAGE INSTRUCTIONS:
+    1. Provide either a list of S3 image keys, an S3 prefix, or both
+    2. Provide the monitoring instructions to apply to every image
+    3. The tool returns one result per image, in the order the images were given
+    4. A prefix with more images than the batch limit is cut short: truncated is true and
+       next_start_after is the key to pass as start_after to analyze the rest
+
+    Returns:
+        Dictionary with per-image results and success/failure counts
+    """
+    try:
+        # Each image is admitted separately inside describe_images
+        response = await describe_images(
+            monitoring_instructions=monitoring_instructions,
+            image_file_names=image_file_names,
+            prefix=prefix,
+            max_concurrency=max_concurrency,
+            start_after=start_after,
+        )
+        return {
+            'status': response.status,
+            'results': [
+                {
+                    'source_image': result.source,
+                    'status': result.status,
+                    'description': result.analysis,
+                    'message': result.message,
+                }
+                for result in response.results
+            ],
+            'succeeded': response.succeeded,
+            'failed': response.failed,
+            'truncated': response.truncated,
+            'next_start_after': response.next_start_after,
+            'message': response.message,
+        }
+    except Exception as e:
+        record_error('describe_images', e)
+        return {'error': str(e)}
+
+@mcp.tool(name='compare_images')
+@timed_tool('compare_images')
+async def mcp_compare_images(
+    image_file_names: List[str] = Field(
+        ...,
+        description=f'S3 keys of the images to compare, in order (2 to {COMPARE_MAX_IMAGES}). The model refers to them as Image 1, Image 2, and so on.',
+    ),
+    comparison_instructions: str = Field(
+        ...,
+        description='What to compare across the images, for example "what changed on the loading dock between these snapshots".',
+    ),
+    max_image_edge: Annotated[
+        Optional[int],
+        Field(
+            description='Downscale each image so its longest edge is at most this many pixels before analysis. Defaults to the server setting.',
+            ge=0,
+        ),
+    ] = None,
+) -> Dict[str, Any]:
+    """Compare several images from S3 in a single request and describe what changed.
+
+    Use this tool instead of describing each image with describe_image and comparing the
+    descriptions. All images are sent to Claude together in one message, labelled with their
+    position, key and upload time, so the model compares the pixels rather than two summaries.
+
+    USAGE INSTRUCTIONS:
+    1. Provide the S3 keys of the images in the order they should be compared (e.g. oldest first)
+    2. Provide instructions describing what to compare or look for
+    3. The tool returns one comparative analysis that refers to the images by number
+
+    Returns:
+        Dictionary containing the comparison and the images that were compared
+    """
+    try:
+        async with request_admission.slot():
+            response = await compare_images(
+                image_file_names=image_file_names,
+                comparison_instructions=comparison_instructions,
+                preprocessing=ImagePreprocessingOptions(max_edge=max_image_edge),
+            )
+        if response.status == 'error':
+            return {'error': response.message, 'source_images': response.sources}
+        return {
+            'comparison': response.analysis,
+            'source_images': response.sources,
+            'usage': response.usage.model_dump() if response.usage else None,
+        }
+    except Overloaded as e:
+        return _overloaded(e)
+    except Exception as e:
+        record_error('compare_images', e)
+        return {'error': str(e)}
+
+@mcp.tool(name='analyze_grid')
+@timed_tool('analyze_grid')
+async def mcp_analyze_grid(
+    monitoring_instruction: str = Field(
+        ...,
+        description='What to watch for in the camera feed, in addition to the standard security review.',
+    ),
+    frame_keys: Annotated[
+        Optional[List[str]],
+        Field(description='S3 keys of the camera frames, oldest first.'),
+    ] = None,
+    prefix: Annotated[
+        Optional[str],
+        Field(description='S3 prefix of a camera feed; its most recent frames are used, oldest first.'),
+    ] = None,
+    max_frames: Annotated[
+        int,
+        Field(description='Maximum number of frames tiled into the grid.', ge=1, le=64),
+    ] = GRID_MAX_FRAMES,
+    timestamp: Annotated[
+        Optional[str],
+        Field(description='Timestamp (YYYYMMDD-HHMMSS) used for the log file name. Defaults to the time of the last frame.'),
+    ] = None,
+    motion_threshold: Annotated[
+        Optional[float],
+        Field(
+            description='Fraction of pixels that must change between frames before the model is called. 0 always calls the model. Defaults to the server setting.',
+            ge=0,
+            le=1,
+        ),
+    ] = None,
+) -> Dict[str, Any]:
+    """Review a sequence of security camera frames for events that need attention.
+
+    The frames are tiled into a single timestamped grid image and analyzed in one request,
+    which is much cheaper than describing every frame separately. The model compares the
+    frames and returns a structured alert.
+
+    USAGE INSTRUCTIONS:
+    1. Provide the frame keys in time order, or the S3 prefix of a camera feed
+    2. Provide any specific monitoring instruction
+    3. The tool returns alert_level (0 = no issue, 1 = soft alert, 2 = high alert), a reason,
+       a suggested log file name and brief and full descriptions of what happened
+
+    Returns:
+        Dictionary containing the alert fields and the frames that were analyzed
+    """
+    try:
+        async with request_admission.slot():
+            response = await analyze_grid(
+                monitoring_instruction=monitoring_instruction,
+                frame_keys=frame_keys,
+                prefix=prefix,
+                max_frames=max_frames,
+                timestamp=timestamp,
+                motion_threshold=motion_threshold,
+            )
+        if response.status == 'error':
+            return {'error': response.message, 'source_frames': response.sources}
+        return {
+            'alert_level': response.alert_level,
+            'reason': response.reason,
+            'log_file_name': response.log_file_name,
+            'brief_description': response.brief_description,
+            'full_description': response.full_description,
+            'source_frames': response.sources,
+            'usage': response.usage.model_dump() if response.usage else None,
+        }
+    except Overloaded as e:
+        return _overloaded(e)
+    except Exception as e:
+        record_error('analyze_grid', e)
+        return {'error': str(e)}
+
+@mcp.tool(name='submit_batch_analysis')
+@timed_tool('submit_batch_analysis')
+async def mcp_submit_batch_analysis(
+    monitoring_instructions: str = Field(
+        ...,
+        description='Instructions for what to monitor or analyze, applied to every image in the job.',
+    ),
+    prefix: Annotated[
+        Optional[str],
+        Field(description='S3 prefix; every image under it is analyzed.'),
+    ] = None,
+    image_file_names: Annotated[
+        Optional[List[str]],
+        Field(description='S3 keys of the images to analyze instead of a prefix.'),
+    ] = None,
+    job_name: Annotated[
+        Optional[str],
+        Field(description='Name of the batch job. Generated from the current time if omitted.'),
+    ] = None,
+    max_images: Annotated[
+        Optional[int],
+        Field(description='Analyze at most this many images.', ge=1),
+    ] = None,
+) -> Dict[str, Any]:
+    """Submit an offline Bedrock batch inference job for a large backlog of images.
+
+    Batch inference is billed at a discount to on-demand calls but finishes within hours rather
+    than seconds. Use it for re-analyzing archives of thousands of images; use describe_images
+    for results that are needed now.
+
+    USAGE INSTRUCTIONS:
+    1. Provide an S3 prefix or a list of image keys, and the monitoring instructions
+    2. The tool uploads the model inputs and returns the job ARN
+    3. Check progress with get_batch_analysis_status and read the analyses with
+       get_batch_analysis_results once the job has completed
+
+    Returns:
+        Dictionary with the job ARN, name, status, record count and S3 locations
+    """
+    response = await batch_inference.submit_batch_job_async(
+        monitoring_instructions=monitoring_instructions,
+        prefix=prefix,
+        image_file_names=image_file_names,
+        job_name=job_name,
+        max_images=max_images,
+    )
+    return response.model_dump(exclude_none=True)
+
+@mcp.tool(name='get_batch_analysis_status')
+@timed_tool('get_batch_analysis_status')
+async def mcp_get_batch_analysis_status(
+    job_arn: str = Field(..., description='ARN returned by submit_batch_analysis.'),
+) -> Dict[str, Any]:
+    """Check the status of a batch analysis job.
+
+    Returns:
+        Dictionary with the job status (Submitted, InProgress, Completed, PartiallyCompleted,
+        Failed, Stopping, Stopped or Expired) and its S3 locations
+    """
+    response = await batch_inference.get_batch_job_async(job_arn)
+    return response.model_dump(exclude_none=True)
+
+@mcp.tool(name='get_batch_analysis_results')
+@timed_tool('get_batch_analysis_results')
+async def mcp_get_batch_analysis_results(
+    job_arn: str = Field(..., description='ARN returned by submit_batch_analysis.'),
+    next_token: Annotated[
+        Optional[str],
+        Field(description='next_token returned with the previous page, to read the following page of a large job.'),
+    ] = None,
+    limit: Annotated[
+        int,
+        Field(description='Maximum number of results to return.', ge=1, le=1000),
+    ] = 100,
+) -> Dict[str, Any]:
+    """Read one page of the image analyses produced by a finished batch analysis job.
+
+    Returns:
+        Dictionary with per-image results and next_token when more results remain
+    """
+    response = await batch_inference.get_batch_results_async(job_arn, next_token, limit)
+    return {
+        'status': response.status,
+        'job_status': response.job_status,
+        'results': [
+            {
+                'source_image': result.source,
+                'status': result.status,
+                'description': result.analysis,
+                'message': result.message,
+            }
+            for result in response.results
+        ],
+        'next_token': response.next_token,
+        'message': response.message,
+    }
+
+@mcp.tool(name='stop_batch_analysis')
+@timed_tool('stop_batch_analysis')
+async def mcp_stop_batch_analysis(
+    job_arn: str = Field(..., description='ARN returned by submit_batch_analysis.'),
+) -> Dict[str, Any]:
+    """Stop a batch analysis job. Images already analyzed keep their results.
+
+    Returns:
+        Dictionary with the job's status after the stop request
+    """
+    response = await batch_inference.stop_batch_job_async(job_arn)
+    return response.model_dump(exclude_none=True)
+
+@mcp.tool(name='get_cache_stats')
+@timed_tool('get_cache_stats')
+async def mcp_get_cache_stats() -> Dict[str, Dict[str, Any]]:
+    """Report counters for the caches and filters that let the server skip work.
+
+    bedrock_prompt_cache totals the input, output, cache read and cache write tokens Bedrock
+    reported, so the savings from prompt caching can be checked.
+
+    Returns:
+        Dictionary keyed by cache or filter name with hit, miss, skip and size counters
+    """
+    return {
+        **_cache_stats(),
+        'motion_filter': motion_filter.stats(),
+        'bedrock_prompt_cache': token_usage.stats(),
+    }
+
+
+@mcp.tool(name='get_rate_limiter_stats')
+@timed_tool('get_rate_limiter_stats')
+async def mcp_get_rate_limiter_stats() -> Dict[str, Any]:
+    """Report the current Bedrock request and token limits and throttling counters.
+
+    Returns:
+        Dictionary with the current and configured limits, queue depth, and
+        admitted, rejected, throttled and retried call counts
+    """
+    return bedrock_rate_limiter.stats()
+
+
+@mcp.tool(name='get_admission_stats')
+@timed_tool('get_admission_stats')
+async def mcp_get_admission_stats() -> Dict[str, Any]:
+    """Report how busy the server is, for sizing the number of replicas.
+
+    describe_image, describe_images, compare_images and analyze_grid share a concurrency limit
+    and a bounded wait queue; requests beyond both are rejected with a retry_after hint.
+
+    Returns:
+        Dictionary with the limits, requests running and queued, admitted, rejected and
+        timed-out counts, and recent queue wait percentiles and mean service time
+    """
+    return request_admission.stats()
+
+
+@mcp.tool(name='start_ingestion')
+@timed_tool('start_ingestion')
+async def mcp_start_ingestion(
+    prefix: str = Field(
+        ...,
+        description='S3 prefix of the camera feed whose new frames should be analyzed continuously.',
+    ),
+    monitoring_instructions: str = Field(
+        ...,
+        description='Instructions used to analyze every new frame.',
+    ),
+    workers: Annotated[
+        int,
+        Field(description='Number of frames analyzed at the same time.', ge=1, le=64),
+    ] = ingest.DEFAULT_WORKERS,
+    queue_url: Annotated[
+        Optional[str],
+        Field(description='SQS queue receiving the S3 event notifications of the bucket. The prefix is polled when unset.'),
+    ] = None,
+    backfill: Annotated[
+        bool,
+        Field(description='On the first run for this prefix, also analyze the images already under it.'),
+    ] = False,
+    deduplicate: Annotated[
+        bool,
+        Field(description='Reuse the analysis of the previous frame when a new frame is visually near-identical to it. Small changes, such as a person at the edge of the frame, can go unreported.'),
+    ] = False,
+) -> Dict[str, Any]:
+    """Start analyzing new frames under an S3 prefix as they arrive.
+
+    Use this tool instead of calling describe_image for each new key of a camera feed. The
+    server keeps watching the prefix in the background until stop_ingestion is called, and
+    resumes from its saved position after a restart.
+
+    Returns:
+        Dictionary with the status of the ingestion pipeline for the prefix
+    """
+    try:
+        pipeline = ingest.start_ingestion(
+            prefix,
+            monitoring_instructions,
+            workers=workers,
+            queue_url=queue_url,
+            backfill=backfill,
+            deduplicate=deduplicate,
+        )
+        return pipeline.stats()
+    except Exception as e:
+        record_error('start_ingestion', e)
+        return {'error': str(e)}
+
+
+@mcp.tool(name='stop_ingestion')
+@timed_tool('stop_ingestion')
+async def mcp_stop_ingestion(
+    prefix: str = Field(..., description='S3 prefix whose ingestion should stop.'),
+    drain: Annotated[
+        bool,
+        Field(description='Finish analyzing the frames already queued before stopping.'),
+    ] = False,
+) -> Dict[str, Any]:
+    """Stop the continuous analysis of an S3 prefix.
+
+    Returns:
+        Dictionary saying whether a pipeline was running for the prefix
+    """
+    stopped = await ingest.stop_ingestion(prefix, drain=drain)
+    return {'prefix': prefix, 'stopped': stopped}
+
+
+@mcp.tool(name='get_ingestion_status')
+@timed_tool('get_ingestion_status')
+async def mcp_get_ingestion_status() -> Dict[str, Any]:
+    """Report the running ingestion pipelines and their latest analyses.
+
+    Returns:
+        Dictionary keyed by prefix with queue depth, frame counts, lag percentiles from the
+        S3 write to the finished analysis, the source position and the most recent analyses
+    """
+    return ingest.ingestion_stats()
+
+
+@mcp.tool(name='search_events')
+@timed_tool('search_events')
+async def mcp_search_events(
+    query: Annotated[
+        Optional[str],
+        Field(description='Words that must all appear in the analysis, alert reason or description, or the S3 key, e.g. "delivery van".'),
+    ] = None,
+    start_time: Annotated[
+        Optional[str],
+        Field(description='Only events from images taken at or after this ISO 8601 time (UTC if no offset is given).'),
+    ] = None,
+    end_time: Annotated[
+        Optional[str],
+        Field(description='Only events from images taken at or before this ISO 8601 time.'),
+    ] = None,
+    source_prefix: Annotated[
+        Optional[str],
+        Field(description='Only events for S3 keys under this prefix, e.g. one camera.'),
+    ] = None,
+    min_alert_level: Annotated[
+        Optional[int],
+        Field(description='Only grid alerts at or above this level (1 = soft alert, 2 = high alert).', ge=0, le=2),
+    ] = None,
+    order: Annotated[
+        Literal['relevance', 'newest', 'oldest'],
+        Field(description='Best text match first, or by time. Use oldest to find when something first happened.'),
+    ] = 'relevance',
+    limit: Annotated[
+        int,
+        Field(description='Maximum number of events returned.', ge=1, le=200),
+    ] = 20,
+) -> Dict[str, Any]:
+    """Search past image analyses and camera alerts without analyzing any image again.
+
+    Every describe_image analysis and analyze_grid alert is stored locally with the time the
+    image was taken. Use this tool first for historical questions such as "when did the
+    delivery van arrive?" or "what alerts did the garage camera raise last night?", and only
+    call the analysis tools for images that have not been analyzed yet.
+
+    Returns:
+        Dictionary with the matching events (source key, time, alert level, reason,
+        descriptions, analysis and token usage), their count and the search time in ms
+    """
+    try:
+        started = time.perf_counter()
+        events = await asyncio.to_thread(
+            event_store.search,
+            query=query,
+            start=start_time,
+            end=end_time,
+            source_prefix=source_prefix,
+            min_alert_level=min_alert_level,
+            order=order,
+            limit=limit,
+        )
+        return {
+            'events': events,
+            'count': len(events),
+            'took_ms': round((time.perf_counter() - started) * 1000, 2),
+        }
+    except Exception as e:
+        record_error('search_events', e)
+        return {'error': str(e)}
+
+
+@mcp.tool(name='get_endpoint_stats')
+@timed_tool('get_endpoint_stats')
+async def mcp_get_endpoint_stats() -> Dict[str, Any]:
+    """Report the health of each Bedrock region and model the server routes calls to.
+
+    Returns:
+        Dictionary with the number of failovers and, per endpoint, request and
+        error counts, rolling error rate, p50/p95 latency and remaining cooldown
+    """
+    return bedrock_router.stats()
+
+
+def _add_batch_commands(subparsers) -> None:
+    batch = subparsers.add_parser('batch', help='Run offline Bedrock batch inference jobs')
+    commands = batch.add_subparsers(dest='batch_command', required=True)
+
+    submit = commands.add_parser('submit', help='Submit a batch job for a prefix or list of images')
+    submit.add_argument('--instructions', required=True, help='Instructions applied to every image')
+    submit.add_argument('--prefix', help='Analyze every image under this S3 prefix')
+    submit.add_argument('--keys', nargs='+', help='Analyze these S3 keys instead of a prefix')
+    submit.add_argument('--job-name', help='Name of the batch job')
+    submit.add_argument('--model-id', default=batch_inference.DEFAULT_MODEL_ID, help='Bedrock model ID')
+    submit.add_argument('--max-tokens', type=int, default=1000, help='Maximum tokens per analysis')
+    submit.add_argument('--max-images', type=int, help='Analyze at most this many images')
+    submit.add_argument('--role-arn', help='Service role for the job; defaults to CV_BATCH_ROLE_ARN')
+    submit.add_argument('--wait', action='store_true', help='Wait for the job to finish')
+
+    for name, help_text in (
+        ('status', 'Show the status of a batch job'),
+        ('wait', 'Wait for a batch job to finish'),
+        ('stop', 'Stop a batch job'),
+        ('results', 'Write the analyses of a finished batch job as JSON lines'),
+    ):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument('job_arn', help='ARN of the batch job')
+        if name == 'results':
+            command.add_argument('--output', help='File to write to instead of standard output')
+
+
+def _run_batch_command(args) -> int:
+    """Run a ``batch`` subcommand and return the process exit code."""
+    if args.batch_command == 'results':
+        output = open(args.output, 'w') if args.output else sys.stdout
+        try:
+            for result in batch_inference.iter_batch_results(args.job_arn):
+                output.write(result.model_dump_json() + '\n')
+        finally:
+            if args.output:
+                output.close()
+        return 0
+
+    if args.batch_command == 'submit':
+        response = batch_inference.submit_batch_job(
+            monitoring_instructions=args.instructions,
+            prefix=args.prefix,
+            image_file_names=args.keys,
+            job_name=args.job_name,
+            model_id=args.model_id,
+            max_tokens=args.max_tokens,
+            max_images=args.max_images,
+            role_arn=args.role_arn,
+        )
+        if args.wait and response.status == 'success':
+            print(response.model_dump_json(exclude_none=True), flush=True)
+            response = batch_inference.wait_for_batch_job(response.job_arn)
+    elif args.batch_command == 'wait':
+        response = batch_inference.wait_for_batch_job(args.job_arn)
+    elif args.batch_command == 'stop':
+        response = batch_inference.stop_batch_job(args.job_arn)
+    else:
+        response = batch_inference.get_batch_job(args.job_arn)
+    print(response.model_dump_json(exclude_none=True))
+    return 0 if response.status == 'success' else 1
+
+
+def _run_sse() -> None:
+    """Run the SSE transport with /metrics served by the same HTTP server."""
+    import uvicorn
+
+    app = mcp.sse_app()
+    app.router.routes.append(metrics_route())
+    app.router.lifespan_context = _http_lifespan
+    uvicorn.run(
+        app,
+        host=mcp.settings.host,
+        port=mcp.settings.port,
+        log_level=mcp.settings.log_level.lower(),
+    )
+
+
 def main():
     """Run the MCP server with CLI argument support."""
     parser = argparse.ArgumentParser(
@@ -67,14 +850,73 @@ def main():
     )
     parser.add_argument('--sse', action='store_true', help='Use SSE transport')
     parser.add_argument('--port', type=int, default=8888, help='Port to run the server on')
+    parser.add_argument(
+        '--metrics-port',
+        type=int,
+        default=int(os.environ.get('CV_METRICS_PORT', '0')),
+        help='With stdio, serve /metrics on this local port; with SSE it is served on --port',
+    )
+    parser.add_argument(
+        '--max-concurrency',
+        type=int,
+        default=request_admission.max_concurrency or 0,
+        help='Maximum image analysis requests running at once; 0 disables the limit',
+    )
+    parser.add_argument(
+        '--max-queue',
+        type=int,
+        default=request_admission.max_queue,
+        help='Maximum requests waiting for a slot before new ones are rejected',
+    )
+    parser.add_argument(
+        '--queue-timeout',
+        type=float,
+        default=request_admission.queue_timeout or 0,
+        help='Seconds a request may wait for a slot; 0 waits indefinitely',
+    )
+    parser.add_argument(
+        '--ingest-prefix',
+        default=ingest.startup_ingestion['prefix'],
+        help='Continuously analyze new frames under this S3 prefix while the server runs',
+    )
+    parser.add_argument(
+        '--ingest-instructions',
+        default=ingest.startup_ingestion['monitoring_instructions'],
+        help='Monitoring instructions used for every ingested frame',
+    )
+    parser.add_argument(
+        '--ingest-queue-url',
+        default=ingest.startup_ingestion['queue_url'],
+        help='SQS queue receiving S3 event notifications for the prefix; polls S3 if unset',
+    )
+    parser.add_argument(
+        '--ingest-workers',
+        type=int,
+        default=ingest.DEFAULT_WORKERS,
+        help='Number of ingested frames analyzed at once',
+    )
+    _add_batch_commands(parser.add_subparsers(dest='command'))
 
     args = parser.parse_args()
 
+    if args.command == 'batch':
+        sys.exit(_run_batch_command(args))
+
+    request_admission.configure(args.max_concurrency, args.max_queue, args.queue_timeout)
+    ingest.startup_ingestion.update(
+        prefix=args.ingest_prefix,
+        monitoring_instructions=args.ingest_instructions,
+        queue_url=args.ingest_queue_url,
+        workers=args.ingest_workers,
+    )
+
     # Run server with appropriate transport
     if args.sse:
         mcp.settings.port = args.port
-        mcp.run(transport='sse')
+        _run_sse()
     else:
+        if args.metrics_port:
+            start_http_server(args.metrics_port)
         mcp.run()
 
 if __name__ == '__main__':
@@ -0,0 +1,102 @@
+#
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You may not use this file except in compliance
+# with the License. A copy of the License is located at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# or in the 'license' file accompanying this file. This file is distributed on an 'AS IS' BASIS, WITHOUT WARRANTIES
+# OR CONDITIONS OF ANY KIND, express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+#
+
+"""Throughput of concurrent describe_image calls against stubbed S3 and Bedrock.
+
+The stubs sleep for a fixed latency the way a network call would, so the numbers
+show how well concurrent calls overlap rather than raw AWS performance.
+
+Usage:
+    PYTHONPATH=. python benchmarks/bench_describe_image.py --requests 64 --bedrock-latency 0.5
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import os
+import time
+
+
+os.environ.setdefault('AWS_REGION', 'us-east-1')
+
+from awslabs.aws_cv_mcp_server.connections import Connections  # noqa: E402
+from awslabs.aws_cv_mcp_server.cv_tools import describe_image  # noqa: E402
+
+
+class StubS3Client:
+    """Returns the same small image for every key after a fixed delay."""
+
+    def __init__(self, latency: float):
+        """Create a client that waits ``latency`` seconds per call."""
+        self.latency = latency
+
+    def get_object(self, Bucket, Key, **kwargs):
+        """Return a small PNG after the configured delay."""
+        time.sleep(self.latency)
+        return {'Body': io.BytesIO(b'\x89PNG' + b'\0' * 4096), 'ContentType': 'image/png'}
+
+
+class StubBedrockClient:
+    """Returns a canned completion after a fixed delay."""
+
+    def __init__(self, latency: float):
+        """Create a client that waits ``latency`` seconds per call."""
+        self.latency = latency
+
+    def invoke_model(self, modelId, body, **kwargs):
+        """Return a canned completion after the configured delay."""
+        time.sleep(self.latency)
+        payload = {'content': [{'type': 'text', 'text': 'stub analysis'}]}
+        return {'body': io.BytesIO(json.dumps(payload).encode())}
+
+
+async def run(requests: int) -> float:
+    """Issue ``requests`` concurrent calls and return the elapsed wall time."""
+    start = time.perf_counter()
+    results = await asyncio.gather(
+        *[describe_image(f'frame-{i}.png', 'describe the scene') for i in range(requests)]
+    )
+    elapsed = time.perf_counter() - start
+    failed = [r for r in results if r.status != 'success']
+    if failed:
+        raise RuntimeError(f'{len(failed)} calls failed: {failed[0].message}')
+    return elapsed
+
+
+def main():
+    """Run the benchmark for a range of executor sizes."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=64)
+    parser.add_argument('--s3-latency', type=float, default=0.05)
+    parser.add_argument('--bedrock-latency', type=float, default=0.5)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32])
+    args = parser.parse_args()
+
+    Connections.s3_client = StubS3Client(args.s3_latency)
+    Connections.bedrock_client = StubBedrockClient(args.bedrock_latency)
+
+    print(f'{"concurrency":>11} {"elapsed (s)":>12} {"req/s":>8} {"speedup":>8}')
+    baseline = None
+    for concurrency in args.concurrency:
+        Connections.configure_executor(concurrency)
+        elapsed = asyncio.run(run(args.requests))
+        throughput = args.requests / elapsed
+        baseline = baseline or throughput
+        print(
+            f'{concurrency:>11} {elapsed:>12.2f} {throughput:>8.1f} {throughput / baseline:>7.1f}x'
+        )
+
+
+if __name__ == '__main__':
+    main()
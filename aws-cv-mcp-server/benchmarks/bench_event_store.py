@@ -0,0 +1,110 @@
+#
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You may not use this file except in compliance
+# with the License. A copy of the License is located at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# or in the 'license' file accompanying this file. This file is distributed on an 'AS IS' BASIS, WITHOUT WARRANTIES
+# OR CONDITIONS OF ANY KIND, express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+#
+
+"""Write throughput and search latency of the event store.
+
+Compares recording events one transaction at a time with the batched
+writer, then times typical search_events queries over the stored history.
+
+Usage:
+    PYTHONPATH=. python benchmarks/bench_event_store.py --events 100000
+"""
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from awslabs.aws_cv_mcp_server.event_store import EventStore
+
+
+SUBJECTS = ('delivery van', 'person', 'cat', 'car', 'cyclist', 'dog', 'package', 'truck')
+PLACES = ('driveway', 'porch', 'garage', 'gate', 'backyard')
+
+
+def make_event(index: int, start: float):
+    """Return the record() arguments for one synthetic camera event."""
+    subject = random.choice(SUBJECTS)
+    place = random.choice(PLACES)
+    return {
+        'kind': 'grid' if index % 4 == 0 else 'image',
+        'source': f'cam/{place}/{index:08d}.jpg',
+        'occurred_at': start + index * 30,
+        'alert_level': random.choice((0, 0, 0, 1, 2)) if index % 4 == 0 else None,
+        'brief_description': f'A {subject} near the {place}',
+        'analysis': f'The frame shows a {subject} near the {place}. ' * 8,
+        'usage': {'input_tokens': 1500, 'output_tokens': 150},
+    }
+
+
+def write_rate(store: EventStore, events, per_event_flush: bool) -> float:
+    """Record every event and return events written per second."""
+    started = time.perf_counter()
+    for event in events:
+        store.record(**event)
+        if per_event_flush:
+            store.flush()
+    store.flush()
+    return len(events) / (time.perf_counter() - started)
+
+
+def main():
+    """Print write throughput for both strategies and search latency percentiles."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--events', type=int, default=100000)
+    parser.add_argument('--unbatched', type=int, default=5000, help='Events for the per-event run')
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+    random.seed(7)
+
+    start = time.time() - args.events * 30
+    events = [make_event(index, start) for index in range(args.events)]
+    with tempfile.TemporaryDirectory() as directory:
+        single = EventStore(os.path.join(directory, 'single.db'), flush_interval=3600)
+        rate = write_rate(single, events[: args.unbatched], per_event_flush=True)
+        print(f'one transaction per event: {rate:>10,.0f} events/s')
+        single.close()
+
+        store = EventStore(os.path.join(directory, 'events.db'), flush_interval=3600)
+        rate = write_rate(store, events, per_event_flush=False)
+        print(f'batched writer:            {rate:>10,.0f} events/s ({args.events:,} events)')
+
+        middle = start + args.events * 15
+        queries = {
+            'text': {'query': 'delivery van'},
+            'text, oldest first': {'query': 'delivery van', 'order': 'oldest'},
+            'text + prefix + range': {
+                'query': 'van',
+                'source_prefix': 'cam/driveway/',
+                'start': middle,
+                'end': middle + 86400,
+            },
+            'high alerts, newest': {'min_alert_level': 2, 'order': 'newest'},
+            'time range only': {'start': middle, 'end': middle + 3600},
+        }
+        print(f'{"query":<24} {"p50 (ms)":>9} {"p95 (ms)":>9}')
+        for name, kwargs in queries.items():
+            timings = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                store.search(**kwargs)
+                timings.append((time.perf_counter() - started) * 1000)
+            timings.sort()
+            p95 = timings[int(0.95 * (len(timings) - 1))]
+            print(f'{name:<24} {statistics.median(timings):>9.2f} {p95:>9.2f}')
+        store.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+#
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You may not use this file except in compliance
+# with the License. A copy of the License is located at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# or in the 'license' file accompanying this file. This file is distributed on an 'AS IS' BASIS, WITHOUT WARRANTIES
+# OR CONDITIONS OF ANY KIND, express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+#
+
+"""Payload size and build time of a describe_image request with and without preprocessing.
+
+A synthetic camera frame stands in for a real one; noise keeps it from compressing
+unrealistically well.
+
+Usage:
+    PYTHONPATH=. python benchmarks/bench_preprocess.py --width 4000 --height 3000
+"""
+
+import argparse
+import io
+import time
+from awslabs.aws_cv_mcp_server.bedrock_utils import create_multimodal_prompt, encode_request_body
+from awslabs.aws_cv_mcp_server.image_processing import preprocess_image
+from awslabs.aws_cv_mcp_server.models import ImagePreprocessingOptions
+from PIL import Image
+
+
+def synthetic_frame(width: int, height: int) -> bytes:
+    """Return a noisy gradient JPEG roughly as hard to compress as a camera frame."""
+    gradient = Image.linear_gradient('L').resize((width, height))
+    noise = Image.effect_noise((width, height), 40)
+    frame = Image.merge('RGB', (gradient, noise, Image.blend(gradient, noise, 0.5)))
+    output = io.BytesIO()
+    frame.save(output, format='JPEG', quality=92)
+    return output.getvalue()
+
+
+def build_body(image_data: bytes, options) -> bytes:
+    """Preprocess the image (if requested) and build the Bedrock request body."""
+    content_type = 'image/jpeg'
+    if options is not None:
+        image_data, content_type = preprocess_image(image_data, content_type, options)
+    prompt = create_multimodal_prompt(
+        image_data=image_data, text='describe the scene', content_type=content_type
+    )
+    return bytes(encode_request_body(prompt))
+
+
+def main():
+    """Compare request bodies for a range of preprocessing settings."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--width', type=int, default=4000)
+    parser.add_argument('--height', type=int, default=3000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument(
+        '--uplink-mbps', type=float, default=100.0, help='Bandwidth used to estimate upload time'
+    )
+    args = parser.parse_args()
+
+    frame = synthetic_frame(args.width, args.height)
+    print(f'source image: {args.width}x{args.height}, {len(frame) / 1e6:.2f} MB')
+
+    scenarios = {
+        'none': None,
+        'max_edge=1568': ImagePreprocessingOptions(max_edge=1568, quality=85),
+        'max_edge=1024': ImagePreprocessingOptions(max_edge=1024, quality=80),
+        'max_edge=1024 webp': ImagePreprocessingOptions(max_edge=1024, format='WEBP', quality=80),
+    }
+    print(
+        f'{"scenario":<20} {"body (MB)":>10} {"build (ms)":>11} '
+        f'{"+upload (ms)":>13} {"~input tokens":>14}'
+    )
+    for name, options in scenarios.items():
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            body = build_body(frame, options)
+            timings.append(time.perf_counter() - start)
+        if options is None:
+            width, height = args.width, args.height
+        else:
+            edge = options.max_edge
+            scale = min(1.0, edge / max(args.width, args.height))
+            width, height = int(args.width * scale), int(args.height * scale)
+        # Claude bills roughly width * height / 750 tokens after its own 1568px downscale
+        scale = min(1.0, 1568 / max(width, height))
+        tokens = int(width * scale * height * scale / 750)
+        build_ms = min(timings) * 1000
+        upload_ms = len(body) * 8 / (args.uplink_mbps * 1e6) * 1000
+        print(
+            f'{name:<20} {len(body) / 1e6:>10.2f} {build_ms:>11.1f} '
+            f'{build_ms + upload_ms:>13.1f} {tokens:>14}'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+#
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You may not use this file except in compliance
+# with the License. A copy of the License is located at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# or in the 'license' file accompanying this file. This file is distributed on an 'AS IS' BASIS, WITHOUT WARRANTIES
+# OR CONDITIONS OF ANY KIND, express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+#
+
+"""Peak memory and CPU time of building one Bedrock image request body.
+
+Compares the previous path (base64 bytes, decoded str, json.dumps, the
+prompt formatted into an INFO log line, and the str body encoded by botocore)
+with the prompt builder plus encode_request_body and lazy, truncated logging.
+
+Usage:
+    PYTHONPATH=. python benchmarks/bench_request_body.py --megabytes 1 5 10
+"""
+
+import argparse
+import base64
+import json
+import logging
+import os
+import statistics
+import time
+import tracemalloc
+from awslabs.aws_cv_mcp_server import bedrock_utils
+from awslabs.aws_cv_mcp_server.bedrock_utils import create_multimodal_prompt, encode_request_body
+
+
+logger = logging.getLogger('bench_request_body')
+
+
+def previous_body(image: bytes) -> bytes:
+    """Build the body the way describe_image and _invoke_model used to."""
+    prompt = {
+        'anthropic_version': 'bedrock-2023-05-31',
+        'max_tokens': 1000,
+        'temperature': 0.5,
+        'messages': [
+            {
+                'role': 'user',
+                'content': [
+                    {
+                        'type': 'image',
+                        'source': {
+                            'type': 'base64',
+                            'media_type': 'image/jpeg',
+                            'data': base64.b64encode(image).decode('utf-8'),
+                        },
+                    },
+                    {'type': 'text', 'text': 'describe the scene'},
+                ],
+            }
+        ],
+    }
+    logger.info(f'Prompt for Bedrock: {prompt}')
+    # botocore encodes a str body to bytes before sending it
+    return json.dumps(prompt).encode('utf-8')
+
+
+def current_body(image: bytes) -> bytearray:
+    """Build the body with the in-place encoder and lazy prompt logging."""
+    prompt = create_multimodal_prompt(image, 'describe the scene', 'image/jpeg')
+    logger.info('Prompt for Bedrock: %s', bedrock_utils._Truncated(prompt))
+    return encode_request_body(prompt)
+
+
+def measure(build, image: bytes, repeat: int):
+    """Return the peak traced allocation in MB and the median CPU time in ms."""
+    tracemalloc.start()
+    build(image)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    timings = []
+    for _ in range(repeat):
+        start = time.process_time()
+        build(image)
+        timings.append((time.process_time() - start) * 1000)
+    return peak / 1e6, statistics.median(timings)
+
+
+def main():
+    """Print peak memory and CPU time per request for each image size."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--megabytes', type=float, nargs='+', default=[1, 5, 10])
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument(
+        '--log-level',
+        default='WARNING',
+        help='Level of the benchmark logger; INFO includes the cost of emitting the prompt',
+    )
+    args = parser.parse_args()
+    logging.basicConfig(stream=open(os.devnull, 'w'), level=args.log_level)
+
+    print(f'{"image MB":>8} {"strategy":<10} {"peak MB":>9} {"CPU ms":>8}')
+    for megabytes in args.megabytes:
+        image = os.urandom(int(megabytes * 1e6))
+        assert bytes(current_body(image)) == previous_body(image)
+        for name, build in (('previous', previous_body), ('current', current_body)):
+            peak, cpu = measure(build, image, args.repeat)
+            print(f'{megabytes:>8g} {name:<10} {peak:>9.1f} {cpu:>8.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+#
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You may not use this file except in compliance
+# with the License. A copy of the License is located at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# or in the 'license' file accompanying this file. This file is distributed on an 'AS IS' BASIS, WITHOUT WARRANTIES
+# OR CONDITIONS OF ANY KIND, express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+#
+
+"""Per-snippet latency of the code scanner.
+
+Compares a one-off bandit run (temporary file, fresh config and manager, as
+check_security used to do) with the persistent in-memory scanner. With
+``--scaling`` it instead times the whole scan_python_code pipeline on
+growing inputs, to check that the cost per line stays flat, and with
+``--parallel N`` it scans N snippets one by one and on the process pool.
+
+Usage:
+    PYTHONPATH=. python benchmarks/bench_scanner.py --lines 200 --repeat 50
+    PYTHONPATH=. python benchmarks/bench_scanner.py --scaling --repeat 5
+    PYTHONPATH=. python benchmarks/bench_scanner.py --parallel 64 --lines 200
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import time
+from awslabs.aws_cv_mcp_server.scan_pool import ScanPool
+from awslabs.aws_cv_mcp_server.scanner import BanditScanner, scan_code, scan_python_code
+from tempfile import NamedTemporaryFile
+
+
+SNIPPET = """import subprocess
+
+
+def handler(event):
+    # Run the configured command
+    command = event.get('command', 'ls')
+    subprocess.call(command, shell=True)
+    return {{'status': 'ok', 'value': {index}}}
+"""
+
+
+def one_off_scan(code: str) -> int:
+    """Scan the way check_security used to: temp file plus a fresh bandit manager."""
+    from bandit.core import config, manager
+
+    with NamedTemporaryFile(mode='w', suffix='.py', delete=False) as handle:
+        handle.write(code)
+    try:
+        mgr = manager.BanditManager(config.BanditConfig(), 'file', debug=True, verbose=True)
+        mgr.discover_files([handle.name])
+        mgr.run_tests()
+        return len(mgr.get_issue_list())
+    finally:
+        os.unlink(handle.name)
+
+
+def measure(scan, code: str, repeat: int):
+    """Return the first-call latency and the median of the following calls, in ms."""
+    start = time.perf_counter()
+    scan(code)
+    first = (time.perf_counter() - start) * 1000
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        scan(code)
+        timings.append((time.perf_counter() - start) * 1000)
+    return first, statistics.median(timings)
+
+
+def make_code(lines: int) -> str:
+    """Return roughly ``lines`` lines of code with a dangerous call in every block."""
+    blocks = max(1, lines // SNIPPET.count('\n'))
+    return '\n'.join(SNIPPET.format(index=index) for index in range(blocks))
+
+
+def scaling(repeat: int):
+    """Print scan_python_code latency and cost per 1000 lines on growing inputs."""
+    print(f'{"lines":>7} {"median (ms)":>12} {"ms / 1000 lines":>16}')
+    for lines in (1000, 2000, 4000, 8000):
+        code = make_code(lines)
+        total = code.count('\n') + 1
+        _, median = measure(lambda source: asyncio.run(scan_python_code(source)), code, repeat)
+        print(f'{total:>7} {median:>12.2f} {median / total * 1000:>16.2f}')
+
+
+def parallel(count: int, lines: int):
+    """Print the wall time of scanning ``count`` snippets sequentially and on the pool."""
+    codes = [make_code(lines) + f'\nmarker = {index}\n' for index in range(count)]
+
+    start = time.perf_counter()
+    for code in codes:
+        scan_code(code)
+    sequential = time.perf_counter() - start
+
+    pool = ScanPool()
+    pool.warm_up()
+    start = time.perf_counter()
+    asyncio.run(pool.scan_many(codes))
+    pooled = time.perf_counter() - start
+    pool.shutdown()
+
+    print(f'{count} snippets of {lines} lines, {pool.max_workers} workers')
+    print(
+        f'sequential: {sequential:.2f}s  pool: {pooled:.2f}s  speedup: {sequential / pooled:.1f}x'
+    )
+
+
+def main():
+    """Print first-call and steady-state latency for each scanning strategy."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--lines', type=int, default=200, help='Approximate snippet length')
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument(
+        '--scaling', action='store_true', help='Time scan_python_code on 1k-8k line inputs'
+    )
+    parser.add_argument(
+        '--parallel', type=int, default=0, help='Scan this many snippets on the pool'
+    )
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    if args.parallel:
+        parallel(args.parallel, args.lines)
+        return
+    if args.scaling:
+        scaling(args.repeat)
+        return
+
+    code = make_code(args.lines)
+    print(f'snippet: {code.count(chr(10)) + 1} lines')
+    print(f'{"strategy":<28} {"first (ms)":>11} {"median (ms)":>12}')
+
+    strategies = {
+        'temp file + new manager': one_off_scan,
+        'persistent in-memory': BanditScanner().scan,
+        'scan_python_code': lambda source: asyncio.run(scan_python_code(source)),
+    }
+    for name, scan in strategies.items():
+        first, median = measure(scan, code, args.repeat)
+        print(f'{name:<28} {first:>11.2f} {median:>12.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,186 @@
+import hashlib
+import io
+import json
+import os
+import pytest
+import threading
+import time
+from awslabs.aws_cv_mcp_server.connections import Connections
+from botocore.exceptions import ClientError
+from datetime import datetime, timezone
+
+
+# Keep the shared event store out of the home directory; set before any test imports it
+os.environ.setdefault('CV_EVENT_STORE_PATH', ':memory:')
+
+
+class FakeS3Client:
+    """In-memory stand-in for the boto3 S3 client."""
+
+    def __init__(self, objects=None, latency=0.0):
+        """Create a client serving ``objects``, a key to bytes mapping."""
+        self.objects = dict(objects or {})
+        self.latency = latency
+        self.calls = []
+
+    def _etag(self, key):
+        return f'"{hashlib.md5(self.objects[key]).hexdigest()}"'
+
+    def get_paginator(self, operation):
+        """Return a paginator that serves one page per call."""
+        return FakePaginator(self, operation)
+
+    def list_objects_v2(self, Bucket, Prefix='', StartAfter='', **kwargs):
+        """List the stored keys under ``Prefix`` that sort after ``StartAfter``."""
+        self.calls.append(('list_objects_v2', Prefix))
+        keys = sorted(key for key in self.objects if key.startswith(Prefix) and key > StartAfter)
+        return {
+            'Contents': [
+                {
+                    'Key': key,
+                    'LastModified': datetime(2025, 1, 1, tzinfo=timezone.utc),
+                    'ETag': self._etag(key),
+                    'Size': len(self.objects[key]),
+                }
+                for key in keys
+            ]
+        }
+
+    def head_object(self, Bucket, Key, **kwargs):
+        """Return the content type and ETag of a stored object."""
+        self.calls.append(('head_object', Key))
+        return {'ContentType': 'image/png', 'ETag': self._etag(Key)}
+
+    def get_object(self, Bucket, Key, IfNoneMatch=None, **kwargs):
+        """Return a stored object, or raise 304 when ``IfNoneMatch`` matches."""
+        self.calls.append(('get_object', Key))
+        time.sleep(self.latency)
+        if IfNoneMatch is not None and IfNoneMatch == self._etag(Key):
+            raise ClientError(
+                {
+                    'Error': {'Code': '304', 'Message': 'Not Modified'},
+                    'ResponseMetadata': {'HTTPStatusCode': 304},
+                },
+                'GetObject',
+            )
+        return {
+            'Body': io.BytesIO(self.objects[Key]),
+            'ContentType': 'image/png',
+            'ETag': self._etag(Key),
+        }
+
+
+class FakePaginator:
+    """Single-page stand-in for a boto3 paginator."""
+
+    def __init__(self, client, operation):
+        """Wrap ``operation`` of ``client``."""
+        self.client = client
+        self.operation = operation
+
+    def paginate(self, **kwargs):
+        """Yield the single page returned by the wrapped operation."""
+        yield getattr(self.client, self.operation)(**kwargs)
+
+
+class FakeBedrockClient:
+    """Stand-in for the bedrock-runtime client that records peak concurrency."""
+
+    def __init__(self, text='cats detected', latency=0.0, throttle=0):
+        """Create a client answering ``text`` that throttles the first ``throttle`` calls."""
+        self.text = text
+        self.latency = latency
+        self.throttle = throttle
+        self.usage = {'input_tokens': 100, 'output_tokens': 10}
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def _maybe_throttle(self, operation):
+        with self._lock:
+            if self.throttle <= 0:
+                return
+            self.throttle -= 1
+        raise ClientError(
+            {'Error': {'Code': 'ThrottlingException', 'Message': 'Too many requests'}},
+            operation,
+        )
+
+    def invoke_model(self, modelId, body, **kwargs):
+        """Record the request body and return a canned completion."""
+        self._maybe_throttle('InvokeModel')
+        with self._lock:
+            self.calls.append(json.loads(body))
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(self.latency)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+        payload = {
+            'content': [{'type': 'text', 'text': self.text}],
+            'usage': self.usage,
+        }
+        return {'body': io.BytesIO(json.dumps(payload).encode())}
+
+    def invoke_model_with_response_stream(self, modelId, body, **kwargs):
+        """Record the request body and stream a canned completion."""
+        self._maybe_throttle('InvokeModelWithResponseStream')
+        self.calls.append(json.loads(body))
+
+        def events():
+            yield {'chunk': {'bytes': json.dumps({'type': 'message_start'}).encode()}}
+            for word in self.text.split(' '):
+                time.sleep(self.latency)
+                delta = {
+                    'type': 'content_block_delta',
+                    'delta': {'type': 'text_delta', 'text': word + ' '},
+                }
+                yield {'chunk': {'bytes': json.dumps(delta).encode()}}
+            yield {'chunk': {'bytes': json.dumps({'type': 'message_stop'}).encode()}}
+
+        return {'body': events()}
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """Reset the module-level caches and counters around every test."""
+    from awslabs.aws_cv_mcp_server.bedrock_utils import token_usage
+    from awslabs.aws_cv_mcp_server.cv_tools import in_flight_analyses, result_cache
+    from awslabs.aws_cv_mcp_server.dedup import near_duplicate_index
+    from awslabs.aws_cv_mcp_server.event_store import event_store
+    from awslabs.aws_cv_mcp_server.s3_utils import image_cache
+    from awslabs.aws_cv_mcp_server.scanner import scan_cache
+
+    caches = (
+        result_cache,
+        in_flight_analyses,
+        image_cache,
+        near_duplicate_index,
+        token_usage,
+        scan_cache,
+        event_store,
+    )
+    for cache in caches:
+        cache.clear()
+    yield
+    for cache in caches:
+        cache.clear()
+
+
+@pytest.fixture
+def fake_s3(monkeypatch):
+    """Replace the S3 client with an in-memory bucket holding two frames."""
+    client = FakeS3Client({'cam/frame1.png': b'frame-1', 'cam/frame2.png': b'frame-2'})
+    monkeypatch.setattr(Connections, 's3_client', client)
+    return client
+
+
+@pytest.fixture
+def fake_bedrock(monkeypatch):
+    """Replace the Bedrock client with a canned responder."""
+    client = FakeBedrockClient()
+    monkeypatch.setattr(Connections, 'bedrock_client', client)
+    return client
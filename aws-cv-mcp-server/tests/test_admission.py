@@ -0,0 +1,58 @@
+import asyncio
+import pytest
+from awslabs.aws_cv_mcp_server.admission import AdmissionController, Overloaded
+
+
+@pytest.mark.asyncio
+async def test_admission_caps_concurrency_and_queues_in_order():
+    """Requests beyond the limit wait and are admitted in arrival order."""
+    controller = AdmissionController(max_concurrency=2, max_queue=10, queue_timeout=5)
+    running = 0
+    peak = 0
+    order = []
+
+    async def request(index):
+        nonlocal running, peak
+        async with controller.slot():
+            running += 1
+            peak = max(peak, running)
+            order.append(index)
+            await asyncio.sleep(0.02)
+            running -= 1
+
+    await asyncio.gather(*[request(index) for index in range(6)])
+
+    stats = controller.stats()
+    assert peak == 2
+    assert order == list(range(6))
+    assert stats['admitted'] == 6
+    assert stats['peak_waiting'] == 4
+    assert stats['wait_p95_ms'] > 0
+
+
+@pytest.mark.asyncio
+async def test_admission_sheds_requests_when_queue_is_full_or_wait_expires():
+    """Requests are shed when the queue is full or their wait times out."""
+    controller = AdmissionController(max_concurrency=1, max_queue=1, queue_timeout=0.05)
+    release = asyncio.Event()
+
+    async def hold():
+        async with controller.slot():
+            await release.wait()
+
+    holder = asyncio.create_task(hold())
+    await asyncio.sleep(0)
+    queued = asyncio.create_task(hold())
+    await asyncio.sleep(0)
+
+    with pytest.raises(Overloaded) as shed:
+        async with controller.slot():
+            pass
+    with pytest.raises(Overloaded):
+        await queued
+
+    release.set()
+    await holder
+    stats = controller.stats()
+    assert shed.value.retry_after >= 1
+    assert (stats['rejected'], stats['timed_out'], stats['in_flight']) == (1, 1, 0)
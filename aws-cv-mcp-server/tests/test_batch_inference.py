@@ -0,0 +1,126 @@
+import boto3
+import io
+import json
+import pytest
+from awslabs.aws_cv_mcp_server import batch_inference
+from awslabs.aws_cv_mcp_server.connections import Connections
+from moto import mock_aws
+from PIL import Image
+
+
+BUCKET = 'agent-bucket'
+
+
+def _png(color):
+    output = io.BytesIO()
+    Image.new('RGB', (32, 32), color).save(output, format='PNG')
+    return output.getvalue()
+
+
+@pytest.fixture
+def moto_s3(monkeypatch):
+    """Point the shared S3 client at a moto bucket."""
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'testing')
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'testing')
+    with mock_aws():
+        client = boto3.client('s3', region_name='us-east-1')
+        client.create_bucket(Bucket=BUCKET)
+        for index, color in enumerate(('red', 'green', 'blue')):
+            client.put_object(
+                Bucket=BUCKET,
+                Key=f'archive/frame{index}.png',
+                Body=_png(color),
+                ContentType='image/png',
+            )
+        monkeypatch.setattr(Connections, 's3_client', client)
+        monkeypatch.setattr(Connections, 'agent_bucket_name', BUCKET)
+        monkeypatch.setattr(batch_inference, 'BATCH_BACKEND', 'local')
+        monkeypatch.setattr(
+            batch_inference, 'local_batch_client', batch_inference.LocalBatchInferenceClient()
+        )
+        yield client
+
+
+def test_batch_job_round_trip(moto_s3, fake_bedrock, monkeypatch):
+    """A job writes its input, submits it and pages its parsed output."""
+    job = batch_inference.submit_batch_job(
+        'Is anyone there?', prefix='archive/', job_name='nightly'
+    )
+
+    assert job.status == 'success', job.message
+    assert job.records == 3
+    assert job.input_uri == f's3://{BUCKET}/batch-inference/nightly/input/records.jsonl'
+
+    # Every record carries the same prompt describe_image would send
+    body = moto_s3.get_object(Bucket=BUCKET, Key='batch-inference/nightly/input/records.jsonl')
+    records = [json.loads(line) for line in body['Body'].iter_lines()]
+    assert [record['recordId'] for record in records] == [
+        '00000000000',
+        '00000000001',
+        '00000000002',
+    ]
+    assert records[0]['modelInput']['messages'][0]['content'][1]['text'] == 'Is anyone there?'
+
+    finished = batch_inference.wait_for_batch_job(job.job_arn, poll_interval=0.01, timeout=10)
+    assert finished.job_status == 'Completed'
+
+    results = list(batch_inference.iter_batch_results(job.job_arn))
+    assert [result.source for result in results] == [f'archive/frame{i}.png' for i in range(3)]
+    assert all(result.analysis == 'cats detected' for result in results)
+
+    # Later pages resume with a ranged GET instead of re-reading earlier records
+    ranges = []
+    get_object = moto_s3.get_object
+
+    def recording_get_object(**kwargs):
+        ranges.append(kwargs.get('Range'))
+        return get_object(**kwargs)
+
+    monkeypatch.setattr(moto_s3, 'get_object', recording_get_object)
+    first = batch_inference.get_batch_results(job.job_arn, limit=2)
+    second = batch_inference.get_batch_results(job.job_arn, next_token=first.next_token, limit=2)
+
+    assert [result.source for result in first.results] == [
+        'archive/frame0.png',
+        'archive/frame1.png',
+    ]
+    assert [result.source for result in second.results] == ['archive/frame2.png']
+    assert second.next_token is None
+    position, _ = first.next_token.split(':', 1)
+    assert [value for value in ranges if value] == [f'bytes={position}-']
+
+
+def test_unreadable_keys_are_skipped_instead_of_failing_the_job(moto_s3, fake_bedrock):
+    """One missing image is listed as skipped; the job fails only when nothing is left."""
+    keys = ['archive/frame0.png', 'archive/missing.png', 'archive/frame2.png']
+
+    job = batch_inference.submit_batch_job('Is anyone there?', image_file_names=keys)
+
+    assert job.status == 'success', job.message
+    assert job.records == 2
+    assert [item['key'] for item in job.skipped] == ['archive/missing.png']
+    manifest = json.loads(
+        moto_s3.get_object(Bucket=BUCKET, Key=f'batch-inference/{job.job_name}/records.json')[
+            'Body'
+        ].read()
+    )
+    assert list(manifest['records'].values()) == ['archive/frame0.png', 'archive/frame2.png']
+    assert manifest['skipped'] == job.skipped
+
+    failed = batch_inference.submit_batch_job(
+        'Is anyone there?', image_file_names=['archive/missing.png'], job_name='empty'
+    )
+    assert failed.status == 'error'
+    assert 'None of the 1 images could be prepared' in failed.message
+
+
+def test_batch_output_errors_become_error_responses():
+    """Records Bedrock could not process are returned as errors."""
+    result = batch_inference.parse_batch_record(
+        {'recordId': '00000000000', 'error': {'errorCode': 400, 'errorMessage': 'bad image'}},
+        {'00000000000': 'archive/frame0.png'},
+    )
+
+    assert result.status == 'error'
+    assert result.source == 'archive/frame0.png'
+    assert 'bad image' in result.message
@@ -0,0 +1,48 @@
+import time
+from awslabs.aws_cv_mcp_server.cache import LRUCache, ResultCache
+
+
+def test_lru_cache_evicts_by_size_and_ttl():
+    """Entries are evicted once the byte budget is exceeded or they expire."""
+    cache = LRUCache(max_entries=10, max_bytes=10, sizeof=len)
+    cache.set('a', 'xxxx')
+    cache.set('b', 'yyyy')
+    cache.get('a')
+    cache.set('c', 'zzzz')
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 'xxxx'
+    assert cache.evictions == 1
+
+    cache.set('short', 'v', ttl=0.01)
+    time.sleep(0.02)
+    assert cache.get('short') is None
+
+
+def test_result_cache_disk_tier_survives_restart(tmp_path):
+    """Results written to the disk tier are read back by a new cache."""
+    first = ResultCache(directory=str(tmp_path), ttl=60)
+    first.set('key', {'analysis': 'cats'})
+
+    second = ResultCache(directory=str(tmp_path), ttl=60)
+    assert second.get('key') == {'analysis': 'cats'}
+    assert second.get('other') is None
+    assert second.stats()['disk_hits'] == 1
+    assert second.stats()['hit_rate'] == 0.5
+
+
+def test_image_cache_revalidates_with_etag(fake_s3):
+    """Cached images are revalidated with a conditional GET instead of downloaded."""
+    from awslabs.aws_cv_mcp_server.s3_utils import ImageCache
+
+    cache = ImageCache(max_bytes=1024)
+    first = cache.get('cam/frame1.png')
+    second = cache.get('cam/frame1.png')
+    fake_s3.objects['cam/frame1.png'] = b'frame-1-changed'
+    third = cache.get('cam/frame1.png')
+
+    assert second is first
+    assert third.data == b'frame-1-changed'
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 2
+    assert cache.stats()['bytes_saved'] == len(b'frame-1')
@@ -0,0 +1,15 @@
+from awslabs.aws_cv_mcp_server.connections import Connections
+
+
+def test_clients_are_shared_and_use_tuned_config(monkeypatch):
+    """Clients are created once per service with the tuned pool and retry config."""
+    monkeypatch.setattr(Connections, '_clients', {})
+    monkeypatch.setattr(Connections, 'max_pool_connections', 48)
+
+    client = Connections.client('s3', region_name='eu-west-1')
+
+    assert Connections.client('s3', region_name='eu-west-1') is client
+    assert client.meta.region_name == 'eu-west-1'
+    assert client.meta.config.max_pool_connections == 48
+    assert client.meta.config.retries['mode'] == Connections.retry_mode
+    assert client.meta.config.tcp_keepalive is Connections.tcp_keepalive
@@ -3,7 +3,7 @@ from awslabs.aws_cv_mcp_server.server import mcp_describe_image
 
 @pytest.mark.asyncio
 async def test_describe_image(monkeypatch):
-    async def fake_describe_image(image_file_name: str, monitoring_instructions: str):
+    async def fake_describe_image(image_file_name: str, monitoring_instructions: str, **kwargs):
         class FakeResp:
             analysis = "cats detected"
         return FakeResp()
@@ -19,3 +19,285 @@ async def test_describe_image(monkeypatch):
     )
 
     assert result == {"description": "cats detected", "source_image": "test.png"}
+
+
+@pytest.mark.asyncio
+async def test_describe_image_calls_overlap(fake_s3, fake_bedrock):
+    """Concurrent calls reach Bedrock together instead of one after another."""
+    import asyncio
+    import time
+    from awslabs.aws_cv_mcp_server.cv_tools import describe_image
+
+    fake_bedrock.latency = 0.2
+    start = time.perf_counter()
+    results = await asyncio.gather(
+        *[describe_image('cam/frame1.png', f'look for cats {index}') for index in range(4)]
+    )
+    elapsed = time.perf_counter() - start
+
+    assert [r.status for r in results] == ['success'] * 4
+    assert results[0].analysis == 'cats detected'
+    assert fake_bedrock.max_in_flight == 4
+    assert elapsed < 0.6
+
+
+@pytest.mark.asyncio
+async def test_describe_image_coalesces_identical_calls_in_flight(fake_s3, fake_bedrock):
+    """Identical calls in flight share one Bedrock request; usage is reported once."""
+    import asyncio
+    from awslabs.aws_cv_mcp_server.cv_tools import describe_image, in_flight_analyses
+
+    fake_bedrock.latency = 0.2
+    results = await asyncio.gather(
+        *[describe_image('cam/frame1.png', 'look for cats') for _ in range(4)],
+        describe_image('cam/frame2.png', 'look for cats'),
+    )
+
+    assert [r.status for r in results] == ['success'] * 5
+    assert {r.analysis for r in results} == {'cats detected'}
+    assert len(fake_bedrock.calls) == 2
+    assert sum(1 for r in results[:4] if r.usage is not None) == 1
+    assert in_flight_analyses.stats()['hits'] == 3
+    assert len(in_flight_analyses) == 0
+
+
+@pytest.mark.asyncio
+async def test_describe_image_coalescing_survives_leader_cancellation(fake_s3, fake_bedrock):
+    """Cancelling the first caller leaves followers served; with no callers left the work is dropped."""
+    import asyncio
+    from awslabs.aws_cv_mcp_server.cv_tools import describe_image, in_flight_analyses
+
+    fake_bedrock.latency = 0.2
+    leader = asyncio.create_task(describe_image('cam/frame1.png', 'look for cats'))
+    await asyncio.sleep(0.05)
+    follower = asyncio.create_task(describe_image('cam/frame1.png', 'look for cats'))
+    await asyncio.sleep(0)
+    leader.cancel()
+
+    result = await follower
+    assert leader.cancelled()
+    assert result.status == 'success'
+    assert len(fake_bedrock.calls) == 1
+
+    # With every caller gone the shared analysis is abandoned and not reused
+    fake_s3.objects['cam/frame1.png'] = b'frame-1b'
+    fake_bedrock.latency = 0.5
+    lone = asyncio.create_task(describe_image('cam/frame1.png', 'look for cats'))
+    await asyncio.sleep(0.05)
+    lone.cancel()
+    await asyncio.sleep(0)
+    assert in_flight_analyses.stats()['cancelled'] == 1
+    assert len(in_flight_analyses) == 0
+
+
+@pytest.mark.asyncio
+async def test_describe_image_followers_share_leader_error(fake_s3, fake_bedrock):
+    """Followers get the leader's error, and a later retry fetches the image again."""
+    import asyncio
+    from awslabs.aws_cv_mcp_server.cv_tools import describe_image
+
+    results = await asyncio.gather(
+        *[describe_image('cam/missing.png', 'look for cats') for _ in range(3)]
+    )
+
+    assert [r.status for r in results] == ['error'] * 3
+    assert len({r.message for r in results}) == 1
+    assert sum(1 for call in fake_s3.calls if call[1] == 'cam/missing.png') == 1
+    assert fake_bedrock.calls == []
+
+    retry = await describe_image('cam/missing.png', 'look for cats')
+    assert retry.status == 'error'
+    assert sum(1 for call in fake_s3.calls if call[1] == 'cam/missing.png') == 2
+
+
+@pytest.mark.asyncio
+async def test_describe_image_serves_repeats_from_cache(fake_s3, fake_bedrock):
+    """A repeated image and prompt is answered from the result cache."""
+    from awslabs.aws_cv_mcp_server.cv_tools import describe_image, result_cache
+    from awslabs.aws_cv_mcp_server.s3_utils import image_cache
+
+    first = await describe_image('cam/frame1.png', 'look for cats')
+    second = await describe_image('cam/frame1.png', 'look for cats')
+    other = await describe_image('cam/frame1.png', 'look for dogs')
+
+    assert second.analysis == first.analysis
+    assert len(fake_bedrock.calls) == 2
+    assert image_cache.stats()['misses'] == 1
+    assert other.status == 'success'
+    assert result_cache.stats()['hits'] == 1
+
+
+@pytest.mark.asyncio
+async def test_describe_images_reports_failures_per_image(fake_s3, fake_bedrock):
+    """One missing image fails on its own and the batch is reported as partial."""
+    from awslabs.aws_cv_mcp_server.cv_tools import describe_images
+
+    response = await describe_images(
+        monitoring_instructions='look for cats',
+        image_file_names=['cam/frame1.png', 'cam/missing.png', 'cam/frame2.png'],
+        max_concurrency=2,
+    )
+
+    assert response.status == 'partial'
+    assert [r.source for r in response.results] == [
+        'cam/frame1.png',
+        'cam/missing.png',
+        'cam/frame2.png',
+    ]
+    assert [r.status for r in response.results] == ['success', 'error', 'success']
+    assert (response.succeeded, response.failed) == (2, 1)
+
+
+@pytest.mark.asyncio
+async def test_describe_images_admits_each_image_separately(fake_s3, fake_bedrock, monkeypatch):
+    """A batch holds one admission slot per running analysis, and shed images fail alone."""
+    from awslabs.aws_cv_mcp_server.admission import AdmissionController
+    from awslabs.aws_cv_mcp_server.cv_tools import describe_images
+
+    controller = AdmissionController(max_concurrency=1, max_queue=1, queue_timeout=5)
+    monkeypatch.setattr('awslabs.aws_cv_mcp_server.cv_tools.request_admission', controller)
+    fake_s3.objects['cam/frame3.png'] = b'frame-3'
+    fake_bedrock.latency = 0.02
+
+    response = await describe_images('look for cats', prefix='cam/', max_concurrency=3)
+
+    # One image runs, one waits and the third finds the queue full
+    assert [r.status for r in response.results] == ['success', 'success', 'error']
+    assert 'Server is busy' in response.results[2].message
+    assert (controller.admitted, controller.rejected) == (2, 1)
+
+
+@pytest.mark.asyncio
+async def test_describe_images_reports_a_truncated_prefix(fake_s3, fake_bedrock):
+    """A prefix larger than the batch says where to continue instead of dropping images."""
+    from awslabs.aws_cv_mcp_server.cv_tools import describe_images
+
+    fake_s3.objects['cam/frame3.png'] = b'frame-3'
+
+    first = await describe_images('look for cats', prefix='cam/', max_images=2)
+    rest = await describe_images(
+        'look for cats', prefix='cam/', max_images=2, start_after=first.next_start_after
+    )
+
+    assert [r.source for r in first.results] == ['cam/frame1.png', 'cam/frame2.png']
+    assert first.truncated and first.next_start_after == 'cam/frame2.png'
+    assert [r.source for r in rest.results] == ['cam/frame3.png']
+    assert not rest.truncated and rest.next_start_after is None
+
+
+@pytest.mark.asyncio
+async def test_describe_image_streams_partial_text(fake_s3, fake_bedrock):
+    """Streamed text reaches the callback and adds up to the final analysis."""
+    from awslabs.aws_cv_mcp_server.cv_tools import describe_image
+
+    fake_bedrock.text = 'two cats on the porch'
+    chunks = []
+
+    async def on_text(text):
+        chunks.append(text)
+
+    response = await describe_image('cam/frame1.png', 'look for cats', on_text=on_text)
+
+    assert response.status == 'success'
+    assert ''.join(chunks) == response.analysis == 'two cats on the porch '
+
+
+@pytest.mark.asyncio
+async def test_compare_images_sends_labelled_images_in_one_request(fake_s3, fake_bedrock):
+    """All images go to Bedrock in one labelled request; a single image is rejected."""
+    from awslabs.aws_cv_mcp_server.cv_tools import compare_images
+
+    fake_bedrock.text = 'Image 2 shows a package that is missing in Image 1'
+    result = await compare_images(['cam/frame1.png', 'cam/frame2.png'], 'what changed?')
+
+    assert result.status == 'success'
+    assert result.analysis == fake_bedrock.text
+    assert result.sources == ['cam/frame1.png', 'cam/frame2.png']
+    assert len(fake_bedrock.calls) == 1
+    content = fake_bedrock.calls[0]['messages'][0]['content']
+    assert [block['type'] for block in content] == ['text', 'image', 'text', 'image', 'text']
+    assert content[0]['text'] == 'Image 1 of 2: cam/frame1.png'
+    assert content[2]['text'] == 'Image 2 of 2: cam/frame2.png'
+    assert content[-1]['text'] == 'what changed?'
+
+    single = await compare_images(['cam/frame1.png'], 'what changed?')
+    assert single.status == 'error'
+    assert len(fake_bedrock.calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_analyze_grid_sends_one_request_and_parses_alert(fake_s3, fake_bedrock):
+    """A grid of frames is one Bedrock request whose JSON reply becomes the alert."""
+    import io
+    import json
+    from awslabs.aws_cv_mcp_server.cv_tools import analyze_grid
+
+    Image = pytest.importorskip('PIL.Image')
+    pytest.importorskip('numpy')
+    for index in range(4):
+        output = io.BytesIO()
+        Image.new('RGB', (64, 48), (index * 60, 0, 0)).save(output, format='PNG')
+        fake_s3.objects[f'feed/{index}.png'] = output.getvalue()
+    fake_bedrock.text = '```json\n' + json.dumps(
+        {
+            'alert_level': 1,
+            'reason': 'Door left open',
+            'log_file_name': '20250101-120000_door_open.json',
+            'description': 'The door was opened',
+            'full_description': 'A person opened the door and left.',
+        }
+    ) + '\n```'
+
+    response = await analyze_grid(
+        'watch the door',
+        frame_keys=[f'feed/{i}.png' for i in range(4)],
+        timestamp='20250101-120000',
+        motion_threshold=0,
+    )
+
+    assert response.status == 'success'
+    assert response.alert_level == 1
+    assert response.brief_description == 'The door was opened'
+    assert len(fake_bedrock.calls) == 1
+    assert '20250101-120000' in fake_bedrock.calls[0]['messages'][0]['content'][1]['text']
+
+
+@pytest.mark.asyncio
+async def test_analyze_grid_skips_model_for_static_frames(fake_s3, fake_bedrock):
+    """Frames without motion are answered without calling Bedrock."""
+    import io
+    from awslabs.aws_cv_mcp_server.cv_tools import analyze_grid
+    from awslabs.aws_cv_mcp_server.motion_filter import motion_filter
+
+    Image = pytest.importorskip('PIL.Image')
+    pytest.importorskip('numpy')
+    for index in range(3):
+        output = io.BytesIO()
+        Image.new('RGB', (64, 48), (90, 90, 90)).save(output, format='PNG')
+        fake_s3.objects[f'still/{index}.png'] = output.getvalue()
+    motion_filter.reset()
+
+    response = await analyze_grid('watch the door', frame_keys=[f'still/{i}.png' for i in range(3)])
+
+    assert response.alert_level == 0
+    assert response.reason == 'no motion detected'
+    assert fake_bedrock.calls == []
+    assert motion_filter.stats()['skipped'] == 1
+
+
+@pytest.mark.asyncio
+async def test_describe_image_sheds_load_when_server_is_full(monkeypatch):
+    """A full server answers with a busy error and a retry hint."""
+    from awslabs.aws_cv_mcp_server.admission import AdmissionController
+
+    controller = AdmissionController(max_concurrency=1, max_queue=0)
+    monkeypatch.setattr('awslabs.aws_cv_mcp_server.server.request_admission', controller)
+
+    async with controller.slot():
+        result = await mcp_describe_image(
+            image_file_name='test.png',
+            monitoring_instructions='look for cats',
+        )
+
+    assert result['error'].startswith('Server is busy')
+    assert result['retry_after'] >= 1
@@ -0,0 +1,60 @@
+import io
+import pytest
+import random
+from awslabs.aws_cv_mcp_server.dedup import BKTree, NearDuplicateIndex, hamming_distance
+
+
+def test_bk_tree_finds_every_hash_within_radius():
+    """The BK-tree returns the same matches as a linear scan."""
+    rng = random.Random(7)
+    hashes = [rng.getrandbits(64) for _ in range(500)]
+    tree = BKTree()
+    for item_id, value in enumerate(hashes):
+        tree.add(value, item_id)
+    query = hashes[42] ^ 0b1011
+
+    expected = {i for i, value in enumerate(hashes) if hamming_distance(query, value) <= 4}
+
+    assert {item_id for _, item_id in tree.search(query, 4)} == expected
+    assert 42 in expected
+
+
+def test_index_evicts_by_age_and_size():
+    """The index drops the oldest hashes and those past their TTL."""
+    index = NearDuplicateIndex(max_distance=2, max_entries=2, ttl=60)
+    index.add('cam', 0b0000, 'first')
+    index.add('cam', 0b1111_0000, 'second')
+    index.add('cam', 0b1111_1111_0000_0000, 'third')
+
+    assert index.lookup('cam', 0b0001) is None
+    assert index.lookup('cam', 0b1111_0001) == (1, 'second')
+    assert index.lookup('other', 0b1111_0001) is None
+
+    index.ttl = 0
+    assert index.lookup('cam', 0b1111_0001) is None
+    assert index.stats()['entries'] == 0
+
+
+@pytest.mark.asyncio
+async def test_describe_image_reuses_near_duplicate_analysis(fake_s3, fake_bedrock):
+    """Near-identical frames reuse an analysis only when deduplication is requested."""
+    Image = pytest.importorskip('PIL.Image')
+    pytest.importorskip('numpy')
+    from awslabs.aws_cv_mcp_server.cv_tools import describe_image
+
+    for name, quality in (('a.jpg', 95), ('b.jpg', 70)):
+        image = Image.linear_gradient('L').resize((320, 240)).convert('RGB')
+        output = io.BytesIO()
+        image.save(output, format='JPEG', quality=quality)
+        fake_s3.objects[f'porch/{name}'] = output.getvalue()
+
+    first = await describe_image('porch/a.jpg', 'look for cats', deduplicate=True)
+    second = await describe_image('porch/b.jpg', 'look for cats', deduplicate=True)
+    third = await describe_image('porch/b.jpg', 'look for cats')
+
+    # Reuse is opt-in; the last call analyzes its own image
+    assert len(fake_bedrock.calls) == 2
+    assert third.message == 'Image analysis completed successfully'
+    assert second.analysis == first.analysis
+    assert second.source == 'porch/b.jpg'
+    assert 'Near-duplicate of porch/a.jpg' in second.message
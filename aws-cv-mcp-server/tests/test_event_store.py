@@ -0,0 +1,125 @@
+import os
+import pytest
+import subprocess
+import sys
+from awslabs.aws_cv_mcp_server.event_store import EventStore
+
+
+def test_event_store_searches_text_time_and_alert_level(tmp_path):
+    """Events are searchable by text, time range and alert level, and persist."""
+    path = str(tmp_path / 'events.db')
+    store = EventStore(path, batch_size=100, flush_interval=60)
+    store.record(
+        'grid',
+        'cam/driveway/0900.png',
+        '2025-01-01T09:00:00Z',
+        sources=['cam/driveway/0859.png', 'cam/driveway/0900.png'],
+        alert_level=0,
+        brief_description='A white delivery van parks in the driveway',
+    )
+    store.record(
+        'grid',
+        'cam/driveway/1400.png',
+        '2025-01-01T14:00:00Z',
+        alert_level=2,
+        reason='Person climbing the fence',
+        brief_description='Someone climbs over the side fence',
+        usage={'input_tokens': 1500, 'output_tokens': 200},
+    )
+    store.record(
+        'image', 'cam/porch/1500.png', '2025-01-01T15:00:00Z', analysis='Delivery van leaving'
+    )
+
+    # Nothing is written until a batch fills up or a search flushes it
+    assert store.stats()['written'] == 0
+
+    vans = store.search('delivery VAN?', order='oldest')
+    assert [event['source'] for event in vans] == ['cam/driveway/0900.png', 'cam/porch/1500.png']
+    assert vans[0]['occurred_at'] == '2025-01-01T09:00:00+00:00'
+    assert vans[0]['sources'] == ['cam/driveway/0859.png', 'cam/driveway/0900.png']
+    assert '[delivery]' in vans[0]['snippet']
+    assert store.stats()['batches'] == 1
+
+    assert [e['source'] for e in store.search('van', source_prefix='cam/driveway/')] == [
+        'cam/driveway/0900.png'
+    ]
+    assert [e['source'] for e in store.search(end='2025-01-01T12:00:00')] == [
+        'cam/driveway/0900.png'
+    ]
+    alerts = store.search(min_alert_level=1)
+    assert [event['reason'] for event in alerts] == ['Person climbing the fence']
+    assert alerts[0]['usage'] == {'input_tokens': 1500, 'output_tokens': 200}
+    assert store.search('porch', kind='image')[0]['analysis'] == 'Delivery van leaving'
+    store.close()
+
+    # Events survive a restart
+    reopened = EventStore(path)
+    assert reopened.count() == 3
+    assert len(reopened.search('fence')) == 1
+    reopened.close()
+
+
+def test_shared_event_store_defaults_to_a_file_in_the_state_directory(tmp_path):
+    """History survives restarts unless an in-memory store is requested explicitly."""
+    env = {key: value for key, value in os.environ.items() if not key.startswith('CV_')}
+
+    def configured(**overrides):
+        output = subprocess.run(
+            [
+                sys.executable,
+                '-c',
+                'from awslabs.aws_cv_mcp_server.event_store import event_store as s; '
+                'print(s.path, s.max_rows, s.retention)',
+            ],
+            env={**env, **overrides},
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        return output.stdout.split()
+
+    assert configured(CV_STATE_DIR=str(tmp_path)) == [
+        str(tmp_path / 'events.db'),
+        'None',
+        str(30 * 86400.0),
+    ]
+    assert configured(CV_EVENT_STORE_PATH=':memory:')[:2] == ['None', '10000']
+
+
+def test_in_memory_event_store_keeps_only_the_newest_rows():
+    """A row cap bounds the in-memory store, including its full-text index."""
+    store = EventStore(batch_size=2, flush_interval=60, max_rows=3)
+    for minute in range(5):
+        store.record('image', f'cam/{minute}.png', f'2025-01-01T09:0{minute}:00Z', analysis='van')
+        store.flush()
+
+    assert store.count() == 3
+    assert [event['source'] for event in store.search('van', order='oldest')] == [
+        'cam/2.png',
+        'cam/3.png',
+        'cam/4.png',
+    ]
+    assert store.stats()['evicted'] == 2
+    store.close()
+
+
+@pytest.mark.asyncio
+async def test_analyses_are_recorded_and_searchable(fake_s3, fake_bedrock):
+    """Image analyses are recorded in the event store as they complete."""
+    from awslabs.aws_cv_mcp_server.cv_tools import describe_image
+    from awslabs.aws_cv_mcp_server.event_store import event_store
+    from awslabs.aws_cv_mcp_server.server import mcp_search_events
+
+    fake_bedrock.text = 'A delivery van is parked by the gate'
+
+    await describe_image('cam/frame1.png', 'look for vehicles')
+    await describe_image('cam/frame1.png', 'look for vehicles')
+    calls = len(fake_bedrock.calls)
+
+    result = await mcp_search_events(query='delivery van', source_prefix='cam/')
+
+    assert result['count'] == 1
+    assert result['events'][0]['source'] == 'cam/frame1.png'
+    assert result['events'][0]['usage']['input_tokens'] == 100
+    assert len(fake_bedrock.calls) == calls
+    assert event_store.stats()['recorded'] == 1
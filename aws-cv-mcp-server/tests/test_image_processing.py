@@ -0,0 +1,87 @@
+import io
+import pytest
+from awslabs.aws_cv_mcp_server.image_processing import preprocess_image
+from awslabs.aws_cv_mcp_server.models import ImagePreprocessingOptions
+
+
+Image = pytest.importorskip('PIL.Image')
+
+
+def _jpeg(width, height):
+    output = io.BytesIO()
+    Image.new('RGB', (width, height), (120, 80, 40)).save(output, format='JPEG', quality=95)
+    return output.getvalue()
+
+
+def test_preprocess_caps_longest_edge_and_reencodes():
+    """Large images are downscaled to the longest edge and re-encoded."""
+    data, content_type = preprocess_image(
+        _jpeg(3000, 1500),
+        'image/jpeg',
+        ImagePreprocessingOptions(max_edge=1000, format='WEBP', quality=70),
+    )
+
+    assert content_type == 'image/webp'
+    assert Image.open(io.BytesIO(data)).size == (1000, 500)
+
+
+def test_preprocess_sizes_exif_rotated_photos_after_transposing():
+    """A photo stored sideways is capped on its displayed longer edge."""
+    exif = Image.Exif()
+    exif[0x0112] = 6  # Rotated 90 degrees clockwise
+    output = io.BytesIO()
+    Image.new('RGB', (4000, 3000)).save(output, format='JPEG', exif=exif.tobytes())
+
+    data, _ = preprocess_image(
+        output.getvalue(), 'image/jpeg', ImagePreprocessingOptions(max_edge=1000)
+    )
+
+    assert Image.open(io.BytesIO(data)).size == (750, 1000)
+
+
+def test_preprocess_leaves_small_images_untouched():
+    """Images already within the limits are sent as they are."""
+    original = _jpeg(200, 100)
+
+    assert preprocess_image(original, 'image/jpeg') == (original, 'image/jpeg')
+
+
+def test_compose_grid_tiles_frames_in_order():
+    """Frames are tiled row by row in the order given."""
+    pytest.importorskip('numpy')
+    from awslabs.aws_cv_mcp_server.image_processing import compose_grid
+
+    colours = [(255, 0, 0), (0, 255, 0), (0, 0, 255)]
+    frames = []
+    for colour in colours:
+        output = io.BytesIO()
+        Image.new('RGB', (400, 300), colour).save(output, format='PNG')
+        frames.append(output.getvalue())
+
+    grid = Image.open(io.BytesIO(compose_grid(frames, columns=2, tile_width=100, border=2)))
+
+    assert grid.size == (2 * 104, 2 * 79)
+    assert max(grid.getpixel((52, 60))) == grid.getpixel((52, 60))[0]
+    assert max(grid.getpixel((156, 60))) == grid.getpixel((156, 60))[1]
+    assert max(grid.getpixel((52, 139))) == grid.getpixel((52, 139))[2]
+    assert grid.getpixel((156, 139)) == (0, 0, 0)
+
+
+def test_motion_filter_ignores_brightness_but_sees_objects():
+    """A global brightness change is not motion, a new object is."""
+    pytest.importorskip('numpy')
+    from awslabs.aws_cv_mcp_server.motion_filter import MotionFilter
+
+    def frame(brightness, box=False):
+        image = Image.new('L', (320, 240), brightness)
+        if box:
+            image.paste(255, (100, 80, 180, 160))
+        output = io.BytesIO()
+        image.save(output, format='PNG')
+        return output.getvalue()
+
+    motion_filter = MotionFilter(change_threshold=0.01)
+
+    assert motion_filter.should_skip([frame(100), frame(130)]) == (True, 0.0)
+    static, score = motion_filter.should_skip([frame(100), frame(100, box=True)])
+    assert not static and score > 0.05
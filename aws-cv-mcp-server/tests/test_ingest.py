@@ -0,0 +1,235 @@
+import asyncio
+import boto3
+import io
+import json
+import os
+import pytest
+from awslabs.aws_cv_mcp_server import ingest
+from awslabs.aws_cv_mcp_server.admission import AdmissionController
+from awslabs.aws_cv_mcp_server.connections import Connections
+from moto import mock_aws
+from PIL import Image
+
+
+BUCKET = 'agent-bucket'
+
+
+def _frame():
+    # Noise, so consecutive test frames are not near-duplicates of each other
+    output = io.BytesIO()
+    Image.frombytes('RGB', (32, 32), os.urandom(32 * 32 * 3)).save(output, format='PNG')
+    return output.getvalue()
+
+
+def _notification(key):
+    record = {
+        'eventName': 'ObjectCreated:Put',
+        'eventTime': '2025-01-01T12:00:00.000Z',
+        's3': {'bucket': {'name': BUCKET}, 'object': {'key': key}},
+    }
+    return json.dumps({'Records': [record]})
+
+
+async def _wait_for(condition, timeout=10.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, 'timed out waiting for ingestion'
+        await asyncio.sleep(0.02)
+
+
+@pytest.fixture
+def moto_aws(monkeypatch):
+    """Point the shared S3 and SQS clients at moto."""
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'testing')
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'testing')
+    with mock_aws():
+        s3 = boto3.client('s3', region_name='us-east-1')
+        s3.create_bucket(Bucket=BUCKET)
+        sqs = boto3.client('sqs', region_name='us-east-1')
+        monkeypatch.setattr(Connections, 's3_client', s3)
+        monkeypatch.setattr(Connections, 'sqs_client', sqs)
+        monkeypatch.setattr(Connections, 'agent_bucket_name', BUCKET)
+        yield s3, sqs
+
+
+@pytest.mark.asyncio
+async def test_polling_pipeline_resumes_from_saved_cursor(moto_aws, fake_bedrock, tmp_path):
+    """A restarted polling pipeline only analyzes frames written since its cursor."""
+    s3, _ = moto_aws
+    for index in range(4):
+        s3.put_object(Bucket=BUCKET, Key=f'cam/{index}.png', Body=_frame())
+    s3.put_object(Bucket=BUCKET, Key='other/0.png', Body=_frame())
+    fake_bedrock.latency = 0.05
+
+    pipeline = ingest.create_pipeline(
+        'cam/',
+        'look for cats',
+        workers=2,
+        queue_size=1,
+        poll_interval=0.05,
+        state_dir=str(tmp_path),
+        backfill=True,
+    )
+    pipeline.start()
+    await _wait_for(lambda: pipeline.processed == 4)
+    await asyncio.sleep(0.2)
+    await pipeline.stop()
+
+    stats = pipeline.stats()
+    assert stats['received'] == 4
+    assert stats['peak_queued'] <= 1
+    assert stats['lag_max_seconds'] is not None
+    assert sorted(item['source'] for item in stats['recent']) == [f'cam/{i}.png' for i in range(4)]
+    assert len(fake_bedrock.calls) == 4
+
+    # A restarted pipeline only picks up frames written since
+    s3.put_object(Bucket=BUCKET, Key='cam/4.png', Body=_frame())
+    restarted = ingest.create_pipeline(
+        'cam/', 'look for cats', poll_interval=0.05, state_dir=str(tmp_path)
+    )
+    restarted.start()
+    await _wait_for(lambda: restarted.processed == 1)
+    await asyncio.sleep(0.2)
+    await restarted.stop()
+
+    assert restarted.received == 1
+    assert restarted.recent[0]['source'] == 'cam/4.png'
+    assert len(fake_bedrock.calls) == 5
+
+
+@pytest.mark.asyncio
+async def test_polling_ordered_keys_lists_after_the_cursor(moto_aws, monkeypatch):
+    """With time-ordered keys a poll starts after the oldest key the cursor tracks."""
+    s3, _ = moto_aws
+    for index in range(3):
+        s3.put_object(Bucket=BUCKET, Key=f'cam/{index}.png', Body=_frame())
+    starts = []
+    list_objects = ingest.fetch_image_objects
+
+    async def spy(prefix, **kwargs):
+        starts.append(kwargs.get('start_after'))
+        return await list_objects(prefix, **kwargs)
+
+    monkeypatch.setattr(ingest, 'fetch_image_objects', spy)
+    source = ingest.PollingSource(
+        'cam/', ingest.Cursor(), interval=0, backfill=True, ordered_keys=True
+    )
+    events = source.events()
+    for _ in range(3):
+        await source.ack(await events.__anext__(), True)
+    s3.put_object(Bucket=BUCKET, Key='cam/3.png', Body=_frame())
+    latest = await events.__anext__()
+    await events.aclose()
+
+    assert latest.key == 'cam/3.png'
+    assert starts == [None, 'cam/0.png']
+    assert source.stats()['last_listed'] == 3
+
+
+@pytest.mark.asyncio
+async def test_polling_retries_failed_frames_before_giving_up(moto_aws):
+    """A failed frame is yielded again instead of being marked done."""
+    s3, _ = moto_aws
+    s3.put_object(Bucket=BUCKET, Key='cam/0.png', Body=_frame())
+    source = ingest.PollingSource(
+        'cam/', ingest.Cursor(), interval=0, backfill=True, max_retries=1, retry_delay=0
+    )
+    events = source.events()
+
+    first = await events.__anext__()
+    await source.ack(first, False)
+    retried = await events.__anext__()
+    await source.ack(retried, False)
+    s3.put_object(Bucket=BUCKET, Key='cam/1.png', Body=_frame())
+    latest = await events.__anext__()
+    await events.aclose()
+
+    assert (first.key, retried.key, latest.key) == ('cam/0.png', 'cam/0.png', 'cam/1.png')
+    assert source.stats()['abandoned'] == 1
+    assert 'cam/0.png' in source.cursor.done
+
+
+@pytest.mark.asyncio
+async def test_queue_pipeline_deletes_handled_notifications(moto_aws, fake_bedrock, monkeypatch):
+    """Handled notifications are deleted and failed ones are left for redelivery."""
+    s3, sqs = moto_aws
+    admission = AdmissionController(max_concurrency=1)
+    monkeypatch.setattr(ingest, 'request_admission', admission)
+    queue_url = sqs.create_queue(QueueName='frames')['QueueUrl']
+    handled = []
+
+    async def handler(event, response):
+        handled.append((event.key, response.status))
+
+    s3.put_object(Bucket=BUCKET, Key='cam/front door.png', Body=_frame())
+    sqs.send_message(QueueUrl=queue_url, MessageBody=_notification('cam/front+door.png'))
+    sqs.send_message(QueueUrl=queue_url, MessageBody=_notification('cam/missing.png'))
+    sqs.send_message(QueueUrl=queue_url, MessageBody=_notification('other/0.png'))
+    sqs.send_message(QueueUrl=queue_url, MessageBody=json.dumps({'Event': 's3:TestEvent'}))
+
+    source = ingest.QueueSource(queue_url, 'cam/', wait_time=0, idle_interval=0.05)
+    pipeline = ingest.IngestionPipeline(source, 'cam/', 'look for cats', handlers=[handler])
+    pipeline.start()
+    await _wait_for(lambda: len(handled) == 2)
+    await pipeline.stop()
+
+    assert sorted(handled) == [('cam/front door.png', 'success'), ('cam/missing.png', 'error')]
+    # Workers go through the same admission control as the tools
+    assert admission.admitted == 2
+    # The failed frame's message stays in flight for redelivery; the rest are deleted
+    attributes = sqs.get_queue_attributes(QueueUrl=queue_url, AttributeNames=['All'])['Attributes']
+    assert attributes['ApproximateNumberOfMessages'] == '0'
+    assert attributes['ApproximateNumberOfMessagesNotVisible'] == '1'
+
+
+@pytest.mark.asyncio
+async def test_queue_source_keeps_outstanding_messages_hidden(moto_aws):
+    """A notification waiting behind a busy pipeline is not redelivered."""
+    _, sqs = moto_aws
+    queue_url = sqs.create_queue(QueueName='frames')['QueueUrl']
+    sqs.send_message(QueueUrl=queue_url, MessageBody=_notification('cam/0.png'))
+    source = ingest.QueueSource(queue_url, 'cam/', wait_time=0, visibility_timeout=1)
+    events = source.events()
+
+    event = await events.__anext__()
+    await asyncio.sleep(1.6)
+    attributes = sqs.get_queue_attributes(QueueUrl=queue_url, AttributeNames=['All'])['Attributes']
+    await source.ack(event, True)
+    await events.aclose()
+    await source.close()
+
+    assert attributes['ApproximateNumberOfMessages'] == '0'
+    assert source.stats()['visibility_extensions'] >= 2
+    assert 'Messages' not in sqs.receive_message(QueueUrl=queue_url)
+
+
+@pytest.mark.asyncio
+async def test_draining_pipeline_keeps_queued_messages_hidden(moto_aws, fake_bedrock):
+    """Frames drained at shutdown keep their messages hidden past the visibility timeout."""
+    s3, sqs = moto_aws
+    queue_url = sqs.create_queue(QueueName='frames')['QueueUrl']
+    for index in range(2):
+        s3.put_object(Bucket=BUCKET, Key=f'cam/{index}.png', Body=_frame())
+        sqs.send_message(QueueUrl=queue_url, MessageBody=_notification(f'cam/{index}.png'))
+    fake_bedrock.latency = 0.7
+    visible = []
+
+    async def handler(event, response):
+        attributes = sqs.get_queue_attributes(
+            QueueUrl=queue_url, AttributeNames=['ApproximateNumberOfMessages']
+        )['Attributes']
+        visible.append(attributes['ApproximateNumberOfMessages'])
+
+    source = ingest.QueueSource(queue_url, 'cam/', wait_time=0, visibility_timeout=1)
+    pipeline = ingest.IngestionPipeline(
+        source, 'cam/', 'look for cats', workers=1, handlers=[handler]
+    )
+    pipeline.start()
+    await _wait_for(lambda: pipeline.received == 2)
+    await pipeline.stop(drain=True)
+
+    # The second frame finishes about 1.4s after both messages were received
+    assert visible == ['0', '0']
+    assert pipeline.processed == 2
+    attributes = sqs.get_queue_attributes(QueueUrl=queue_url, AttributeNames=['All'])['Attributes']
+    assert attributes['ApproximateNumberOfMessagesNotVisible'] == '0'
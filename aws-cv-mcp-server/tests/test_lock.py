@@ -0,0 +1,45 @@
+import pytest
+from packaging.requirements import Requirement
+from packaging.specifiers import SpecifierSet
+from packaging.utils import canonicalize_name
+from pathlib import Path
+
+
+tomllib = pytest.importorskip('tomllib')
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def _declared(dependencies):
+    requirements = [Requirement(dependency) for dependency in dependencies]
+    return {
+        (canonicalize_name(req.name), tuple(sorted(req.extras)), str(req.specifier))
+        for req in requirements
+    }
+
+
+def _locked(entries):
+    return {
+        (
+            canonicalize_name(entry['name']),
+            tuple(sorted(entry.get('extras', []))),
+            str(SpecifierSet(entry.get('specifier', ''))),
+        )
+        for entry in entries
+    }
+
+
+def test_lock_file_matches_pyproject_dependencies():
+    """The Docker image installs with uv sync --frozen, so uv.lock must match pyproject."""
+    pyproject = tomllib.loads((ROOT / 'pyproject.toml').read_text())
+    lock = tomllib.loads((ROOT / 'uv.lock').read_text())
+    name = canonicalize_name(pyproject['project']['name'])
+    package = next(p for p in lock['package'] if canonicalize_name(p['name']) == name)
+    metadata = package['metadata']
+
+    stale = 'uv.lock is out of date with pyproject.toml; run `uv lock`'
+    declared = _declared(pyproject['project']['dependencies'])
+    assert _locked(metadata['requires-dist']) == declared, stale
+    for group, dependencies in pyproject.get('dependency-groups', {}).items():
+        assert _locked(metadata['requires-dev'][group]) == _declared(dependencies), stale
+    assert package['version'] == pyproject['project']['version'], stale
@@ -0,0 +1,110 @@
+import pytest
+import urllib.request
+from awslabs.aws_cv_mcp_server.metrics import (
+    Counter,
+    Histogram,
+    bedrock_tokens,
+    errors,
+    payload_bytes,
+    stage_seconds,
+    start_http_server,
+)
+
+
+def test_histogram_and_counter_render_prometheus_text():
+    """Histograms and counters render in the Prometheus text format."""
+    histogram = Histogram('demo_seconds', 'Demo latency', ('stage',), buckets=(0.1, 1.0))
+    histogram.observe(0.05, stage='fetch')
+    histogram.observe(0.5, stage='fetch')
+    histogram.observe(3.0, stage='fetch')
+    counter = Counter('demo_total', 'Demo count', ('kind',))
+    counter.inc(2, kind='say "hi"')
+
+    assert histogram.render() == [
+        '# HELP demo_seconds Demo latency',
+        '# TYPE demo_seconds histogram',
+        'demo_seconds_bucket{stage="fetch",le="0.1"} 1',
+        'demo_seconds_bucket{stage="fetch",le="1"} 2',
+        'demo_seconds_bucket{stage="fetch",le="+Inf"} 3',
+        'demo_seconds_sum{stage="fetch"} 3.55',
+        'demo_seconds_count{stage="fetch"} 3',
+    ]
+    assert counter.render()[-1] == 'demo_total{kind="say \\"hi\\""} 2'
+    with pytest.raises(ValueError):
+        counter.inc(kind='a', extra='b')
+
+
+@pytest.mark.asyncio
+async def test_describe_image_records_stage_timings_bytes_and_tokens(fake_s3, fake_bedrock):
+    """describe_image records stage timings, payload bytes and token usage."""
+    from awslabs.aws_cv_mcp_server.cv_tools import describe_image
+
+    stages = ('s3_fetch', 'preprocess', 'encode', 'bedrock')
+    before = {
+        stage: stage_seconds.count(operation='describe_image', stage=stage) for stage in stages
+    }
+    parses = stage_seconds.count(operation='invoke_bedrock_model', stage='parse')
+    downloaded = payload_bytes.value(payload='s3_download')
+    sent = payload_bytes.value(payload='bedrock_request')
+    input_tokens = bedrock_tokens.value(type='input_tokens')
+
+    response = await describe_image('cam/frame1.png', 'look for cats')
+
+    assert response.status == 'success'
+    for stage in stages:
+        assert stage_seconds.count(operation='describe_image', stage=stage) == before[stage] + 1
+    assert stage_seconds.count(operation='invoke_bedrock_model', stage='parse') == parses + 1
+    assert payload_bytes.value(payload='s3_download') > downloaded
+    assert payload_bytes.value(payload='bedrock_request') > sent
+    assert bedrock_tokens.value(type='input_tokens') == input_tokens + 100
+
+
+@pytest.mark.asyncio
+async def test_analyze_grid_records_stage_timings_and_errors(fake_s3, fake_bedrock, monkeypatch):
+    """Grid analyses show up in the stage histogram and error counter like describe_image."""
+    import io
+    from awslabs.aws_cv_mcp_server import cv_tools
+
+    Image = pytest.importorskip('PIL.Image')
+    pytest.importorskip('numpy')
+    fake_s3.objects.clear()
+    for index in range(3):
+        output = io.BytesIO()
+        Image.new('RGB', (64, 48), (index * 80, 0, 0)).save(output, format='PNG')
+        fake_s3.objects[f'feed/{index}.png'] = output.getvalue()
+    stages = ('s3_list', 's3_fetch', 'motion_filter', 'preprocess', 'encode', 'bedrock')
+    before = {
+        stage: stage_seconds.count(operation='analyze_grid', stage=stage) for stage in stages
+    }
+    parse_errors = errors.value(operation='analyze_grid', error_type='ValueError')
+
+    # The model answers in prose, so the alert cannot be parsed
+    response = await cv_tools.analyze_grid('watch the door', prefix='feed/', motion_threshold=0)
+
+    assert response.status == 'error'
+    for stage in stages:
+        assert stage_seconds.count(operation='analyze_grid', stage=stage) == before[stage] + 1
+    assert errors.value(operation='analyze_grid', error_type='ValueError') == parse_errors + 1
+
+    # A prefix larger than the listing bound is refused instead of listed in full
+    monkeypatch.setattr(cv_tools, 'GRID_MAX_LISTED', 2)
+    response = await cv_tools.analyze_grid('watch the door', prefix='feed/')
+
+    assert response.status == 'error'
+    assert 'more than 2 images' in response.message
+    assert len(fake_bedrock.calls) == 1
+
+
+def test_metrics_http_server_serves_registry():
+    """The metrics endpoint serves the registry over HTTP."""
+    server = start_http_server(0)
+    try:
+        port = server.server_port
+        with urllib.request.urlopen(f'http://127.0.0.1:{port}/metrics') as response:
+            body = response.read().decode('utf-8')
+            content_type = response.headers['Content-Type']
+    finally:
+        server.shutdown()
+
+    assert content_type.startswith('text/plain; version=0.0.4')
+    assert '# TYPE cv_stage_duration_seconds histogram' in body
@@ -0,0 +1,83 @@
+import io
+import pytest
+from awslabs.aws_cv_mcp_server import bedrock_utils
+from awslabs.aws_cv_mcp_server.bedrock_utils import token_usage
+from awslabs.aws_cv_mcp_server.cv_tools import describe_image
+from awslabs.aws_cv_mcp_server.prompt_templates import DESCRIBE_IMAGE_SYSTEM_PROMPT
+from PIL import Image
+
+
+CACHEABLE_MODEL = 'us.anthropic.claude-3-7-sonnet-20250219-v1:0'
+
+
+def _png(width, height):
+    buffer = io.BytesIO()
+    Image.new('RGB', (width, height)).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def test_prompt_builders_mark_the_system_prompt_cacheable():
+    """Builders add a cache checkpoint to the system prompt only on request."""
+    prompt = bedrock_utils.create_multimodal_prompt(
+        b'image',
+        'Describe it',
+        'image/png',
+        system_prompt='You are a camera',
+        cache_system_prompt=True,
+    )
+
+    assert prompt['system'] == [
+        {'type': 'text', 'text': 'You are a camera', 'cache_control': {'type': 'ephemeral'}}
+    ]
+    assert bedrock_utils.create_text_prompt('hi', system_prompt='static')['system'] == 'static'
+
+
+@pytest.mark.asyncio
+async def test_cache_checkpoint_follows_model_support(fake_bedrock):
+    """A long system prompt gets a checkpoint only for models that support caching."""
+    prompt = bedrock_utils.create_text_prompt('Describe the scene', system_prompt='rule ' * 1000)
+
+    await bedrock_utils.invoke_bedrock_model_async(prompt, model_id=CACHEABLE_MODEL)
+    await bedrock_utils.invoke_bedrock_model_async(prompt)
+
+    cached_body, plain_body = fake_bedrock.calls
+    assert cached_body['system'][0]['cache_control'] == {'type': 'ephemeral'}
+    # The default Claude 3 Sonnet model does not support prompt caching
+    assert plain_body['system'] == 'rule ' * 1000
+
+
+def test_checkpoint_is_only_placed_after_a_prefix_bedrock_will_cache():
+    """The checkpoint follows the image only once the prefix reaches the minimum."""
+    system = DESCRIBE_IMAGE_SYSTEM_PROMPT
+    small = bedrock_utils.create_multimodal_prompt(
+        _png(64, 64), 'Describe it', 'image/png', system
+    )
+    large = bedrock_utils.create_multimodal_prompt(
+        _png(1200, 900), 'Describe it', 'image/png', system
+    )
+
+    assert bedrock_utils.with_prompt_cache(small) is small
+
+    image, question = bedrock_utils.with_prompt_cache(large)['messages'][0]['content']
+    assert image['cache_control'] == {'type': 'ephemeral'}
+    assert 'cache_control' not in question
+    prefix_tokens = len(system) // 4 + bedrock_utils.image_tokens(_png(1200, 900))
+    assert prefix_tokens >= bedrock_utils.PROMPT_CACHE_MIN_TOKENS >= 1024
+
+
+@pytest.mark.asyncio
+async def test_cache_token_usage_is_reported(fake_s3, fake_bedrock):
+    """Prompt cache reads are reported per call and in the running totals."""
+    fake_bedrock.usage = {
+        'input_tokens': 40,
+        'output_tokens': 10,
+        'cache_read_input_tokens': 1200,
+        'cache_creation_input_tokens': 0,
+    }
+
+    response = await describe_image('cam/frame1.png', 'Describe it', model_id=CACHEABLE_MODEL)
+
+    assert response.usage.cache_read_input_tokens == 1200
+    stats = token_usage.stats()
+    assert stats['cache_hit_requests'] == 1
+    assert stats['cache_read_ratio'] == pytest.approx(1200 / 1240, abs=1e-4)
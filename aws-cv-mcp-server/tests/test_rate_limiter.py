@@ -0,0 +1,126 @@
+import asyncio
+import pytest
+import time
+from awslabs.aws_cv_mcp_server import bedrock_utils
+from awslabs.aws_cv_mcp_server.rate_limiter import AdaptiveRateLimiter, RateLimitExceeded
+from botocore.exceptions import ClientError
+
+
+def _client_error(code):
+    return ClientError({'Error': {'Code': code, 'Message': code}}, 'InvokeModel')
+
+
+@pytest.mark.asyncio
+async def test_requests_are_paced_to_the_configured_rate():
+    """Requests beyond the initial burst are paced to the configured rate."""
+    limiter = AdaptiveRateLimiter(requests_per_minute=6000, burst_seconds=1)
+
+    start = time.perf_counter()
+    for _ in range(150):
+        await limiter.acquire()
+    elapsed = time.perf_counter() - start
+
+    # 100 requests fit in the initial burst, the other 50 wait for 100/s refills
+    assert 0.4 < elapsed < 2.0
+    assert limiter.admitted == 150
+
+
+@pytest.mark.asyncio
+async def test_unused_quota_can_be_spent_in_a_burst():
+    """An idle limiter admits burst_seconds of its quota at once, also after a throttle."""
+    limiter = AdaptiveRateLimiter(requests_per_minute=60, tokens_per_minute=200000)
+
+    start = time.perf_counter()
+    for _ in range(10):
+        await limiter.acquire(estimated_tokens=2600)
+    elapsed = time.perf_counter() - start
+
+    assert elapsed < 0.1
+    # Ten image-sized requests fit in the token burst without overdrawing it
+    assert limiter.tokens.tokens == pytest.approx(200000 / 6 - 10 * 2600, abs=100)
+    limiter.on_throttle()
+    assert limiter.requests.capacity == pytest.approx(60 * 0.7 / 6)
+    assert limiter.tokens.capacity == pytest.approx(200000 * 0.7 / 6)
+
+
+@pytest.mark.asyncio
+async def test_queue_depth_limit_rejects_excess_waiters():
+    """Requests arriving at a full wait queue are rejected."""
+    limiter = AdaptiveRateLimiter(requests_per_minute=60, max_queue=1, burst_seconds=1)
+    await limiter.acquire()
+    waiter = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0.05)
+
+    with pytest.raises(RateLimitExceeded):
+        await limiter.acquire()
+
+    waiter.cancel()
+    assert limiter.rejected == 1
+
+
+@pytest.mark.asyncio
+async def test_throttles_are_retried_and_lower_the_limit():
+    """Throttled calls are retried and cut the request limit."""
+    limiter = AdaptiveRateLimiter(requests_per_minute=600, base_delay=0.001)
+    failures = [_client_error('ThrottlingException')] * 2
+
+    async def call():
+        if failures:
+            raise failures.pop()
+        return 'ok'
+
+    assert await limiter.call(call) == 'ok'
+    assert limiter.throttled == 2
+    assert limiter.retries == 2
+    # Two multiplicative cuts, then one additive step back up
+    assert limiter.requests_per_minute == pytest.approx(600 * 0.7 * 0.7 + 12)
+
+
+@pytest.mark.asyncio
+async def test_failed_attempts_refund_their_token_estimate():
+    """Retries of a throttled call do not drain the token budget more than once."""
+    limiter = AdaptiveRateLimiter(tokens_per_minute=60000, base_delay=0.001, burst_seconds=1)
+    limiter.on_throttle = lambda: None  # Keep the token rate fixed for the comparison
+    failures = [_client_error('ThrottlingException')] * 3
+
+    async def call():
+        if failures:
+            raise failures.pop()
+        return 'ok'
+
+    assert await limiter.call(call, estimated_tokens=400) == 'ok'
+    assert limiter.retries == 3
+    assert limiter.tokens.tokens == pytest.approx(60000 / 60 - 400, abs=50)
+
+
+@pytest.mark.asyncio
+async def test_non_retryable_errors_are_raised_immediately():
+    """Errors other than throttling are not retried."""
+    limiter = AdaptiveRateLimiter(base_delay=0.001)
+    attempts = []
+
+    async def call():
+        attempts.append(1)
+        raise _client_error('ValidationException')
+
+    with pytest.raises(ClientError):
+        await limiter.call(call)
+    assert len(attempts) == 1
+    assert limiter.requests_per_minute is None
+
+
+@pytest.mark.asyncio
+async def test_bedrock_invocation_recovers_from_throttling(fake_bedrock, monkeypatch):
+    """A throttled Bedrock invocation succeeds on retry."""
+    limiter = AdaptiveRateLimiter(tokens_per_minute=100000, base_delay=0.001)
+    monkeypatch.setattr(bedrock_utils, 'bedrock_rate_limiter', limiter)
+    fake_bedrock.throttle = 1
+    prompt = bedrock_utils.create_text_prompt('Describe the scene', max_tokens=500)
+
+    assert (await bedrock_utils.invoke_bedrock_model_async(prompt)).text == 'cats detected'
+
+    stats = limiter.stats()
+    assert stats['throttled'] == 1
+    assert stats['retries'] == 1
+    # The throttled limit was first pinned to the observed request rate
+    assert stats['requests_per_minute'] is not None
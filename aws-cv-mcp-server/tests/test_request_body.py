@@ -0,0 +1,43 @@
+import base64
+import json
+import logging
+import pytest
+from awslabs.aws_cv_mcp_server import bedrock_utils
+from awslabs.aws_cv_mcp_server.bedrock_utils import (
+    Base64Data,
+    create_multimodal_prompt,
+    encode_request_body,
+)
+
+
+def test_encode_request_body_matches_json_dumps_of_the_encoded_prompt():
+    """The streamed body is byte-for-byte the JSON of the base64-encoded prompt."""
+    image = bytes(range(256)) * 1000 + b'tail'
+    prompt = create_multimodal_prompt(
+        image, 'Describe "this"\n', 'image/png', system_prompt='rules'
+    )
+    legacy = json.loads(json.dumps(prompt, default=lambda value: value.encode()))
+
+    body = encode_request_body({'records': [prompt, prompt]})
+
+    assert body == json.dumps({'records': [legacy, legacy]}).encode('utf-8')
+    source = json.loads(body)['records'][0]['messages'][0]['content'][0]['source']
+    assert base64.b64decode(source['data']) == image
+    assert repr(Base64Data(image)) == f'<base64 data: {len(image)} bytes>'
+
+
+@pytest.mark.asyncio
+async def test_prompt_logging_is_truncated_and_omits_image_data(fake_bedrock, caplog, monkeypatch):
+    """Logged prompts are truncated and never include image data."""
+    monkeypatch.setattr(bedrock_utils, 'PROMPT_LOG_MAX_CHARS', 200)
+    prompt = create_multimodal_prompt(b'\xff' * 300_000, 'x' * 5000, 'image/png')
+
+    with caplog.at_level(logging.INFO, logger=bedrock_utils.logger.name):
+        await bedrock_utils.invoke_bedrock_model_async(prompt)
+
+    logged = [r.getMessage() for r in caplog.records if r.getMessage().startswith('Prompt')][0]
+    assert len(logged) < 300
+    assert '////' not in logged
+    assert logged.endswith('more characters]')
+    source = fake_bedrock.calls[0]['messages'][0]['content'][0]['source']
+    assert base64.b64decode(source['data']) == b'\xff' * 300_000
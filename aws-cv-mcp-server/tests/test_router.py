@@ -0,0 +1,65 @@
+import pytest
+from awslabs.aws_cv_mcp_server import bedrock_utils
+from awslabs.aws_cv_mcp_server.connections import Connections
+from awslabs.aws_cv_mcp_server.rate_limiter import AdaptiveRateLimiter
+from awslabs.aws_cv_mcp_server.router import BedrockRouter, Endpoint, parse_endpoints
+from tests.conftest import FakeBedrockClient
+
+
+MODEL = 'anthropic.claude-3-sonnet-20240229-v1:0'
+
+
+def test_parse_endpoints():
+    """Endpoints are parsed from regions with optional model overrides."""
+    endpoints = parse_endpoints('us-east-1, us-west-2=us.anthropic.claude-3-sonnet', MODEL)
+
+    assert [(e.region, e.model_id) for e in endpoints] == [
+        ('us-east-1', MODEL),
+        ('us-west-2', 'us.anthropic.claude-3-sonnet'),
+    ]
+
+
+def test_router_prefers_the_faster_healthy_endpoint():
+    """Once enough samples exist, the faster endpoint is preferred."""
+    slow, fast = Endpoint('us-east-1', MODEL), Endpoint('us-west-2', MODEL)
+    router = BedrockRouter([slow, fast], MODEL, min_samples=3)
+    for _ in range(5):
+        slow.record(1.0, ok=True)
+        fast.record(0.5, ok=True)
+    assert router.choose() is fast
+
+    # Errors inflate the cost of an otherwise fast endpoint
+    for _ in range(5):
+        fast.record(0.5, ok=False)
+    assert router.choose() is slow
+
+    # Another model only goes to endpoints serving it
+    assert router.choose('anthropic.claude-3-haiku').model_id == 'anthropic.claude-3-haiku'
+
+
+@pytest.mark.asyncio
+async def test_throttled_endpoint_fails_over(monkeypatch):
+    """A throttled endpoint is cooled down and the call fails over."""
+    primary = FakeBedrockClient(text='from primary', throttle=1)
+    secondary = FakeBedrockClient(text='from secondary')
+    monkeypatch.setattr(
+        Connections,
+        '_clients',
+        {('bedrock-runtime', 'us-east-1'): primary, ('bedrock-runtime', 'us-west-2'): secondary},
+    )
+    router = BedrockRouter(parse_endpoints('us-east-1,us-west-2', MODEL), MODEL)
+    limiter = AdaptiveRateLimiter(base_delay=0.001)
+    monkeypatch.setattr(bedrock_utils, 'bedrock_router', router)
+    monkeypatch.setattr(bedrock_utils, 'bedrock_rate_limiter', limiter)
+    prompt = bedrock_utils.create_text_prompt('Describe the scene')
+
+    assert (await bedrock_utils.invoke_bedrock_model_async(prompt)).text == 'from secondary'
+    # The primary is paused, so the next call goes straight to the secondary
+    assert (await bedrock_utils.invoke_bedrock_model_async(prompt)).text == 'from secondary'
+
+    stats = router.stats()
+    assert stats['failovers'] == 1
+    assert stats['endpoints'][f'us-east-1/{MODEL}']['errors'] == 1
+    assert stats['endpoints'][f'us-west-2/{MODEL}']['requests'] == 2
+    # Failover happened within the router, so the limiter never saw a throttle
+    assert limiter.throttled == 0
@@ -0,0 +1,60 @@
+import pytest
+import threading
+from awslabs.aws_cv_mcp_server import scan_pool
+from awslabs.aws_cv_mcp_server.scan_pool import ScanPool, scan_with_deadline
+from awslabs.aws_cv_mcp_server.scanner import scan_code
+
+
+SNIPPETS = [
+    'value = 1\n',
+    "import subprocess\nsubprocess.call('ls', shell=True)\n",
+    'def broken(:\n',
+    "x = eval('1')\n",
+]
+
+
+@pytest.mark.asyncio
+async def test_scan_pool_returns_results_in_input_order():
+    """Scans run in parallel but results come back in input order."""
+    pool = ScanPool(max_workers=2, max_pending=2)
+    try:
+        results = await pool.scan_many(iter(SNIPPETS))
+    finally:
+        pool.shutdown()
+
+    assert results == [scan_code(code) for code in SNIPPETS]
+    assert pool.stats()['scanned'] == len(SNIPPETS)
+
+
+@pytest.mark.asyncio
+async def test_cache_keys_and_lookups_stay_off_the_event_loop(monkeypatch):
+    """Loading bandit for the cache key fingerprint does not block the event loop."""
+    threads = []
+    scan_cache_key = scan_pool.scan_cache_key
+
+    def recording_key(code):
+        threads.append(threading.get_ident())
+        return scan_cache_key(code)
+
+    monkeypatch.setattr(scan_pool, 'scan_cache_key', recording_key)
+    pool = ScanPool(max_workers=1)
+    try:
+        first = await pool.scan_many(['value = 1\n'])
+        second = await pool.scan_many(['value = 1\n'])
+    finally:
+        pool.shutdown()
+
+    assert first == second
+    assert len(threads) == 2
+    assert threading.get_ident() not in threads
+
+
+def test_scan_with_deadline_reports_timeouts():
+    """A scan that outlasts its deadline is reported as a timeout."""
+    code = "import subprocess\nsubprocess.call('ls', shell=True)\n" * 2000
+
+    result = scan_with_deadline(code, timeout=0.01)
+
+    assert result.has_errors
+    assert result.syntax_valid
+    assert [issue.issue_type for issue in result.security_issues] == ['ScanTimeout']
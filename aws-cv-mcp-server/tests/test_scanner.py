@@ -0,0 +1,122 @@
+import ast
+import pytest
+import tempfile
+from awslabs.aws_cv_mcp_server.scanner import (
+    BanditScanner,
+    bandit_scanner,
+    check_dangerous_functions,
+    scan_cache,
+    scan_python_code,
+)
+
+
+UNSAFE = "import subprocess\nsubprocess.call('ls', shell=True)\nx = eval('1')\n"
+
+
+def test_bandit_scanner_reuses_one_manager_without_temp_files(monkeypatch):
+    """Scans reuse one bandit manager and never write temporary files."""
+
+    def no_temp_files(*args, **kwargs):
+        raise AssertionError('scanner must not write temporary files')
+
+    monkeypatch.setattr(tempfile, 'NamedTemporaryFile', no_temp_files)
+    scanner = BanditScanner()
+
+    first = scanner.scan(UNSAFE)
+    manager = scanner._manager
+    second = scanner.scan('value = 1\n')
+
+    assert [(issue.issue_type, issue.line) for issue in first] == [
+        ('B404', 1),
+        ('B607', 2),
+        ('B602', 2),
+        ('B307', 3),
+    ]
+    # Results from the previous snippet do not leak into the next one
+    assert second == []
+    assert scanner._manager is manager
+
+
+def test_bandit_scanner_falls_back_to_the_public_api(monkeypatch):
+    """Scans still report bandit findings if the private internals it uses go away."""
+    from bandit.core import manager
+
+    monkeypatch.delattr(manager, '_parse_nosec_comment')
+
+    issues = BanditScanner().scan(UNSAFE)
+
+    assert {(issue.issue_type, issue.line) for issue in issues} == {
+        ('B404', 1),
+        ('B607', 2),
+        ('B602', 2),
+        ('B307', 3),
+    }
+
+
+@pytest.mark.asyncio
+async def test_scan_python_code_reports_bandit_findings():
+    """Bandit findings are reported as security issues."""
+    result = await scan_python_code(UNSAFE)
+
+    assert result.syntax_valid
+    assert result.has_errors
+    assert {'B602', 'B307'} <= {issue.issue_type for issue in result.security_issues}
+
+
+@pytest.mark.asyncio
+async def test_scan_python_code_parses_once_and_reports_each_dangerous_call_once(monkeypatch):
+    """The code is parsed once and each dangerous call is reported once."""
+    parses = []
+    real_parse = ast.parse
+
+    def counting_parse(*args, **kwargs):
+        parses.append(args)
+        return real_parse(*args, **kwargs)
+
+    monkeypatch.setattr(ast, 'parse', counting_parse)
+    result = await scan_python_code(UNSAFE)
+
+    dangerous = [
+        (issue.issue_text, issue.line)
+        for issue in result.security_issues
+        if issue.issue_type == 'DangerousFunctionDetection'
+    ]
+    assert len(parses) == 1
+    assert dangerous == [
+        ("Dangerous function 'subprocess.call' detected", 2),
+        ("Dangerous function 'eval' detected", 3),
+    ]
+
+
+def test_check_dangerous_functions_resolves_imports_and_skips_text():
+    """Aliased imports are resolved, and comments and strings are ignored."""
+    code = (
+        'import subprocess as sp\n'
+        'from os import system as run\n'
+        '# eval(input()) in a comment\n'
+        'note = "os.system is dangerous"\n'
+        'sp.Popen(["ls"])\n'
+        'run("ls")\n'
+    )
+
+    found = [(item['function'], item['line']) for item in check_dangerous_functions(code)]
+
+    assert found == [('subprocess.Popen', 5), ('os.system', 6)]
+
+
+@pytest.mark.asyncio
+async def test_scan_python_code_reuses_results_for_resubmitted_code(monkeypatch):
+    """Resubmitted code is answered from the scan cache."""
+    first = await scan_python_code(UNSAFE)
+
+    def no_rescan(*args, **kwargs):
+        raise AssertionError('cached code must not be scanned again')
+
+    monkeypatch.setattr(bandit_scanner, 'scan', no_rescan)
+    again = await scan_python_code(UNSAFE)
+    reformatted = await scan_python_code(UNSAFE.replace('\n', '  \r\n'))
+
+    assert again == first
+    assert reformatted == first
+    assert scan_cache.stats()['hits'] == 2
+    assert scan_cache.stats()['hit_rate'] == round(2 / 3, 4)